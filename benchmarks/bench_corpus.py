@@ -0,0 +1,72 @@
+"""语料库加载基准：对比 st.cache_data 每次重跑的拷贝与共享只读语料库
+
+用法：python -m benchmarks.bench_corpus --poems 50000 --reruns 20
+"""
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import PoemCorpus, build_corpus, corpus_path_for, load_corpus
+
+
+def _render_home(poems):
+    """模拟首页一次重跑对诗歌数据的访问"""
+    for poem in poems[:3]:
+        poem['title'], poem['author'], poem['dynasty'], poem['content'][:15]
+    return len(poems)
+
+
+def _measure(label, get_poems, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        _render_home(get_poems())
+    elapsed = (time.perf_counter() - start) / reruns
+
+    # 单独测一次重跑的内存峰值，避免 tracemalloc 的开销影响计时
+    tracemalloc.start()
+    _render_home(get_poems())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28}{elapsed * 1000:>10.3f} ms/重跑{peak / 1024 / 1024:>10.2f} MiB峰值")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=50000, help="合成诗歌数量")
+    parser.add_argument("--reruns", type=int, default=20, help="模拟重跑次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = write_poems(os.path.join(tmp, "poems.json"), args.poems)
+        print(f"诗歌数量：{args.poems}，重跑次数：{args.reruns}")
+
+        start = time.perf_counter()
+        build_corpus(json_path)
+        print(f"构建语料库：{(time.perf_counter() - start) * 1000:.1f} ms（含数据校验）")
+
+        # 冷启动：打开二进制语料库并渲染首页
+        start = time.perf_counter()
+        with open(json_path, "r", encoding="utf-8") as f:
+            _render_home(json.load(f))
+        print(f"冷启动 json.load + 首页        {(time.perf_counter() - start) * 1000:>10.3f} ms")
+        start = time.perf_counter()
+        _render_home(PoemCorpus(corpus_path_for(json_path)))
+        print(f"冷启动 mmap语料库 + 首页       {(time.perf_counter() - start) * 1000:>10.3f} ms")
+
+        # 优化前：cache_data 保存序列化结果，每次命中都反序列化出一份完整拷贝
+        with open(json_path, "r", encoding="utf-8") as f:
+            cached = pickle.dumps(json.load(f))
+        _measure("cache_data (每次拷贝)", lambda: pickle.loads(cached), args.reruns)
+
+        # 优化后：cache_resource 返回同一个 mmap 语料库对象
+        load_corpus(json_path)
+        _measure("共享只读语料库", lambda: load_corpus(json_path), args.reruns)
+
+
+if __name__ == "__main__":
+    main()
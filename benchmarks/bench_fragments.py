@@ -0,0 +1,166 @@
+"""交互延迟基准：对比整页重跑（含 st.rerun 的二次重跑）与片段内重跑的单次交互耗时
+
+“改造前”取指定提交（默认为引入本基准之前的提交）中的 app.py，每次点击都完整执行整个脚本；
+“改造后”用当前 app.py，按浏览器的做法只重跑按钮所在的片段。AppTest 本身总是整页重跑，这里替换它的脚本执行器，
+在重跑请求中带上片段编号，并像服务端一样复用编译好的脚本，不把每次编译计入交互耗时
+（依赖 streamlit 内部接口，仅供基准测试使用）。
+
+用法：python -m benchmarks.bench_fragments --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+import streamlit.testing.v1.app_test as app_test_module
+from streamlit.runtime.scriptrunner import RerunData
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import (
+    LocalScriptRunner, parse_tree_from_messages, require_widgets_deltas,
+)
+
+# 非空时下一次运行只重跑这些片段
+_fragment_queue = []
+_script_cache = ScriptCache()
+
+
+class _FragmentScriptRunner(LocalScriptRunner):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._script_cache = _script_cache
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        if not _fragment_queue:
+            return super().run(widget_state, query_params, timeout, page_hash)
+        # 丢弃构造时排入的整页重跑请求，否则会与片段请求合并成整页重跑
+        self._requests = ScriptRequests()
+        self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                     fragment_id_queue=list(_fragment_queue)))
+        try:
+            if not self._script_thread:
+                self.start()
+            require_widgets_deltas(self, timeout)
+        finally:
+            self.join()
+        return parse_tree_from_messages(self.forward_msgs())
+
+
+app_test_module.LocalScriptRunner = _FragmentScriptRunner
+
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def _start_challenge(at):
+    _button(at, "🎯 开始新挑战").click().run()
+
+
+def _prepare_submit(at):
+    _start_challenge(at)
+    at.text_input(key="current_answer").input("床前明月光").run()
+    return "📤 提交答案", False
+
+
+def _prepare_show(at):
+    _start_challenge(at)
+    return "👁️ 显示答案", False
+
+
+def _prepare_next(at):
+    _start_challenge(at)
+    return "🔄 换一首诗", False
+
+
+def _prepare_rate(at):
+    _button(at, "✨ 开始创作").click().run()
+    return "提交评分", True
+
+
+def _prepare_create(at):
+    return "✨ 开始创作", False
+
+
+INTERACTIONS = [
+    ("🏆 对诗挑战", "提交答案", _prepare_submit),
+    ("🏆 对诗挑战", "显示答案", _prepare_show),
+    ("🏆 对诗挑战", "换一首诗", _prepare_next),
+    ("✍️ AI创作", "开始创作", _prepare_create),
+    ("✍️ AI创作", "提交评分", _prepare_rate),
+]
+
+
+def _fragment_id(at, nested):
+    storage = at._fragment_storage
+    for fragment_id, parent in storage._parent_by_id.items():
+        if (parent is not None) == nested:
+            return fragment_id
+    return None
+
+
+def measure(script_path, page, prepare, repeat, scoped):
+    """每轮新开一个会话，准备好状态后只对一次点击计时，返回毫秒"""
+    timings = []
+    for _ in range(repeat):
+        at = AppTest.from_file(script_path, default_timeout=60)
+        at.run()
+        at.sidebar.selectbox[0].select(page).run()
+        label, nested = prepare(at)
+        fragment_id = _fragment_id(at, nested) if scoped else None
+        _button(at, label).click()
+        if fragment_id:
+            _fragment_queue.append(fragment_id)
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        _fragment_queue.clear()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return timings
+
+
+def _default_baseline(root):
+    """引入本基准的提交的上一个提交，即改造前的代码"""
+    added = subprocess.run(["git", "log", "--diff-filter=A", "--format=%H", "--",
+                            os.path.relpath(os.path.abspath(__file__), root)],
+                           cwd=root, check=True, capture_output=True, text=True).stdout.split()
+    if not added:
+        raise SystemExit("无法确定改造前的提交，请用 --baseline 指定")
+    return f"{added[-1]}~1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", help="改造前 app.py 所在的提交，默认为引入本基准的提交的上一个提交")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(root)  # 应用按相对路径读取 data/
+    current = os.path.join(root, "app.py")
+    baseline_rev = args.baseline or _default_baseline(root)
+    source = subprocess.run(["git", "show", f"{baseline_rev}:app.py"], cwd=root,
+                            check=True, capture_output=True).stdout
+    with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as f:
+        f.write(source)
+        baseline = f.name
+
+    try:
+        print(f"单次交互耗时中位数（{args.repeat} 次）：")
+        for page, name, prepare in INTERACTIONS:
+            before = measure(baseline, page, prepare, args.repeat, scoped=False)
+            full = measure(current, page, prepare, args.repeat, scoped=False)
+            after = measure(current, page, prepare, args.repeat, scoped=True)
+            print(f"{page} {name}：改造前整页 {statistics.median(before):7.1f}ms，"
+                  f"改造后整页 {statistics.median(full):7.1f}ms，"
+                  f"片段重跑 {statistics.median(after):7.1f}ms")
+    finally:
+        os.remove(baseline)
+
+
+if __name__ == "__main__":
+    main()
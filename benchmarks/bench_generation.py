@@ -0,0 +1,90 @@
+"""AI创作基准：对比原先阻塞式进度条、整首生成后再发出与逐句流式生成的首字、首行用时和线程占用
+
+生成服务使用应用实际使用的 n-gram 后端，模型在合成语料上训练。
+
+用法：python -m benchmarks.bench_generation --users 16 --workers 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import write_poems
+from utils.generation import GenerationRequest, GenerationService, NgramBackend, summarize_jobs
+from utils.ngram_model import load_model
+
+
+def _legacy_create():
+    """原实现：脚本线程先空转约 3.5 秒，结束后才一次性显示整首诗"""
+    for _ in range(100):
+        time.sleep(0.03)
+    time.sleep(0.5)
+
+
+class _WholePoemBackend(NgramBackend):
+    """对照：在事件循环线程上一次生成整首诗，完成后才发出第一句"""
+
+    async def stream(self, request):
+        lines = list(self._lines(request))
+        for i, line in enumerate(lines):
+            yield line + ("，" if i % 2 == 0 else "。") + ("\n" if i % 2 == 1 and i < self.lines - 1 else "")
+
+
+def _run_users(users, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def _run_service(label, backend, args):
+    service = GenerationService(backend, max_workers=args.workers, max_queue=args.users)
+    jobs = []
+    lock = threading.Lock()
+
+    def streaming_user(i):
+        job = service.submit(GenerationRequest(("山水田园",), "清新自然", ("明月",), i))
+        with lock:
+            jobs.append(job)
+        for _ in job.tokens():
+            pass
+
+    wall = _run_users(args.users, streaming_user)
+    summary = summarize_jobs(jobs)
+    first_tokens = sorted(job.time_to_first_token for job in jobs if job.time_to_first_token is not None)
+    print(f"{label}：首字 p50 {first_tokens[len(first_tokens) // 2]:.3f}s，"
+          f"首行 p50 {summary['ttfl_p50']:.3f}s / 最大 {summary['ttfl_max']:.3f}s，"
+          f"每会话线程等待 {summary['blocked_avg']:.3f}s，总耗时 {wall:.2f}s，计数 {service.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=16, help="同时创作的用户数")
+    parser.add_argument("--workers", type=int, default=8, help="生成服务并发上限")
+    parser.add_argument("--poems", type=int, default=20000, help="训练模型用的合成语料规模")
+    parser.add_argument("--per-line", type=int, default=16, help="每句的候选数")
+    args = parser.parse_args()
+
+    occupancy = []
+
+    def legacy_user(_):
+        start = time.perf_counter()
+        _legacy_create()
+        occupancy.append(time.perf_counter() - start)
+
+    wall = _run_users(args.users, legacy_user)
+    print(f"阻塞式进度条：首行 {max(occupancy):.2f}s（整首诗在结束后才出现），"
+          f"每会话线程占用 {sum(occupancy) / len(occupancy):.2f}s，总耗时 {wall:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = load_model(write_poems(os.path.join(tmp, "poems.json"), args.poems))
+        _run_service("整首生成后发出", _WholePoemBackend(model, per_line=args.per_line), args)
+        _run_service("逐句流式生成  ", NgramBackend(model, per_line=args.per_line), args)
+
+
+if __name__ == "__main__":
+    main()
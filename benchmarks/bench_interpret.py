@@ -0,0 +1,87 @@
+"""AI扩展解读基准：并发请求合并、缓存命中耗时与整库预生成吞吐
+
+后端为本进程内启动的 HTTP 替身服务，按 --latency 模拟大模型的响应时间。
+
+用法：python -m benchmarks.bench_interpret --poems 400 --latency 0.05 --workers 1 8 32
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import make_poems
+from utils.interpret import HttpBackend, InterpretCache, InterpretService, start_stand_in, warm_up
+
+
+def _served(server):
+    """替身服务累计处理的请求数"""
+    return server.RequestHandlerClass.requests
+
+
+def _per_op(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05, help="替身服务的响应时间（秒）")
+    parser.add_argument("--users", type=int, default=32, help="同时请求同一首诗的会话数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="预生成的并发调用数")
+    args = parser.parse_args()
+
+    server = start_stand_in(latency=args.latency)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    backend = HttpBackend(url)
+    poems = make_poems(args.poems)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 并发合并：多个会话同时打开同一首未缓存的诗
+        with ThreadPoolExecutor(args.users) as pool:
+            before = _served(server)
+            start = time.perf_counter()
+            list(pool.map(lambda _: backend.interpret(poems[0]), range(args.users)))
+            direct, direct_calls = time.perf_counter() - start, _served(server) - before
+
+            service = InterpretService(backend, InterpretCache(os.path.join(tmp, "cache.db")), max_workers=8)
+            before = _served(server)
+            start = time.perf_counter()
+            list(pool.map(lambda _: service.get(poems[1]), range(args.users)))
+            merged, merged_calls = time.perf_counter() - start, _served(server) - before
+        print(f"{args.users} 个会话同时请求同一首诗：各自调用 {direct_calls} 次后端 {direct * 1000:.0f}ms，"
+              f"合并后 {merged_calls} 次 {merged * 1000:.0f}ms")
+
+        # 页面取用解读的耗时
+        start = time.perf_counter()
+        service.get(poems[2])
+        miss = time.perf_counter() - start
+        memory_hit = _per_op(lambda: service.get(poems[2]), 2000)
+        reopened = InterpretService(backend, InterpretCache(os.path.join(tmp, "cache.db")))
+        start = time.perf_counter()
+        reopened.get(poems[2])
+        disk_hit = (time.perf_counter() - start) * 1e6
+        print(f"取用一首诗的解读：未命中 {miss * 1000:.1f}ms，内存命中 {memory_hit:.1f}µs，"
+              f"重启后磁盘命中 {disk_hit:.0f}µs")
+
+        # 整库预生成
+        for workers in args.workers:
+            cache = InterpretCache(os.path.join(tmp, f"warm{workers}.db"))
+            service = InterpretService(backend, cache, max_workers=workers)
+            start = time.perf_counter()
+            total, cached, generated, failed = warm_up(service, poems, workers)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            again = warm_up(service, poems, workers)
+            rerun = time.perf_counter() - start
+            print(f"  预生成 {total} 首，并发 {workers:>3}：{elapsed:6.2f}s（{generated / elapsed:7.1f} 首/秒，"
+                  f"失败 {failed}），再次运行跳过 {again[1]} 首 {rerun * 1000:.0f}ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
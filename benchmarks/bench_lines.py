@@ -0,0 +1,82 @@
+"""诗句索引基准：飞花令的令字查询、作答判定与提示，对比逐句扫描全部诗句
+
+默认约 17 万首合成诗歌（约 100 万句）。先报告建索引与打开索引的耗时、索引文件大小，
+再分别测量每次操作的平均耗时。
+
+用法：python -m benchmarks.bench_lines --poems 170000 --queries 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import load_corpus, split_lines
+from utils.lines import FEIHUA_CHARS, FeihuaRound, LineIndex, build_lines, lines_path_for
+
+
+def _per_op(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=170000)
+    parser.add_argument("--queries", type=int, default=2000, help="索引查询的次数")
+    parser.add_argument("--scans", type=int, default=20, help="逐句扫描的次数（很慢）")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = write_poems(os.path.join(tmp, "poems.json"), args.poems)
+        corpus = load_corpus(json_path)
+
+        start = time.perf_counter()
+        count = build_lines(json_path)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        index = LineIndex(lines_path_for(json_path), corpus)
+        opened = time.perf_counter() - start
+        size = os.path.getsize(lines_path_for(json_path))
+        print(f"{args.poems} 首 / {count} 句：建索引 {built:.1f}s，打开 {opened * 1000:.2f}ms，"
+              f"索引文件 {size / 2**20:.1f}MiB")
+
+        # 对照：全部诗句放在内存列表里逐句扫描
+        lines = [content[s:e] for content in corpus.column('content') for s, e in split_lines(content)]
+        present = [ch for ch in FEIHUA_CHARS if index.count(ch)]
+        chars = [rng.choice(present) for _ in range(args.queries)]
+        valid = [index.line(rng.randrange(count)) for _ in range(args.queries)]
+        invalid = [text[::-1] + "之" for text in valid]
+        used = set(rng.sample(range(count), 50))
+
+        def scan_find(text):
+            return lines.index(text) if text in lines else None
+
+        def scan_hint(char):
+            return rng.choice([i for i, text in enumerate(lines) if char in text and i not in used])
+
+        def scan_postings(char):
+            return [i for i, text in enumerate(lines) if char in text]
+
+        rounds = [FeihuaRound(char) for char in chars]
+        answers = [index.line(index.hint(game.char)) for game in rounds]
+
+        rows = [
+            ("含令字的诗句表", _per_op(scan_postings, chars[:args.scans]), _per_op(index.postings, chars)),
+            ("判定：语料中的诗句", _per_op(scan_find, valid[:args.scans]), _per_op(index.find, valid)),
+            ("判定：查无此句", _per_op(scan_find, invalid[:args.scans]), _per_op(index.find, invalid)),
+            ("提示一句未用过的", _per_op(scan_hint, chars[:args.scans]),
+             _per_op(lambda char: index.hint(char, used, rng), chars)),
+        ]
+        for label, scan, indexed in rows:
+            print(f"  {label:<12}逐句扫描 {scan:>10.1f}µs，索引 {indexed:>6.1f}µs（{scan / indexed:,.0f}×）")
+        played = _per_op(lambda pair: pair[0].play(index, pair[1], rng), list(zip(rounds, answers)))
+        print(f"  一次出句（判定 + 对手接句）：{played:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""并发负载测试：模拟多名学习者同时浏览全部页面、答题与创作，统计吞吐量与各页面、各操作的延迟分位数
+
+每个语料规模先生成合成语料库并完整走一遍各页面（构建索引、题库、语言模型等，耗时单独列出），
+然后按给定的并发数启动模拟用户。每名用户是一个独立会话（AppTest），按权重随机切换页面并执行
+该页面的典型操作：搜索、出题、提交答案、创作、筛选报告。用户在工作进程内以线程并发运行，
+与 streamlit 服务端一样共享进程内的缓存资源；--processes 大于 1 时模拟多副本部署。
+
+AppTest 每次运行都会替换并清空全局 Runtime 实例，并在运行期间临时打开全局的测试配置项，
+运行结束时恢复：多个会话并发时，先结束的会话会把仍在运行的会话的测试配置关掉，控件因此查不到。
+这里改为所有会话共用一个模拟 Runtime、整个进程固定打开测试配置，并像服务端一样复用编译好的脚本
+（依赖 streamlit 内部接口，仅供基准测试使用）。AppTest 的交互总是整页重跑，片段内的操作按整页重跑计时，结果偏保守。
+
+用法：python -m benchmarks.bench_load --poems 1000 50000 200000 --users 1 4 16 --actions 30
+"""
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, NamedTuple
+from unittest.mock import MagicMock
+
+import streamlit.testing.v1.app_test as app_test_module
+from streamlit import config
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+from benchmarks.synthetic import make_poems
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# 页面被选中的权重：答题与赏析是主要使用场景
+PAGE_WEIGHTS = {
+    "🏠 首页": 1,
+    "📖 智能赏析": 3,
+    "🏆 对诗挑战": 4,
+    "✍️ AI创作": 1,
+    "📊 学习报告": 1,
+}
+CORRECT_RATE = 0.7
+
+
+class Sample(NamedTuple):
+    page: str
+    action: str
+    seconds: float
+    ok: bool
+
+
+def _install_shared_runtime():
+    """所有会话共用一个模拟 Runtime 与脚本缓存，测试配置在整个进程内保持打开"""
+    runtime = MagicMock(spec=app_test_module.Runtime)
+    runtime.media_file_mgr = app_test_module.MediaFileManager(app_test_module.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test_module.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test_module.MemoryCacheStorageManager()
+    components = app_test_module.BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+    app_test_module.Runtime.instance = classmethod(lambda cls: runtime)
+    app_test_module.Runtime.exists = classmethod(lambda cls: True)
+    config.set_option("global.appTest", True)
+    app_test_module.patch_config_options = lambda options: contextlib.nullcontext()
+
+    script_cache = ScriptCache()
+    init = LocalScriptRunner.__init__
+
+    def cached_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self._script_cache = script_cache
+    LocalScriptRunner.__init__ = cached_init
+
+
+class SimulatedUser:
+    """一个学习者会话：按权重选页面，打开后执行该页面的典型操作"""
+
+    def __init__(self, uid, rng, queries, think=0.0):
+        self.rng = rng
+        self.queries = queries
+        self.think = think
+        self.samples: List[Sample] = []
+        self.errors: List[str] = []
+        self.at = AppTest.from_file(APP, default_timeout=120)
+        self.at.query_params['uid'] = uid
+
+    def _timed(self, page, action, step):
+        start = time.perf_counter()
+        try:
+            step()
+            ok = not self.at.exception
+            if not ok:
+                self.errors.append(f"{page}/{action}: {self.at.exception[0].value}")
+        except Exception as e:  # 找不到控件等，说明页面没有正常渲染
+            ok = False
+            self.errors.append(f"{page}/{action}: {e!r}")
+        self.samples.append(Sample(page, action, time.perf_counter() - start, ok))
+        if self.think:
+            time.sleep(self.rng.expovariate(1 / self.think))
+
+    def _button(self, label):
+        return next(b for b in self.at.button if b.label == label)
+
+    def open(self, page):
+        self._timed(page, "打开", lambda: self.at.sidebar.selectbox[0].select(page).run())
+
+    def act(self, page):
+        """控件查找也放在计时步骤内：页面没有正常渲染时记为失败，不中断整个会话"""
+        at = self.at
+        if page == "📖 智能赏析":
+            query = self.rng.choice(self.queries)
+            self._timed(page, "搜索", lambda: at.text_input[0].input(query).run())
+        elif page == "🏆 对诗挑战":
+            self._timed(page, "出题", lambda: self._button("🎯 开始新挑战").click().run())
+
+            if "challenge_qid" not in at.session_state or at.session_state.challenge_qid is None:
+                return  # 没有出题（出题失败已计入），不再提交
+
+            def submit():
+                from utils.cloze import load_bank
+                answer = load_bank('data/poems.json').question(at.session_state.challenge_qid).answer
+                if self.rng.random() >= CORRECT_RATE:
+                    answer = answer[::-1]
+                at.text_input(key="current_answer").input(answer)
+                self._button("📤 提交答案").click().run()
+            self._timed(page, "提交答案", submit)
+        elif page == "✍️ AI创作":
+            self._timed(page, "创作", lambda: self._button("✨ 开始创作").click().run())
+        elif page == "📊 学习报告":
+            def filter_band():
+                band = next(s for s in at.selectbox if s.label == "掌握程度")
+                band.select(self.rng.choice(band.options)).run()
+            self._timed(page, "筛选", filter_band)
+
+    def session(self, actions):
+        self._timed("🏠 首页", "打开", self.at.run)
+        pages, weights = list(PAGE_WEIGHTS), list(PAGE_WEIGHTS.values())
+        for _ in range(actions):
+            page = self.rng.choices(pages, weights)[0]
+            self.open(page)
+            self.act(page)
+        return self.samples
+
+
+def _warm_up():
+    """走一遍所有页面与操作，构建并加载各项共享资源"""
+    user = SimulatedUser("warmup", random.Random(0), ["明月"])
+    user.session(0)
+    for page in PAGE_WEIGHTS:
+        user.open(page)
+        user.act(page)
+    if user.errors:
+        raise RuntimeError("预热失败：" + "；".join(user.errors))
+
+
+_start_barrier = None
+
+
+def _init_worker(workdir, barrier, warm):
+    global _start_barrier
+    os.chdir(workdir)  # 应用按相对路径读取 data/
+    _install_shared_runtime()
+    _start_barrier = barrier
+    # 应用脚本运行时会替换 __main__，之后按 __main__ 查找任务函数需要原模块
+    main_module = sys.modules['__main__']
+    if warm:
+        _warm_up()
+    sys.modules['__main__'] = main_module
+
+
+def _build():
+    main_module = sys.modules['__main__']
+    start = time.perf_counter()
+    _warm_up()
+    elapsed = time.perf_counter() - start
+    sys.modules['__main__'] = main_module
+    return elapsed
+
+
+def _run_users(uids, actions, seed, queries, think):
+    """在一个工作进程内并发运行若干名用户，返回 (样本, 错误, 开始时间, 结束时间)；样本以普通元组返回"""
+    _start_barrier.wait()
+    start = time.time()
+    users = [SimulatedUser(uid, random.Random(f"{seed}:{uid}"), queries, think) for uid in uids]
+    with ThreadPoolExecutor(len(users)) as pool:
+        list(pool.map(lambda user: user.session(actions), users))
+    samples = [tuple(sample) for user in users for sample in user.samples]
+    errors = [error for user in users for error in user.errors]
+    return samples, errors, start, time.time()
+
+
+def _pool(workdir, processes, warm):
+    context = multiprocessing.get_context("spawn")  # 工作进程不继承父进程的 streamlit 状态
+    barrier = context.Barrier(processes)
+    return ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker,
+                               initargs=(workdir, barrier, warm))
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def _write_corpus(workdir, count, seed):
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    poems = make_poems(count, seed)
+    with open(os.path.join(workdir, "data", "poems.json"), "w", encoding="utf-8") as f:
+        json.dump(poems, f, ensure_ascii=False)
+    # 搜索词取自语料：作者名与随机两字片段
+    rng = random.Random(seed)
+    queries = sorted({poem['author'] for poem in poems})
+    for poem in rng.sample(poems, min(200, len(poems))):
+        start = rng.randrange(len(poem['content']) - 2)
+        queries.append(poem['content'][start:start + 2])
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, nargs="+", default=[1000, 50000], help="语料规模（首）")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16], help="并发用户数")
+    parser.add_argument("--processes", type=int, default=1, help="工作进程数，用户平均分配到各进程")
+    parser.add_argument("--actions", type=int, default=30, help="每名用户切换页面的次数")
+    parser.add_argument("--think", type=float, default=0.0, help="两次操作间的平均思考时间（秒），0 为压测")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="另将分位数写入 CSV 文件")
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.poems:
+        workdir = tempfile.mkdtemp(prefix="poetry-load-")
+        try:
+            queries = _write_corpus(workdir, count, args.seed)
+            with _pool(workdir, 1, warm=False) as pool:
+                built = pool.submit(_build).result()
+            print(f"语料 {count:,} 首：首次打开全部页面（含构建索引与题库）{built:.1f}s")
+
+            for users in args.users:
+                processes = min(args.processes, users)
+                uids = [f"load{i}" for i in range(users)]
+                with _pool(workdir, processes, warm=True) as pool:
+                    futures = [pool.submit(_run_users, uids[i::processes], args.actions, args.seed, queries, args.think)
+                               for i in range(processes)]
+                    results = [future.result() for future in futures]
+                samples = [Sample(*s) for result in results for s in result[0]]
+                errors = [e for result in results for e in result[1]]
+                wall = max(r[3] for r in results) - min(r[2] for r in results)
+                failed = sum(not s.ok for s in samples)
+                print(f"  并发 {users} 用户（{processes} 进程）：{len(samples)} 次操作，用时 {wall:.1f}s，"
+                      f"吞吐 {len(samples) / wall:.1f} 次/秒，失败 {failed}")
+                for error in errors[:3]:
+                    print(f"    ! {error}")
+
+                groups = {}
+                for s in samples:
+                    groups.setdefault((s.page, s.action), []).append(s.seconds)
+                for (page, action), seconds in sorted(groups.items(), key=lambda item: list(PAGE_WEIGHTS).index(item[0][0])):
+                    p50, p95, p99 = (_percentile(seconds, q) * 1000 for q in (0.5, 0.95, 0.99))
+                    print(f"    {page:<8}{action:<6}{len(seconds):>6} 次  p50 {p50:7.1f}ms  "
+                          f"p95 {p95:7.1f}ms  p99 {p99:7.1f}ms")
+                    rows.append([count, users, processes, page, action, len(seconds),
+                                 round(p50, 2), round(p95, 2), round(p99, 2), round(len(samples) / wall, 2)])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["poems", "users", "processes", "page", "action", "count",
+                             "p50_ms", "p95_ms", "p99_ms", "throughput"])
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
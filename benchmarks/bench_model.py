@@ -0,0 +1,99 @@
+"""诗歌模型基准：原始字典、__slots__ Poem 与 mmap 语料库的每首内存，以及页面取分句的耗时
+
+原始字典每次重跑都要从正文重新切分句子；Poem 与语料库记录按构建时预存的诗句位置切片。
+
+用法：python -m benchmarks.bench_model --poems 50000 --renders 20000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import Poem, PoemCorpus, build_corpus, corpus_path_for
+
+PUNCTUATION_RE = re.compile(r'[，。！？；、\s]')
+
+
+def _traced(func):
+    """返回 func() 的结果与其保留下来的内存（字节）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _render_dict(poem):
+    """改造前的页面：逐次从正文切分句、截取摘要、统计字数"""
+    lines = poem['content'].replace('。', '。\n').replace('，', '，\n').split('\n')
+    sentences = [line.strip() for line in lines if line.strip()]
+    return sentences, poem['content'][:15], len(PUNCTUATION_RE.sub('', poem['content']))
+
+
+def _render_model(poem):
+    sentences = poem.sentences
+    return sentences, sentences[:2], poem.char_count
+
+
+def _per_op(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=50000, help="合成诗歌数量")
+    parser.add_argument("--renders", type=int, default=20000, help="计时的取用次数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = write_poems(os.path.join(tmp, "poems.json"), args.poems)
+        with open(json_path, encoding="utf-8") as f:
+            text = f.read()
+
+        # 各种形态常驻内存的大小；json 解析出的字符串与 Poem 共享，只有字典本身和派生数据计入差额
+        dicts, dict_bytes = _traced(lambda: json.loads(text))
+        start = time.perf_counter()
+        poems, model_bytes = _traced(lambda: [Poem.from_dict(poem) for poem in dicts])
+        parsed = time.perf_counter() - start
+        start = time.perf_counter()
+        build_corpus(json_path)
+        built = time.perf_counter() - start
+        corpus, corpus_bytes = _traced(lambda: PoemCorpus(corpus_path_for(json_path)))
+        size = os.path.getsize(corpus_path_for(json_path))
+
+        n = args.poems
+        print(f"{n} 首：解析为 Poem {parsed:.2f}s（{n / parsed:,.0f} 首/秒，含校验与切句），"
+              f"编译语料库 {built:.2f}s，文件 {size / 2**20:.1f}MiB")
+        # Poem 与字典引用同一批字段字符串，两者的差别在容器本身和预存的派生数据
+        strings = sum(sys.getsizeof(value) for poem in dicts for value in poem.values()) / n
+        split, split_bytes = _traced(lambda: [_render_dict(poem)[0] for poem in dicts])
+        print(f"  字段字符串                      {strings:>8.0f} B/首")
+        print(f"  字典容器                        {dict_bytes / n - strings:>8.0f} B/首")
+        print(f"  字典容器 + 预先切好的分句列表   {(dict_bytes + split_bytes) / n - strings:>8.0f} B/首")
+        print(f"  Poem（含诗句位置与规范化正文）  {model_bytes / n:>8.0f} B/首")
+        print(f"  mmap 语料库（进程堆）           {corpus_bytes / n:>8.2f} B/首，正文在页缓存中由各进程共享")
+        del split
+
+        picks = [rng.randrange(n) for _ in range(args.renders)]
+        rows = [
+            ("原始字典：每次切分句", _per_op(lambda i: _render_dict(dicts[i]), picks)),
+            ("Poem：预存诗句位置", _per_op(lambda i: _render_model(poems[i]), picks)),
+            ("语料库记录：预存诗句位置", _per_op(lambda i: _render_model(corpus[i]), picks)),
+        ]
+        for label, per_poem in rows:
+            print(f"  {label:<14}{per_poem:>8.2f}µs/首")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""学习进度写入基准：对比每次答题单独提交与写线程按批提交
+
+用法：python -m benchmarks.bench_progress --users 40 --answers 50
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from utils.progress import SCHEMA, ProgressStore
+
+
+def _run_users(users, answers, record):
+    latencies = []
+    lock = threading.Lock()
+
+    def user(i):
+        local = []
+        for n in range(answers):
+            start = time.perf_counter()
+            record(f"user{i}", n % 97, n % 3 != 0)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def _percentile(values, q):
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=40, help="同时答题的用户数")
+    parser.add_argument("--answers", type=int, default=50, help="每个用户的答题数")
+    args = parser.parse_args()
+    total = args.users * args.answers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 每次答题在页面线程里直接开事务写库
+        direct_path = os.path.join(tmp, "direct.db")
+        setup = sqlite3.connect(direct_path)
+        setup.execute("PRAGMA journal_mode=WAL")
+        setup.executescript(SCHEMA)
+        setup.close()
+        local = threading.local()
+
+        def direct_record(user, poem_idx, correct):
+            conn = getattr(local, 'conn', None)
+            if conn is None:
+                conn = local.conn = sqlite3.connect(direct_path, timeout=60)
+            with conn:
+                conn.execute("INSERT INTO attempts (user_id, poem_idx, correct, ts) VALUES (?, ?, ?, ?)",
+                             (user, poem_idx, correct, time.time()))
+
+        wall, latencies = _run_users(args.users, args.answers, direct_record)
+        print(f"逐条提交：{total / wall:,.0f} 条/秒，页面线程耗时 p50 {_percentile(latencies, 0.5) * 1000:.2f}ms"
+              f" / p99 {_percentile(latencies, 0.99) * 1000:.2f}ms")
+
+        store = ProgressStore(os.path.join(tmp, "batched.db"))
+        wall, latencies = _run_users(
+            args.users, args.answers,
+            lambda user, poem_idx, correct: store.record_attempt(user, poem_idx, correct))
+        start = time.perf_counter()
+        store.flush()
+        wall += time.perf_counter() - start
+        print(f"按批提交：{total / wall:,.0f} 条/秒（含落盘），页面线程耗时 p50 "
+              f"{_percentile(latencies, 0.5) * 1000:.3f}ms / p99 {_percentile(latencies, 0.99) * 1000:.3f}ms，"
+              f"共 {store.batches} 批")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
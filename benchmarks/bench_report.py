@@ -0,0 +1,54 @@
+"""学习报告基准：不同语料规模下掌握度视图一次重跑的开销
+
+原实现每首诗渲染一对列、一个进度条和一个说明，元素数随语料线性增长；
+新视图只在用户答过的诗上筛选排序，未学习的诗按页推算，并且只渲染一页。
+
+用法：python -m benchmarks.bench_report --sizes 1000 50000 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import load_corpus
+from utils.mastery import MasteryView, build_author_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 50000, 200000])
+    parser.add_argument("--seen", type=int, default=300, help="用户答过的诗数")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            json_path = os.path.join(tmp, f"poems{size}.json")
+            write_poems(json_path, size)
+            poems = load_corpus(json_path)
+            authors = build_author_codes(poems)
+
+            rng = random.Random(size)
+            now = time.time()
+            mastery = {i: (rng.random(), rng.randint(1, 5), now - rng.random() * 60 * 86400)
+                       for i in rng.sample(range(size), min(args.seen, size))}
+
+            timings = []
+            for filters in (dict(author="李", band="薄弱", sort="掌握度从低到高", page=1),
+                            dict(sort="掌握度从低到高", page=3)):
+                start = time.perf_counter()
+                for _ in range(args.reruns):
+                    view = MasteryView(authors, mastery, now)
+                    view.band_counts()
+                    result = view.query(**filters)
+                    view.rows(poems, result.indices)
+                timings.append((time.perf_counter() - start) / args.reruns)
+            print(f"{size:>7} 首：每次重跑 {timings[0] * 1000:6.2f}ms（按作者与档位筛选），"
+                  f"{timings[1] * 1000:6.2f}ms（全部诗歌，含未学习），渲染 {len(result.indices)} 行"
+                  f"（原实现需 {size * 4:,} 个页面元素）")
+
+
+if __name__ == "__main__":
+    main()
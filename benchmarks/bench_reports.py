@@ -0,0 +1,104 @@
+"""批量学习报告基准：整班学生的文本、CSV、HTML 报告写入 zip 的耗时与主进程内存
+
+进度库按合成数据直接写入汇总表与掌握度表。对照组为逐个学生调用进度库接口、渲染后全部留在内存里再打包。
+
+用法：python -m benchmarks.bench_reports --students 1000 --poems-per-student 120 --workers 1 4
+"""
+import argparse
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import load_corpus
+from utils.progress import SCHEMA, ProgressStore
+from utils.report import generate_reports, list_users, render_csv, render_html, render_text, student_report
+
+
+def _fill(db_path, students, per_student, corpus_size, rng):
+    """写入合成的学生汇总与逐首掌握度"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    now = time.time()
+    for s in range(students):
+        user = f"student{s:05d}"
+        seen = rng.sample(range(corpus_size), min(corpus_size, rng.randint(per_student // 2, per_student * 3 // 2)))
+        rows = []
+        attempts = correct = 0
+        for idx in seen:
+            n = rng.randint(1, 6)
+            ok = sum(rng.random() < 0.65 for _ in range(n))
+            attempts += n
+            correct += ok
+            rows.append((user, idx, n, ok, rng.random(), now - rng.uniform(0, 60 * 86400)))
+        conn.executemany("INSERT INTO mastery VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT INTO summary VALUES (?, ?, ?, ?, ?, ?)",
+                     (user, attempts, correct, rng.randint(0, 10), len(seen), now))
+    conn.commit()
+    conn.close()
+
+
+def _one_by_one(db_path, poems):
+    """对照：逐个学生走进度库接口，三种报告都留在内存里，最后一次打包"""
+    store = ProgressStore(db_path)
+    reports = {}
+    for user in list_users(db_path):
+        report = student_report(user, store.summary(user), store.mastery(user))
+        reports[user] = (render_text(report, poems), render_csv(report, poems), render_html(report, poems))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for user, (text, table, page) in reports.items():
+            zf.writestr(f"students/{user}.txt", text)
+            zf.writestr(f"students/{user}.csv", table)
+            zf.writestr(f"students/{user}.html", page)
+    store.close()
+    return len(reports)
+
+
+def _measure(func):
+    """先计时，再在 tracemalloc 下重跑一次取主进程峰值（追踪会让分配密集的渲染慢好几倍）"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--poems-per-student", type=int, default=120, help="每个学生平均学过的诗数")
+    parser.add_argument("--corpus", type=int, default=20000, help="合成语料库的诗歌数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = write_poems(os.path.join(tmp, "poems.json"), args.corpus)
+        poems = load_corpus(json_path)
+        db_path = os.path.join(tmp, "progress.db")
+        _fill(db_path, args.students, args.poems_per_student, len(poems), rng)
+        print(f"{args.students} 名学生，平均每人 {args.poems_per_student} 首，语料 {args.corpus} 首")
+
+        count, elapsed, peak = _measure(lambda: _one_by_one(db_path, poems))
+        print(f"  逐个学生、全部留在内存  {elapsed:6.2f}s（{count / elapsed:7.1f} 人/秒），主进程峰值 {peak / 2**20:7.1f}MiB")
+
+        for workers in args.workers:
+            output = os.path.join(tmp, f"reports{workers}.zip")
+            stats, elapsed, peak = _measure(
+                lambda: generate_reports(db_path, output, json_path, workers=workers))
+            size = os.path.getsize(output)
+            print(f"  进程池 {workers:>2} 个、流式写 zip  {elapsed:6.2f}s（{stats.students / elapsed:7.1f} 人/秒），"
+                  f"主进程峰值 {peak / 2**20:7.1f}MiB，zip {size / 2**20:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
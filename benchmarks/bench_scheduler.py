@@ -0,0 +1,51 @@
+"""复习调度基准：大量用户同时在线时的取题耗时与内存占用
+
+用法：python -m benchmarks.bench_scheduler --users 5000 --reviews 200 --poems 50000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from utils.scheduler import DAY, Scheduler
+
+
+def _simulate(scheduler, users, reviews, rng, start):
+    """每个用户按调度器出题作答，模拟若干天的学习"""
+    for u in range(users):
+        user_id = f"user{u}"
+        now = start
+        for _ in range(reviews):
+            item = scheduler.next_item(user_id, now)
+            scheduler.record(user_id, item.poem_idx, rng.random() < 0.7, now=now)
+            now += rng.random() * DAY / 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=200, help="每个用户的答题数")
+    parser.add_argument("--poems", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = time.time()
+    scheduler = Scheduler(args.poems, rng=random.Random(1))
+    began = time.perf_counter()
+    _simulate(scheduler, args.users, args.reviews, rng, start)
+    elapsed = time.perf_counter() - began
+    ops = args.users * args.reviews
+    print(f"{args.users} 个用户各答 {args.reviews} 题：取题+更新 {elapsed / ops * 1e6:.1f}µs/次")
+
+    # 单独测内存，避免 tracemalloc 的开销影响计时
+    tracemalloc.start()
+    scheduler = Scheduler(args.poems, rng=random.Random(1))
+    _simulate(scheduler, args.users, args.reviews, random.Random(0), start)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"调度状态共 {current / 2**20:.1f}MiB，每用户 {current / args.users / 1024:.1f}KiB"
+          f"（估算 {scheduler.nbytes() / args.users / 1024:.1f}KiB）")
+
+
+if __name__ == "__main__":
+    main()
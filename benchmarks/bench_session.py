@@ -0,0 +1,68 @@
+"""会话内存基准：对比原先不断追加字典的答题列表与定长答题日志
+
+用法：python -m benchmarks.bench_session --sessions 1000 --answers 500
+"""
+import argparse
+import random
+import tracemalloc
+
+from benchmarks.synthetic import make_poems
+from utils.session import SessionLog
+
+
+def _legacy_session(rng, poems, answers):
+    """原实现：每次提交追加一个带标题、作答与正确答案的字典"""
+    state = {'score': 0, 'total_attempts': 0, 'user_answers': []}
+    for _ in range(answers):
+        poem = rng.choice(poems)
+        answer = poem['content'][:12]
+        correct = rng.random() < 0.7
+        state['total_attempts'] += 1
+        state['score'] += correct
+        state['user_answers'].append({
+            "poem": poem['title'],
+            "user_answer": answer if correct else answer[::-1],
+            "correct": correct,
+            "correct_answer": answer,
+        })
+    return state
+
+
+def _compact_session(rng, poems, answers):
+    log = SessionLog()
+    for _ in range(answers):
+        idx = rng.randrange(len(poems))
+        answer = poems[idx]['content'][:12]
+        correct = rng.random() < 0.7
+        log.record(idx, idx * 8, correct, answer if correct else answer[::-1])
+    return log
+
+
+def _measure(build, sessions, answers, poems):
+    rng = random.Random(0)
+    tracemalloc.start()
+    kept = [build(rng, poems, answers) for _ in range(sessions)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--answers", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    # 诗歌字符串在会话之外共享，不计入会话内存
+    poems = make_poems(2000)
+    for answers in args.answers:
+        legacy = _measure(_legacy_session, args.sessions, answers, poems)
+        compact = _measure(_compact_session, args.sessions, answers, poems)
+        print(f"每会话 {answers:>4} 次答题：原字典列表 {legacy / 1024:7.1f}KiB，"
+              f"定长日志 {compact / 1024:5.1f}KiB；{args.sessions} 个会话合计 "
+              f"{legacy * args.sessions / 2**20:.1f}MiB → {compact * args.sessions / 2**20:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
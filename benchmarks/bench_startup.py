@@ -0,0 +1,116 @@
+"""冷启动基准：首屏渲染耗时，各页面模块的导入耗时、首次打开与重跑耗时
+
+每项测量都在新的 Python 进程中进行（streamlit 本身的导入不计入）。“改造前”取指定提交
+（默认为引入本基准之前的提交）中的单文件 app.py，启动时导入全部依赖；“改造后”为当前按页面拆分、按需加载的 app.py。
+
+用法：python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from views import PAGES
+
+# 子进程：测量首屏（首页）渲染，可选再切换到某个页面测量首次打开与之后重跑的耗时
+_RENDER = """
+import json, sys, time
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# 与服务端一样，同一进程内复用编译好的脚本（AppTest 默认每次运行都重新编译）
+shared_cache = ScriptCache()
+init = LocalScriptRunner.__init__
+def cached_init(self, *args, **kwargs):
+    init(self, *args, **kwargs)
+    self._script_cache = shared_cache
+LocalScriptRunner.__init__ = cached_init
+
+script, page = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+at = AppTest.from_file(script, default_timeout=120).run()
+first = time.perf_counter() - start
+opened = rerun = 0.0
+if page:
+    start = time.perf_counter()
+    at.sidebar.selectbox[0].select(page).run()
+    opened = time.perf_counter() - start
+    reruns = []
+    for _ in range(5):
+        start = time.perf_counter()
+        at.run()
+        reruns.append(time.perf_counter() - start)
+    rerun = sorted(reruns)[2]
+assert not at.exception, at.exception
+print(json.dumps([first, opened, rerun]))
+"""
+
+# 子进程：只导入一个页面模块
+_IMPORT = """
+import importlib, json, sys, time
+import streamlit
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps(time.perf_counter() - start))
+"""
+
+
+def _child(code, *args):
+    result = subprocess.run([sys.executable, "-c", code, *args], check=True,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _median(values):
+    return statistics.median(values) * 1000
+
+
+def _default_baseline(root):
+    """引入本基准的提交的上一个提交，即改造前的代码"""
+    added = subprocess.run(["git", "log", "--diff-filter=A", "--format=%H", "--",
+                            os.path.relpath(os.path.abspath(__file__), root)],
+                           cwd=root, check=True, capture_output=True, text=True).stdout.split()
+    if not added:
+        raise SystemExit("无法确定改造前的提交，请用 --baseline 指定")
+    return f"{added[-1]}~1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", help="改造前 app.py 所在的提交，默认为引入本基准的提交的上一个提交")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(root)  # 应用按相对路径读取 data/
+    current = os.path.join(root, "app.py")
+    baseline_rev = args.baseline or _default_baseline(root)
+    source = subprocess.run(["git", "show", f"{baseline_rev}:app.py"], check=True,
+                            capture_output=True).stdout
+    with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as f:
+        f.write(source)
+        baseline = f.name
+
+    try:
+        before = [_child(_RENDER, baseline, "")[0] for _ in range(args.repeat)]
+        after = [_child(_RENDER, current, "")[0] for _ in range(args.repeat)]
+        print(f"首屏渲染（{args.repeat} 次中位数）：改造前 {_median(before):.0f}ms，改造后 {_median(after):.0f}ms")
+
+        print("各页面：模块导入 / 首次打开 / 重跑（改造前 → 改造后）")
+        for label, module in PAGES.items():
+            imported = [_child(_IMPORT, module) for _ in range(args.repeat)]
+            runs_before = [_child(_RENDER, baseline, label) for _ in range(args.repeat)]
+            runs_after = [_child(_RENDER, current, label) for _ in range(args.repeat)]
+            print(f"  {label}：导入 {_median(imported):6.1f}ms，首次打开 "
+                  f"{_median([r[1] for r in runs_before]):6.1f}ms → {_median([r[1] for r in runs_after]):6.1f}ms，"
+                  f"重跑 {_median([r[2] for r in runs_before]):6.1f}ms → {_median([r[2] for r in runs_after]):6.1f}ms")
+    finally:
+        os.remove(baseline)
+
+
+if __name__ == "__main__":
+    main()
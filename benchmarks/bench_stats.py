@@ -0,0 +1,69 @@
+"""语料统计基准：对比读入整个列表多次遍历与一次流式遍历、并行分片合并、读取缓存
+
+用法：python -m benchmarks.bench_stats --poems 50000 --workers 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.synthetic import make_poems
+from utils.corpus import build_corpus, line_texts
+from utils.prosody import analyze_poem
+from utils.stats import CorpusStats, build_stats, stats_path_for
+
+
+def _legacy_stats(json_path):
+    """原做法：整个列表读进内存，每项统计各遍历一次"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        poems = json.load(f)
+    return {
+        'total': len(poems),
+        'authors': Counter(poem['author'] for poem in poems),
+        'dynasties': Counter(poem['dynasty'] for poem in poems),
+        'chars': Counter(ch for poem in poems for line in line_texts(poem['content']) for ch in line),
+        'forms': Counter(analyze_poem(poem['content']).form for poem in poems),
+        'lengths': Counter(sum(map(len, line_texts(poem['content']))) for poem in poems),
+    }
+
+
+def _measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    # 内存单独再跑一遍测量，tracemalloc 会显著拖慢计时
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label}：{elapsed * 1000:9.1f}ms，主进程峰值内存 {peak / 2**20:6.1f}MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "poems.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(make_poems(args.poems), f, ensure_ascii=False)
+        build_corpus(json_path)
+
+        print(f"{args.poems} 首诗：")
+        _measure("多次遍历", lambda: _legacy_stats(json_path))
+        _measure("一次流式遍历", lambda: build_stats(json_path, workers=1))
+        _measure(f"{args.workers} 进程分片", lambda: build_stats(json_path, workers=args.workers, chunk_size=5000))
+
+        def cached():
+            with open(stats_path_for(json_path), 'r', encoding='utf-8') as f:
+                CorpusStats.from_dict(json.load(f))
+        _measure("读取缓存", cached)
+
+
+if __name__ == "__main__":
+    main()
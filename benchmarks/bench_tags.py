@@ -0,0 +1,78 @@
+"""标签索引基准：主题 + 意象组合查询、单首标签与推荐，对比逐首扫描标签列表
+
+先报告批量标注与打开索引的耗时、索引文件大小，再分别测量每次操作的平均耗时。
+
+用法：python -m benchmarks.bench_tags --poems 200000 --queries 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import write_poems
+from utils.corpus import load_corpus
+from utils.tags import IMAGERY, TAGS, THEMES, TagIndex, build_tags, tag_poem, tags_path_for
+
+
+def _per_op(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--poems", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=500, help="索引查询的次数")
+    parser.add_argument("--scans", type=int, default=10, help="逐首扫描的次数（很慢）")
+    parser.add_argument("--workers", type=int, default=None, help="批量标注的进程数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = write_poems(os.path.join(tmp, "poems.json"), args.poems)
+        corpus = load_corpus(json_path)
+
+        start = time.perf_counter()
+        counts = build_tags(json_path, workers=args.workers)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        index = TagIndex(tags_path_for(json_path), corpus)
+        opened = time.perf_counter() - start
+        size = os.path.getsize(tags_path_for(json_path))
+        print(f"{args.poems} 首 / {len(TAGS)} 个标签：批量标注 {built:.1f}s，打开 {opened * 1000:.2f}ms，"
+              f"索引文件 {size / 2**20:.2f}MiB")
+
+        # 对照：每首诗的标签集合放在内存列表里逐首筛选
+        tag_sets = [{TAGS[i] for i in tag_poem(content)} for content in corpus.column('content')]
+        present = [word for word in IMAGERY if counts[word]]
+        pairs = [(rng.choice(THEMES), rng.choice(present)) for _ in range(args.queries)]
+        triples = [(rng.choice(THEMES), *rng.sample(present, 2)) for _ in range(args.queries)]
+        themes = [rng.choice(THEMES) for _ in range(args.queries)]
+        docs = [rng.randrange(len(corpus)) for _ in range(args.queries)]
+
+        def scan(tags):
+            return [i for i, tagged in enumerate(tag_sets) if tagged.issuperset(tags)]
+
+        def scan_related(doc):
+            own = tag_sets[doc]
+            scores = sorted(((-len(own & tagged), i) for i, tagged in enumerate(tag_sets) if i != doc))
+            return scores[:3]
+
+        rows = [
+            ("单个主题", _per_op(lambda t: scan((t,)), themes[:args.scans]), _per_op(lambda t: index.query((t,)), themes)),
+            ("主题 + 意象", _per_op(scan, pairs[:args.scans]), _per_op(index.query, pairs)),
+            ("主题 + 两个意象", _per_op(scan, triples[:args.scans]), _per_op(index.query, triples)),
+            ("共同标签最多的诗", _per_op(scan_related, docs[:args.scans]), _per_op(index.related, docs)),
+        ]
+        for label, scanned, indexed in rows:
+            print(f"  {label:<10}逐首扫描 {scanned:>10.1f}µs，索引 {indexed:>7.1f}µs（{scanned / indexed:,.0f}×）")
+        tags_of = _per_op(index.tags_of, docs)
+        seeded = _per_op(lambda pair: index.creation_seed(pair[:1], pair[1:], rng), pairs)
+        print(f"  单首标签 {tags_of:.1f}µs，创作选参考诗与同现意象 {seeded:.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""对诗挑战的填空题库
+
+为每首诗按若干个种子预先生成填空题：选定的诗句位置、挖空位置与难度星级。
+诗句按语料库预存的位置组合成以句末标点收尾的整句，出题与读题都不再切分正文。
+题库存为定长记录的二进制文件，题目编号 = 诗歌序号 × 每首题数 + 种子，
+按编号 O(1) 读取，会话中只需保存一个整数。
+"""
+import argparse
+import math
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Tuple
+
+from utils.corpus import PoemCorpus, corpus_path_for, load_corpus
+
+MAGIC = b'PEMQ'
+# 2：整句改由语料库预存的诗句位置组合，挖空位置不再含标点
+VERSION = 2
+# 文件头：魔数、版本号、保留位、诗歌数量、每首诗的题目数
+HEADER = struct.Struct('<4sHHII')
+# 每道题：诗句在正文中的起止位置、挖空位掩码、难度星级
+RECORD = struct.Struct('<HHIB')
+
+DEFAULT_SEEDS = 8
+MAX_BLANKS = 3
+MAX_SENTENCE_CHARS = 32  # 挖空位掩码的位数上限
+BLANK = "___"
+# 整句在这些标点处结束，其余标点（逗号等）只分隔句内的诗句
+SENTENCE_ENDS = frozenset('。！？；.!?;')
+
+
+class ClozeQuestion(NamedTuple):
+    qid: int
+    poem_idx: int
+    answer: str
+    display: str
+    difficulty: int
+
+
+def bank_path_for(json_path):
+    """返回JSON数据文件对应的题库路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.cloze'
+
+
+def sentence_units(content, spans) -> List[Tuple[int, int]]:
+    """把预存的诗句位置（sentence_spans 格式）合成整句，返回每句的 (起, 止)，不含句末标点"""
+    units = []
+    first = None
+    last = len(spans) // 3 - 1
+    for i, (start, end, stop) in enumerate(zip(spans[0::3], spans[1::3], spans[2::3])):
+        if first is None:
+            first = start
+        if i == last or not SENTENCE_ENDS.isdisjoint(content[end:stop]):
+            units.append((first, end))
+            first = None
+    return units
+
+
+def _words(content, line_spans, start, end):
+    """整句 [start, end) 内各诗句连起来的字，不含标点"""
+    return ''.join(content[s:e] for s, e in line_spans if start <= s and e <= end)
+
+
+def _splitmix64(x):
+    """SplitMix64 整数散列，比每题新建 random.Random 快一个数量级"""
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+def make_question(content, spans, poem_idx, seed, char_bits):
+    """由 (诗歌序号, 种子) 确定性地生成一道填空题，返回 (起, 止, 挖空掩码, 信息量得分)
+
+    spans 为语料库预存的诗句位置（sentence_spans 格式）。
+    """
+    units = sentence_units(content, spans)
+    if not units:
+        return 0, 0, 0, 0.0
+    state = _splitmix64(poem_idx << 16 | seed)
+    start, end = units[state % len(units)]
+    words = _words(content, zip(spans[0::3], spans[1::3]), start, end)[:MAX_SENTENCE_CHARS]
+
+    # 不放回地抽取挖空位置
+    positions = list(range(len(words)))
+    hidden = []
+    for _ in range(min(MAX_BLANKS, len(words))):
+        state = _splitmix64(state)
+        hidden.append(positions.pop(state % len(positions)))
+
+    mask = 0
+    for i in hidden:
+        mask |= 1 << i
+    # 难度：被挖掉的字越生僻、诗句越长越难
+    score = sum(char_bits.get(words[i], 0.0) for i in hidden) + len(words) / 7
+    return start, end, mask, score
+
+
+def _char_bits(contents):
+    """每个字在语料中的信息量（比特），出现越少越大"""
+    counts = Counter()
+    for content in contents:
+        counts.update(content)
+    total = sum(counts.values()) or 1
+    return {ch: math.log2(total / n) for ch, n in counts.items()}
+
+
+_worker_corpus = None
+_worker_bits = None
+
+
+def _init_worker(bin_path, char_bits):
+    global _worker_corpus, _worker_bits
+    _worker_corpus = PoemCorpus(bin_path)
+    _worker_bits = char_bits
+
+
+def _generate_chunk(args):
+    start, stop, seeds = args
+    items = []
+    for poem_idx in range(start, stop):
+        content = _worker_corpus.field(poem_idx, 'content')
+        spans = _worker_corpus.spans(poem_idx)
+        for seed in range(seeds):
+            items.append(make_question(content, spans, poem_idx, seed, _worker_bits))
+    return items
+
+
+def build_bank(json_path, bank_path=None, seeds=DEFAULT_SEEDS, workers=None, chunk_size=2000):
+    """为整个语料库生成题库，按诗歌分块并行生成，返回题目总数"""
+    bank_path = bank_path or bank_path_for(json_path)
+    corpus = load_corpus(json_path)
+    char_bits = _char_bits(corpus.column('content'))
+    chunks = [(i, min(i + chunk_size, len(corpus)), seeds) for i in range(0, len(corpus), chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(corpus.path, char_bits)
+        results = map(_generate_chunk, chunks)
+        items = [item for chunk in results for item in chunk]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(corpus.path, char_bits)) as pool:
+            items = [item for chunk in pool.map(_generate_chunk, chunks) for item in chunk]
+
+    # 按得分三等分，映射为 1~3 颗星
+    scores = sorted(score for _, _, _, score in items)
+    cutoffs = (scores[len(scores) // 3], scores[len(scores) * 2 // 3]) if scores else (0, 0)
+
+    tmp_path = f"{bank_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(corpus), seeds))
+        for start, end, mask, score in items:
+            stars = 1 + (score > cutoffs[0]) + (score > cutoffs[1])
+            f.write(RECORD.pack(start, end, mask, stars))
+    os.replace(tmp_path, bank_path)
+    return len(items)
+
+
+class ClozeBank:
+    """只读题库，题目按编号从映射文件中直接读取"""
+
+    def __init__(self, bank_path, corpus):
+        self.path = bank_path
+        self._corpus = corpus
+        with open(bank_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, seeds = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or count != len(corpus):
+            self._mm.close()
+            raise ValueError(f"题库与语料库不匹配: {bank_path}")
+        self.seeds = seeds
+
+    def __len__(self):
+        return len(self._corpus) * self.seeds
+
+    def qid_for(self, poem_idx, seed):
+        """由诗歌序号和种子计算题目编号"""
+        return poem_idx * self.seeds + seed % self.seeds
+
+    def random_qid(self, rng=random):
+        """随机抽取一道题的编号"""
+        return rng.randrange(len(self))
+
+    def question(self, qid) -> ClozeQuestion:
+        """按编号读取题目；编号超出题库范围时抛出 IndexError"""
+        if not 0 <= qid < len(self):
+            raise IndexError(f"题目编号超出范围: {qid}")
+        poem_idx = qid // self.seeds
+        start, end, mask, stars = RECORD.unpack_from(self._mm, HEADER.size + qid * RECORD.size)
+        content = self._corpus.field(poem_idx, 'content')
+        words = _words(content, self._corpus.line_spans(poem_idx), start, end)
+        display = ''.join(BLANK if mask >> i & 1 else ch for i, ch in enumerate(words))
+        return ClozeQuestion(qid, poem_idx, content[start:end], display, stars)
+
+
+_bank_cache = {}
+_bank_lock = threading.Lock()
+
+
+def load_bank(json_path='data/poems.json'):
+    """加载共享题库，缺失或早于语料库时在本进程内重新生成"""
+    json_path = os.path.abspath(json_path)
+    with _bank_lock:
+        bank = _bank_cache.get(json_path)
+        if bank is not None:
+            return bank
+
+        corpus = load_corpus(json_path)
+        bank_path = bank_path_for(json_path)
+        stale = (not os.path.exists(bank_path)
+                 or os.path.getmtime(bank_path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            build_bank(json_path, bank_path, workers=1)
+
+        try:
+            bank = ClozeBank(bank_path, corpus)
+        except ValueError:
+            build_bank(json_path, bank_path, workers=1)
+            bank = ClozeBank(bank_path, corpus)
+        _bank_cache[json_path] = bank
+        return bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对诗挑战题库工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="为整个语料库生成填空题库")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .cloze 文件")
+    build.add_argument('--seeds', type=int, default=DEFAULT_SEEDS, help="每首诗生成的题目数")
+    build.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        total = build_bank(args.json_path, args.output, args.seeds, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"已生成 {total} 道填空题，用时 {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
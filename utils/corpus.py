@@ -0,0 +1,362 @@
+"""只读诗歌语料库
+
+构建阶段（`python -m utils.corpus build`）把 data/poems.json 逐首校验、解析为 Poem
+（切好诗句位置、算好规范化正文），编译为按列存储的二进制文件；运行时通过 mmap 只读映射，
+字段在访问时才解码，诗句与分句按预存的位置切片，页面重跑时不再解析正文。同一进程内所有会话共享同一个语料库对象，同一主机上的多个 Streamlit
+工作进程共享同一份页缓存，每次重跑都不再复制整个诗歌列表。
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, List, Tuple
+
+from utils.grading import normalize
+from utils.validator import validate_poem_data
+
+FIELDS = ('title', 'author', 'dynasty', 'content', 'translation', 'explanation')
+# 构建时派生的字符串列
+COLUMNS = FIELDS + ('normalized',)
+# 诗句位置按 uint16 存储
+MAX_CONTENT_CHARS = 0xFFFF
+
+# 全库唯一的诗句切分规则：构建时预存的诗句位置、格律分析、语言模型、检索与填空题都按它切分
+LINE_RE = re.compile(r'[^，。！？；：、,.!?;:\s“”"《》]+')
+
+MAGIC = b'PEMC'
+VERSION = 3
+# 文件头：魔数、版本号、列数、诗歌数量
+HEADER = struct.Struct('<4sHHI')
+# 每列一项：偏移表位置、字符串区位置；最后一项为诗句位置的偏移表与位置区
+FIELD_ENTRY = struct.Struct('<QQ')
+
+
+def split_lines(content) -> List[Tuple[int, int]]:
+    """按标点切分正文，返回每句的 (起, 止) 位置"""
+    return [match.span() for match in LINE_RE.finditer(content)]
+
+
+def line_texts(text) -> List[str]:
+    """按标点切分任意文本，返回不含标点的诗句；语料库中的诗请直接用预存位置（PoemShape.lines）"""
+    return LINE_RE.findall(text)
+
+
+def sentence_spans(content) -> List[int]:
+    """每句三个位置依次排列：起、止（不含标点）、分句止（含句末标点，到下一句开头为止）"""
+    spans = split_lines(content)
+    positions = []
+    for i, (start, end) in enumerate(spans):
+        stop = spans[i + 1][0] if i + 1 < len(spans) else len(content)
+        while stop > end and content[stop - 1].isspace():
+            stop -= 1
+        positions += (start, end, stop)
+    return positions
+
+
+class PoemShape(ABC):
+    """Poem 与 PoemRecord 共用的派生属性，都按预存的位置切片，不再解析正文
+
+    子类实现 _spans()，返回 sentence_spans 格式的位置序列。
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def _spans(self) -> Sequence[int]:
+        """sentence_spans 格式的位置序列"""
+
+    @property
+    def lines(self) -> Tuple[str, ...]:
+        """不含标点的诗句"""
+        spans = self._spans()
+        return tuple(map(self['content'].__getitem__, map(slice, spans[0::3], spans[1::3])))
+
+    @property
+    def sentences(self) -> Tuple[str, ...]:
+        """带句末标点的分句，逐句显示时使用"""
+        spans = self._spans()
+        return tuple(map(self['content'].__getitem__, map(slice, spans[0::3], spans[2::3])))
+
+    @property
+    def char_count(self) -> int:
+        """正文字数，不计标点"""
+        spans = self._spans()
+        return sum(spans[1::3]) - sum(spans[0::3])
+
+
+class Poem(PoemShape):
+    """校验并解析过的一首诗：各字段、诗句位置与规范化正文，构建语料库时生成一次"""
+
+    __slots__ = FIELDS + ('normalized', 'spans')
+
+    def __init__(self, title, author, dynasty, content, translation, explanation):
+        self.title = title
+        self.author = author
+        self.dynasty = dynasty
+        self.content = content
+        self.translation = translation
+        self.explanation = explanation
+        self.normalized = normalize(content)
+        self.spans = array('H', sentence_spans(content))
+
+    @classmethod
+    def from_dict(cls, data) -> 'Poem':
+        """校验一条诗歌数据并解析，不合格时抛出 ValueError"""
+        ok, message = validate_poem_data(data)
+        if not ok:
+            raise ValueError(message)
+        if len(data['content']) > MAX_CONTENT_CHARS:
+            raise ValueError("诗歌内容过长")
+        return cls(*(str(data[field]) for field in FIELDS))
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def _spans(self):
+        return self.spans
+
+    def to_dict(self) -> Dict[str, str]:
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return f"Poem({self.title!r}, {self.author!r})"
+
+
+def corpus_path_for(json_path):
+    """返回JSON数据文件对应的二进制语料库路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.bin'
+
+
+def write_corpus_file(poems: Iterable[Poem], bin_path):
+    """按列写入二进制语料库文件（原子替换）
+
+    每个字符串列：count+1 个 uint32 偏移量，后接该列全部诗歌的 UTF-8 字节；
+    诗句位置：count+1 个 uint32 偏移量，后接全部诗歌依次排列的 uint16 位置（见 sentence_spans）。
+    """
+    poems = list(poems)
+    columns = []
+    for name in COLUMNS:
+        offsets = array('I', [0])
+        chunks = []
+        for poem in poems:
+            data = getattr(poem, name).encode('utf-8')
+            chunks.append(data)
+            offsets.append(offsets[-1] + len(data))
+        columns.append((offsets, b''.join(chunks)))
+    span_ptr = array('I', [0])
+    spans = array('H')
+    for poem in poems:
+        spans.extend(poem.spans)
+        span_ptr.append(len(spans))
+    columns.append((span_ptr, spans.tobytes()))
+
+    pos = HEADER.size + FIELD_ENTRY.size * len(columns)
+    entries = []
+    for offsets, blob in columns:
+        entries.append((pos, pos + len(offsets) * offsets.itemsize))
+        pos += len(offsets) * offsets.itemsize + len(blob)
+
+    tmp_path = f"{bin_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS), len(poems)))
+        for entry in entries:
+            f.write(FIELD_ENTRY.pack(*entry))
+        for offsets, blob in columns:
+            f.write(offsets.tobytes())
+            f.write(blob)
+    os.replace(tmp_path, bin_path)
+
+
+def build_corpus(json_path, bin_path=None):
+    """编译语料库：逐首校验诗歌数据，跳过不合格的记录
+
+    返回 (写入数量, 错误列表)，错误项为 (序号, 错误信息)。
+    """
+    bin_path = bin_path or corpus_path_for(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        raw_poems = json.load(f)
+
+    poems, errors = [], []
+    for i, data in enumerate(raw_poems):
+        try:
+            poems.append(Poem.from_dict(data))
+        except ValueError as e:
+            errors.append((i, str(e)))
+
+    write_corpus_file(poems, bin_path)
+    return len(poems), errors
+
+
+class PoemRecord(PoemShape, Mapping):
+    """单首诗的只读视图，每个字段在首次访问时才单独解码"""
+
+    __slots__ = ('_corpus', '_idx', '_cache')
+
+    def __init__(self, corpus, idx):
+        self._corpus = corpus
+        self._idx = idx
+        self._cache = {}
+
+    def __getitem__(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            value = self._corpus.field(self._idx, key)
+            self._cache[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    @property
+    def index(self):
+        """该诗在语料库中的序号"""
+        return self._idx
+
+    @property
+    def normalized(self) -> str:
+        """规范化正文（繁转简、去标点），构建时算好"""
+        return self['normalized']
+
+    def _spans(self):
+        return self._corpus.spans(self._idx)
+
+    def __repr__(self):
+        return f"PoemRecord({self._idx}, {self['title']!r})"
+
+
+class PoemCorpus(Sequence):
+    """基于 mmap 的只读诗歌序列，支持 poems[i]['title'] 等原有访问方式
+
+    打开文件只解析文件头，字符串在访问时按需解码，冷启动与诗歌数量无关。
+    """
+
+    def __init__(self, bin_path):
+        self.path = bin_path
+        with open(bin_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ncolumns, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or ncolumns != len(COLUMNS):
+            self._mm.close()
+            raise ValueError(f"不支持的语料库文件: {bin_path}")
+        self._count = count
+
+        view = memoryview(self._mm)
+        self._columns = {}
+        for i, name in enumerate(COLUMNS):
+            offsets_pos, blob_pos = FIELD_ENTRY.unpack_from(self._mm, HEADER.size + i * FIELD_ENTRY.size)
+            offsets = view[offsets_pos:blob_pos].cast('I')
+            self._columns[name] = (offsets, blob_pos)
+        ptr_pos, spans_pos = FIELD_ENTRY.unpack_from(self._mm, HEADER.size + len(COLUMNS) * FIELD_ENTRY.size)
+        self._span_ptr = view[ptr_pos:spans_pos].cast('I')
+        self._spans = view[spans_pos:spans_pos + self._span_ptr[count] * 2].cast('H')
+
+    def field(self, idx, name):
+        """解码第 idx 首诗的单个字段"""
+        offsets, blob_pos = self._columns[name]
+        return self._mm[blob_pos + offsets[idx]:blob_pos + offsets[idx + 1]].decode('utf-8')
+
+    def spans(self, idx):
+        """第 idx 首诗各句的位置，格式见 sentence_spans（只读视图，不复制）"""
+        return self._spans[self._span_ptr[idx]:self._span_ptr[idx + 1]]
+
+    def line_spans(self, idx):
+        """第 idx 首诗各句不含标点的 (起, 止) 位置"""
+        spans = self.spans(idx)
+        return zip(spans[0::3], spans[1::3])
+
+    def column_bytes(self, name, stop=None):
+        """前 stop 首诗某个字段的 UTF-8 原始字节（连续存放的只读视图，不解码）"""
+        offsets, blob_pos = self._columns[name]
+        stop = self._count if stop is None else stop
+        return memoryview(self._mm)[blob_pos:blob_pos + offsets[stop]]
+
+    def column(self, name):
+        """按顺序遍历某个字段的全部取值，不创建记录对象"""
+        offsets, blob_pos = self._columns[name]
+        mm = self._mm
+        for i in range(self._count):
+            yield mm[blob_pos + offsets[i]:blob_pos + offsets[i + 1]].decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [PoemRecord(self, i) for i in range(*idx.indices(self._count))]
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError("诗歌序号越界")
+        return PoemRecord(self, idx)
+
+    def __repr__(self):
+        return f"PoemCorpus({self.path!r}, {self._count}首)"
+
+
+_corpus_cache = {}
+_corpus_lock = threading.Lock()
+
+
+def load_corpus(json_path='data/poems.json'):
+    """加载共享语料库，每个进程只加载一次
+
+    正常部署应预先运行 `python -m utils.corpus build`；二进制文件缺失或比JSON旧时
+    在此处补做一次编译。
+    """
+    json_path = os.path.abspath(json_path)
+    with _corpus_lock:
+        corpus = _corpus_cache.get(json_path)
+        if corpus is not None:
+            return corpus
+
+        bin_path = corpus_path_for(json_path)
+        stale = (not os.path.exists(bin_path)
+                 or os.path.getmtime(bin_path) < os.path.getmtime(json_path))
+        if stale:
+            build_corpus(json_path, bin_path)
+
+        try:
+            corpus = PoemCorpus(bin_path)
+        except ValueError:
+            # 旧版本格式的文件，重新编译
+            build_corpus(json_path, bin_path)
+            corpus = PoemCorpus(bin_path)
+        _corpus_cache[json_path] = corpus
+        return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="唐诗语料库工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="将JSON诗歌数据编译为二进制语料库")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .bin 文件")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        count, errors = build_corpus(args.json_path, args.output)
+        for idx, message in errors:
+            print(f"第{idx}首跳过：{message}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        print(f"已编译 {count} 首诗歌，用时 {elapsed:.2f}s")
+        if errors:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
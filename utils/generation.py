@@ -0,0 +1,266 @@
+"""AI创作的流式生成服务
+
+生成后端以异步生成器的形式逐段产出诗句，由一个后台事件循环统一调度：
+并发数受信号量限制，超出排队上限的请求直接拒绝，页面离开时可随时取消。
+页面脚本线程只从队列中取出已生成的片段，通过 st.write_stream 边生成边显示。
+"""
+import asyncio
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.meter import check_poem, compose_lines, highlights
+from utils.themes import STYLE_FORMS, THEME_IMAGERY
+
+
+class GenerationRequest(NamedTuple):
+    themes: Tuple[str, ...]
+    style: str
+    keywords: Tuple[str, ...]
+    seed: int
+    # 语料中与主题、关键词同现最多的意象，生成时同样提高权重
+    imagery: Tuple[str, ...] = ()
+
+
+class GenerationBusy(RuntimeError):
+    """生成服务排队已满"""
+
+
+def parse_keywords(text) -> Tuple[str, ...]:
+    """解析逗号分隔的关键词，兼容全角逗号与顿号"""
+    for sep in '，、':
+        text = text.replace(sep, ',')
+    return tuple(word.strip() for word in text.split(',') if word.strip())
+
+
+class GenerationBackend(ABC):
+    """生成后端基类：stream 逐段产出正文，compose 组装标题与说明"""
+
+    name = "base"
+
+    @abstractmethod
+    async def stream(self, request: GenerationRequest):
+        """异步生成器，按顺序产出正文片段"""
+
+    @abstractmethod
+    def compose(self, request: GenerationRequest, content: str) -> Dict[str, object]:
+        """由完整正文组装标题与说明"""
+
+
+THEME_TITLE_SUFFIX = {
+    "山水田园": "吟", "思乡怀人": "思", "边塞征战": "行", "咏物言志": "赋",
+    "送别友情": "送别", "爱情闺怨": "怨", "咏史怀古": "怀古", "节日时令": "即事",
+}
+
+
+def creation_highlights(request: GenerationRequest, content: str) -> List[str]:
+    """根据实际的格律校验结果与用字情况列出创作亮点"""
+    notes = []
+    for theme in request.themes:
+        used = [ch for ch in THEME_IMAGERY.get(theme, "") if ch in content]
+        if used:
+            notes.append(f"融入了{theme}的典型意象：{'、'.join(used)}")
+    used_keywords = [word for word in request.keywords if word in content]
+    if used_keywords:
+        notes.append(f"嵌入了关键词：{'、'.join(used_keywords)}")
+    return notes + highlights(check_poem(content))
+
+
+class NgramBackend(GenerationBackend):
+    """离线后端：用语料库训练的字级 n-gram 模型按主题、风格、关键词生成绝句
+
+    每句生成 per_line 个候选，按平仄与用韵校验得分择优。
+    """
+
+    name = "ngram"
+
+    def __init__(self, model, lines=4, delay=0.0, per_line=16):
+        self.model = model
+        self.lines = lines
+        self.delay = delay
+        self.per_line = per_line
+
+    def _form(self, request):
+        return STYLE_FORMS.get(request.style, (5, ""))
+
+    def _lines(self, request):
+        rng = random.Random(request.seed)
+        length, style_chars = self._form(request)
+        boost = style_chars + "".join(THEME_IMAGERY.get(theme, "") for theme in request.themes)
+        boost += "".join(request.keywords) + "".join(request.imagery)
+        # 关键词依次作为各句开头，较长的关键词只取前两个字
+        prefixes = [word[:2] for word in request.keywords][:self.lines]
+
+        def generate(i, _chosen):
+            prefix = prefixes[i] if i < len(prefixes) else ""
+            return self.model.generate_line(length, rng, prefix=prefix, boost=boost)
+
+        return compose_lines(generate, self.lines, self.per_line)
+
+    async def stream(self, request):
+        # 采样与校验是 CPU 密集的：每句都放到线程池里算，事件循环保持空闲，
+        # 其他会话排队中的任务照常调度，每句选定后立即发出
+        loop = asyncio.get_running_loop()
+        lines = self._lines(request)
+        for i in range(self.lines):
+            line = await loop.run_in_executor(None, next, lines)
+            text = line + ("，" if i % 2 == 0 else "。")
+            if i % 2 == 1 and i < self.lines - 1:
+                text += "\n"
+            for char in text:
+                yield char
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    def compose(self, request, content):
+        length, _ = self._form(request)
+        theme = request.themes[0] if request.themes else ""
+        head = request.keywords[0][:2] if request.keywords else THEME_IMAGERY.get(theme, "秋月")[:2]
+        title = head + THEME_TITLE_SUFFIX.get(theme, "吟")
+        imagery = "、".join(request.keywords[:3]) or "自然景物"
+        explanation = (f"以{imagery}为意象，围绕{'、'.join(request.themes)}主题，"
+                       f"按{request.style}风格写成的{'七' if length == 7 else '五'}言绝句，"
+                       f"由在唐诗语料上训练的字级语言模型逐字生成。")
+        return {"title": title, "content": content, "explanation": explanation,
+                "highlights": creation_highlights(request, content)}
+
+
+_DONE = object()
+
+
+class GenerationJob:
+    """一次生成任务，记录排队、首字、首行与完成时间"""
+
+    def __init__(self, request):
+        self.request = request
+        self.result: Optional[Dict[str, object]] = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.first_token_at = None
+        self.first_line_at = None
+        self.finished_at = None
+        # 页面脚本线程阻塞等待片段的累计时间
+        self.blocked_seconds = 0.0
+        self._chunks = queue.Queue()
+        self._future = None
+
+    def _put(self, chunk):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        if self.first_line_at is None and '\n' in chunk:
+            self.first_line_at = now
+        self._chunks.put(chunk)
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    @property
+    def time_to_first_token(self):
+        return self.first_token_at - self.submitted_at if self.first_token_at else None
+
+    @property
+    def time_to_first_line(self):
+        first_line_at = self.first_line_at or self.finished_at
+        return first_line_at - self.submitted_at if first_line_at else None
+
+    def tokens(self) -> Iterator[str]:
+        """按生成顺序产出片段，供 st.write_stream 使用；提前退出时取消任务"""
+        try:
+            while True:
+                waited = time.perf_counter()
+                chunk = self._chunks.get()
+                self.blocked_seconds += time.perf_counter() - waited
+                if chunk is _DONE:
+                    break
+                yield chunk
+            if self.error is not None:
+                raise self.error
+        finally:
+            if not self.done:
+                self.cancel()
+
+    def cancel(self):
+        """取消尚未完成的任务"""
+        if self._future is not None and not self.done:
+            self._future.cancel()
+
+
+class GenerationService:
+    """在后台事件循环中运行生成任务的有界工作池"""
+
+    def __init__(self, backend: GenerationBackend, max_workers=4, max_queue=32):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {'completed': 0, 'cancelled': 0, 'failed': 0, 'rejected': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="poem-generation", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: GenerationRequest) -> GenerationJob:
+        """提交生成任务；运行中与排队中的任务已满时抛出 GenerationBusy"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._counters['rejected'] += 1
+                raise GenerationBusy("当前创作请求过多，请稍后再试")
+            self._pending += 1
+        job = GenerationJob(request)
+        job._future = asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+        job._future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    async def _run(self, job):
+        async with self._slots:
+            job.started_at = time.perf_counter()
+            parts = []
+            try:
+                async for chunk in self.backend.stream(job.request):
+                    parts.append(chunk)
+                    job._put(chunk)
+                job.result = self.backend.compose(job.request, ''.join(parts))
+            except Exception as e:
+                job.error = e
+
+    def _finish(self, job, future):
+        # 在完成回调中记账：排队中即被取消的任务不会进入 _run
+        if future.cancelled():
+            job.cancelled = True
+            outcome = 'cancelled'
+        elif job.error is not None:
+            outcome = 'failed'
+        else:
+            outcome = 'completed'
+        job.finished_at = time.perf_counter()
+        job._chunks.put(_DONE)
+        with self._lock:
+            self._pending -= 1
+            self._counters[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """当前排队/运行数量与累计结果计数"""
+        with self._lock:
+            return {'pending': self._pending, **self._counters}
+
+
+def summarize_jobs(jobs: List[GenerationJob]) -> Dict[str, float]:
+    """汇总一批任务的首行用时与脚本线程占用时间"""
+    finished = [job for job in jobs if job.done and job.time_to_first_line is not None]
+    if not finished:
+        return {}
+    first_lines = sorted(job.time_to_first_line for job in finished)
+    return {
+        'jobs': len(finished),
+        'ttfl_p50': first_lines[len(first_lines) // 2],
+        'ttfl_max': first_lines[-1],
+        'blocked_avg': sum(job.blocked_seconds for job in finished) / len(finished),
+    }
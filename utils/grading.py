@@ -0,0 +1,189 @@
+"""填空题判分
+
+作答与标准答案先统一规范化：NFKC 折叠全角/半角、繁体转简体、去掉标点和空白，
+再按字计算编辑距离给部分分：得分 = 1 - 距离 / 标准答案字数。
+
+批量判分：python -m utils.grading grade answers.csv -o graded.csv --workers 8
+CSV 需有 answer 列，以及 expected（标准答案）或 qid（题库编号）列之一。
+缺少作答、标准答案或 qid 无效的行无法判分，输出中得分各列留空，不计入平均分。
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.zhconv import to_simplified
+
+IGNORED_RE = re.compile(r'[\W_]+')
+
+
+class Grade(NamedTuple):
+    score: float  # 0~1 的部分分
+    correct: bool  # 规范化后完全一致
+    distance: int  # 字级编辑距离
+
+
+def normalize(text) -> str:
+    """规范化作答：全角转半角、繁转简、去掉标点与空白"""
+    return IGNORED_RE.sub('', to_simplified(unicodedata.normalize('NFKC', text)))
+
+
+def edit_distance(a, b) -> int:
+    """字级 Levenshtein 距离（两行滚动数组）；先去掉公共前后缀，错一两个字时只需算很小的矩阵"""
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+# 标准答案在一个班级的作答里反复出现，规范化结果缓存复用
+_normalize_expected = lru_cache(maxsize=65536)(normalize)
+
+
+def grade_answer(answer, expected) -> Grade:
+    """给一份作答判分"""
+    if answer == expected:
+        return Grade(1.0, True, 0)
+    answer, expected = normalize(answer), _normalize_expected(expected)
+    if answer == expected:
+        return Grade(1.0, True, 0)
+    distance = edit_distance(answer, expected)
+    return Grade(max(0.0, 1 - distance / max(len(expected), 1)), False, distance)
+
+
+def grade_pairs(pairs: Sequence[Optional[Tuple[str, str]]]) -> List[Optional[Grade]]:
+    """批量判分一组 (作答, 标准答案)；无法判分的项为 None，结果也为 None"""
+    return [None if pair is None else grade_answer(*pair) for pair in pairs]
+
+
+def _chunks(rows: Iterable, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def grade_csv(input_path, output_path, json_path='data/poems.json', workers=None, chunk_size=5000):
+    """流式读入一个班级的作答 CSV，按块分发到进程池判分并写出，返回 (行数, 平均分, 全对数, 无法判分数)"""
+    workers = workers or os.cpu_count() or 1
+    stats = [0, 0.0, 0, 0]  # 行数、总分、全对数、无法判分数
+
+    with open(input_path, 'r', encoding='utf-8-sig', newline='') as fin, \
+            open(output_path, 'w', encoding='utf-8-sig', newline='') as fout:
+        reader = csv.DictReader(fin)
+        fields = list(reader.fieldnames or [])
+        if 'answer' not in fields or not {'expected', 'qid'} & set(fields):
+            raise ValueError("CSV 需要 answer 列，以及 expected 或 qid 列")
+        bank = None
+        if 'expected' not in fields:
+            from utils.cloze import load_bank
+            bank = load_bank(json_path)
+        writer = csv.writer(fout)
+        writer.writerow(fields + ['score', 'correct', 'distance'])
+
+        def expected(row):
+            if bank is None:
+                return row['expected']
+            try:
+                return bank.question(int(row['qid'])).answer
+            except (TypeError, ValueError, IndexError):
+                return None
+
+        def pairs(chunk):
+            result = []
+            for row in chunk:
+                answer, answer_key = row['answer'], expected(row)
+                result.append(None if answer is None or answer_key is None else (answer, answer_key))
+            return result
+
+        def write(chunk, grades):
+            for row, grade in zip(chunk, grades):
+                cells = [row[f] for f in fields]
+                if grade is None:
+                    writer.writerow(cells + ['', '', ''])
+                    stats[3] += 1
+                    continue
+                writer.writerow(cells + [f"{grade.score:.3f}", int(grade.correct), grade.distance])
+                stats[1] += grade.score
+                stats[2] += grade.correct
+            stats[0] += len(chunk)
+
+        if workers == 1:
+            for chunk in _chunks(reader, chunk_size):
+                write(chunk, grade_pairs(pairs(chunk)))
+        else:
+            # 在途的块数有上限，内存占用与 CSV 大小无关
+            with ProcessPoolExecutor(workers) as pool:
+                in_flight = deque()
+                for chunk in _chunks(reader, chunk_size):
+                    in_flight.append((chunk, pool.submit(grade_pairs, pairs(chunk))))
+                    if len(in_flight) >= workers * 2:
+                        done, future = in_flight.popleft()
+                        write(done, future.result())
+                while in_flight:
+                    done, future = in_flight.popleft()
+                    write(done, future.result())
+
+    rows, total_score, full, ungradable = stats
+    graded = rows - ungradable
+    return rows, (total_score / graded if graded else 0.0), full, ungradable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="填空题判分工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    grade = sub.add_parser('grade', help="批量判分一个班级的作答 CSV")
+    grade.add_argument('input')
+    grade.add_argument('-o', '--output', help="输出路径，默认在输入文件名后加 .graded")
+    grade.add_argument('--json', default='data/poems.json', help="按 qid 判分时使用的诗歌数据")
+    grade.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    check = sub.add_parser('check', help="给一份作答判分")
+    check.add_argument('answer')
+    check.add_argument('expected')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        result = grade_answer(args.answer, args.expected)
+        print(f"得分 {result.score:.0%}，{'完全正确' if result.correct else f'相差 {result.distance} 字'}")
+        return
+
+    root, ext = os.path.splitext(args.input)
+    output = args.output or f"{root}.graded{ext}"
+    start = time.perf_counter()
+    try:
+        rows, mean, full, ungradable = grade_csv(args.input, output, args.json, args.workers)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"已判 {rows} 份作答，用时 {elapsed:.2f}s（{rows / elapsed:,.0f} 份/秒）；"
+          f"平均得分 {mean:.1%}，全对 {full} 份。结果写入 {output}")
+    if ungradable:
+        print(f"⚠️ {ungradable} 份作答缺少答案或题目编号无效，无法判分，得分留空", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
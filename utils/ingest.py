@@ -0,0 +1,261 @@
+"""外部诗歌数据的增量导入
+
+把分片的诗歌数据（JSON 数组或 JSON Lines，可为繁体，兼容 chinese-poetry 的 paragraphs 字段）
+逐片转为简体、校验、计算内容哈希，在进程池中并行处理，每片结果写成一个中间 JSONL 文件。
+工作目录记录每个分片的校验和，重跑时只处理有变化的分片；最后按分片顺序流式合并、
+按内容哈希去重，写出与 data/poems.json 同格式的语料文件，全程不需要把全部记录读进内存。
+
+导入：python -m utils.ingest run dumps/ --base data/poems.json -o data/corpus.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+from utils.metrics import peak_rss_bytes
+from utils.validator import validate_poem_data
+from utils.zhconv import load_mapping, to_simplified, translation_table
+
+STATE_VERSION = 1
+SHARD_SUFFIXES = ('.json', '.jsonl')
+HASH_IGNORED_RE = re.compile(r'[\W_]+')
+TEXT_FIELDS = ('title', 'author', 'dynasty', 'content', 'translation', 'explanation')
+
+
+def file_checksum(path, block_size=1 << 20) -> str:
+    """分片文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(content) -> str:
+    """去掉标点空白后的正文哈希，用于去重"""
+    return hashlib.blake2b(HASH_IGNORED_RE.sub('', content).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def find_shards(sources) -> List[str]:
+    """展开输入路径：目录递归查找 .json/.jsonl 文件，按路径排序保证合并顺序稳定"""
+    shards = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                shards.extend(os.path.join(root, name) for name in files if name.endswith(SHARD_SUFFIXES))
+        else:
+            shards.append(source)
+    return sorted(os.path.abspath(path) for path in shards)
+
+
+def read_shard(path) -> Iterator[dict]:
+    """逐条读出分片中的原始记录"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+
+
+def to_record(raw, table, dynasty) -> dict:
+    """把一条原始记录转为本项目的诗歌格式（简体）"""
+    content = raw.get('content')
+    if content is None:
+        content = ''.join(raw.get('paragraphs') or [])
+    values = {
+        'title': raw.get('title', ''),
+        'author': raw.get('author', ''),
+        'dynasty': raw.get('dynasty') or dynasty,
+        'content': content,
+        'translation': raw.get('translation', ''),
+        'explanation': raw.get('explanation', ''),
+    }
+    return {field: to_simplified(str(values[field]), table).strip() for field in TEXT_FIELDS}
+
+
+def process_shard(shard_path, output_path, mapping_path=None, dynasty='唐') -> Dict[str, int]:
+    """处理一个分片：繁转简、校验、分片内去重，结果按行写入中间文件"""
+    table = load_mapping(mapping_path) if mapping_path else translation_table()
+    stats = {'records': 0, 'accepted': 0, 'invalid': 0, 'duplicates': 0}
+    seen = set()
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for raw in read_shard(shard_path):
+            stats['records'] += 1
+            record = to_record(raw, table, dynasty)
+            valid, _ = validate_poem_data(record)
+            if not valid:
+                stats['invalid'] += 1
+                continue
+            digest = content_hash(record['content'])
+            if digest in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(digest)
+            out.write(json.dumps({'hash': digest, 'poem': record}, ensure_ascii=False))
+            out.write('\n')
+            stats['accepted'] += 1
+    os.replace(tmp_path, output_path)
+    return stats
+
+
+def _shard_output(work_dir, shard_path):
+    name = hashlib.sha1(shard_path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(work_dir, 'shards', name + '.jsonl')
+
+
+def _load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def _save_state(path, state):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def merge(output_path, shard_outputs, base_path=None) -> Dict[str, int]:
+    """按顺序流式合并基础数据与各分片结果，跨分片按内容哈希去重"""
+    seen = set()
+    stats = {'poems': 0, 'duplicates': 0}
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write('[')
+
+        def emit(digest, poem):
+            key = int(digest, 16)
+            if key in seen:
+                stats['duplicates'] += 1
+                return
+            seen.add(key)
+            out.write(',\n' if stats['poems'] else '\n')
+            out.write(json.dumps(poem, ensure_ascii=False))
+            stats['poems'] += 1
+
+        if base_path:
+            with open(base_path, 'r', encoding='utf-8') as f:
+                for poem in json.load(f):
+                    emit(content_hash(poem.get('content', '')), poem)
+        for path in shard_outputs:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    item = json.loads(line)
+                    emit(item['hash'], item['poem'])
+        out.write('\n]\n')
+    os.replace(tmp_path, output_path)
+    return stats
+
+
+def ingest(sources, output_path, work_dir='data/ingest', base_path=None, mapping_path=None,
+           dynasty='唐', workers=None, log=print) -> Dict[str, int]:
+    """增量导入：只处理校验和变化的分片，然后重新合并输出"""
+    if base_path and os.path.abspath(base_path) == os.path.abspath(output_path):
+        raise ValueError("输出文件不能与基础数据文件相同")
+    os.makedirs(os.path.join(work_dir, 'shards'), exist_ok=True)
+    state_path = os.path.join(work_dir, 'state.json')
+    config = {
+        'mapping': file_checksum(mapping_path) if mapping_path else None,
+        'dynasty': dynasty,
+    }
+    state = _load_state(state_path)
+    if state is None or state.get('config') != config:
+        state = {'version': STATE_VERSION, 'config': config, 'shards': {}}
+
+    shards = find_shards(sources)
+    previous = state['shards']
+    current = {}
+    todo = []
+    for shard in shards:
+        checksum = file_checksum(shard)
+        output = _shard_output(work_dir, shard)
+        entry = previous.get(shard)
+        if entry and entry['checksum'] == checksum and os.path.exists(output):
+            current[shard] = entry
+        else:
+            todo.append((shard, checksum, output))
+    removed = [shard for shard in previous if shard not in current and shard not in {t[0] for t in todo}]
+    for shard in removed:
+        output = _shard_output(work_dir, shard)
+        if os.path.exists(output):
+            os.remove(output)
+
+    log(f"共 {len(shards)} 个分片：{len(todo)} 个需要处理，{len(current)} 个未变化，{len(removed)} 个已移除")
+    workers = workers or os.cpu_count() or 1
+
+    def record(results):
+        for (shard, checksum, _), stats in zip(todo, results):
+            current[shard] = {'checksum': checksum, **stats}
+            # 每处理完一片就保存状态，中途中断后重跑可以接着做
+            state['shards'] = {**previous, **current}
+            _save_state(state_path, state)
+
+    if workers == 1 or len(todo) <= 1:
+        record(process_shard(shard, output, mapping_path, dynasty) for shard, _, output in todo)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            record(pool.map(process_shard, [t[0] for t in todo], [t[2] for t in todo],
+                            [mapping_path] * len(todo), [dynasty] * len(todo)))
+
+    state['shards'] = current
+    _save_state(state_path, state)
+
+    totals = {key: sum(entry[key] for entry in current.values())
+              for key in ('records', 'accepted', 'invalid', 'duplicates')}
+    base_checksum = file_checksum(base_path) if base_path else None
+    if todo or removed or state.get('base') != base_checksum or not os.path.exists(output_path):
+        merged = merge(output_path, [_shard_output(work_dir, shard) for shard in shards], base_path)
+        totals['poems'] = merged['poems']
+        totals['duplicates'] += merged['duplicates']
+        state['base'] = base_checksum
+        _save_state(state_path, state)
+    else:
+        log("没有变化的分片，输出文件已是最新")
+    totals['processed'] = len(todo)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="诗歌数据增量导入工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="导入分片数据并生成语料文件")
+    run.add_argument('sources', nargs='+', help="分片文件或目录（递归查找 .json/.jsonl）")
+    run.add_argument('-o', '--output', required=True, help="输出的诗歌JSON文件")
+    run.add_argument('--base', help="放在最前面的基础数据，如手工维护的 data/poems.json")
+    run.add_argument('--work', default='data/ingest', help="工作目录，保存分片状态与中间结果")
+    run.add_argument('--mapping', help="补充的繁简字表（OpenCC 格式）")
+    run.add_argument('--dynasty', default='唐', help="记录缺少朝代时使用的默认值")
+    run.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        totals = ingest(args.sources, args.output, args.work, args.base, args.mapping,
+                        args.dynasty, args.workers)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_bytes()
+    print(f"处理 {totals['processed']} 个分片，共 {totals['records']} 条记录："
+          f"有效 {totals['accepted']}，校验未通过 {totals['invalid']}，重复 {totals['duplicates']}")
+    if 'poems' in totals:
+        print(f"已写出 {totals['poems']} 首诗到 {args.output}")
+    print(f"用时 {elapsed:.2f}s" + (f"，主进程峰值内存 {peak / 2**20:.0f}MiB" if peak is not None else ""))
+
+
+if __name__ == '__main__':
+    main()
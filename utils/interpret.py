@@ -0,0 +1,397 @@
+"""智能赏析的 AI 扩展解读
+
+解读由可替换的后端生成：HttpBackend 调用大模型风格的 HTTP 服务，LocalBackend 在本地根据
+意象用字、格律校验等确定性地生成（也可用 `serve` 命令把它起成一个 HTTP 替身服务供联调）。
+结果按内容寻址缓存：键为 (提示词版本, 标题, 作者, 正文) 的散列，内存与 SQLite 两级，
+两级都按最近使用淘汰。同一首诗的并发请求合并为一次后端调用，后端调用在有界线程池中进行。
+
+预生成整个语料库的解读后，页面浏览就不再等待后端：
+python -m utils.interpret serve --port 8765 --latency 0.5
+python -m utils.interpret warm data/poems.json --url http://127.0.0.1:8765 --workers 16
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from utils.themes import STYLE_FORMS, THEME_IMAGERY
+from utils.meter import check_poem, highlights
+
+PROMPT_VERSION = "1"
+MEMORY_ENTRIES = 2048
+DISK_ENTRIES = 500_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interpretations (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS interpretations_used ON interpretations (used);
+"""
+
+
+class InterpretError(RuntimeError):
+    """后端没有返回可用的解读"""
+
+
+def poem_key(poem, prompt_version) -> str:
+    """解读的缓存键：提示词版本与诗歌内容的散列"""
+    text = "\n".join((prompt_version, poem['title'], poem['author'], poem['content']))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def _check(result) -> Dict[str, object]:
+    if not isinstance(result, dict) or not all(key in result for key in ('themes', 'features', 'background')):
+        raise InterpretError(f"解读格式不正确：{str(result)[:80]}")
+    return result
+
+
+class InterpretBackend(ABC):
+    """解读后端基类：interpret 返回 themes [(主题, 说明)]、features [特色]、background 题材"""
+
+    name = "base"
+    prompt_version = PROMPT_VERSION
+
+    @abstractmethod
+    def interpret(self, poem) -> Dict[str, object]:
+        """为一首诗生成解读"""
+
+
+class LocalBackend(InterpretBackend):
+    """本地后端：按主题意象用字、风格用字、叠字与格律校验确定性地写出解读
+
+    latency 模拟大模型服务的响应时间，联调和基准测试时使用。
+    """
+
+    name = "local"
+    prompt_version = "local-" + PROMPT_VERSION
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def interpret(self, poem):
+        if self.latency:
+            time.sleep(self.latency)
+        content = poem['content']
+
+        matched = []
+        for theme, chars in THEME_IMAGERY.items():
+            used = [ch for ch in chars if ch in content]
+            if used:
+                matched.append((len(used), theme, used))
+        matched.sort(key=lambda item: -item[0])
+        themes = [[theme, f"诗中的{'、'.join(used)}是{theme}诗的常见意象"] for _, theme, used in matched[:3]]
+        if not themes:
+            themes = [["古典之美", "意象含蓄，情感蕴藉"]]
+
+        style_counts = {name: sum(content.count(ch) for ch in chars) for name, (_, chars) in STYLE_FORMS.items()}
+        style = max(style_counts, key=style_counts.get)
+        features = [f"**语言风格**：{style if style_counts[style] else '质朴自然'}"]
+        imagery = [ch for ch, _ in Counter(ch for _, _, used in matched for ch in used).most_common(4)]
+        if imagery:
+            features.append(f"**意象选择**：以{'、'.join(imagery)}等意象营造意境")
+        doubled = sorted({content[i:i + 2] for i in range(len(content) - 1)
+                          if content[i] == content[i + 1] and '一' <= content[i] <= '鿿'})
+        if doubled:
+            features.append(f"**叠字**：{'、'.join(doubled)}，增强音韵与画面感")
+        for note in highlights(check_poem(content)):
+            if note.startswith("待改进："):
+                features.append(f"**格律待改进**：{note[len('待改进：'):]}")
+            else:
+                features.append(f"**格律**：{note}")
+        return {"themes": themes, "features": features, "background": themes[0][0]}
+
+
+class HttpBackend(InterpretBackend):
+    """HTTP 后端：POST 诗歌 JSON，返回同样结构的解读 JSON"""
+
+    name = "http"
+
+    def __init__(self, url, timeout=60.0, prompt_version=PROMPT_VERSION):
+        self.url = url
+        self.timeout = timeout
+        self.prompt_version = prompt_version
+
+    def interpret(self, poem):
+        body = json.dumps({"prompt_version": self.prompt_version, "title": poem['title'],
+                           "author": poem['author'], "content": poem['content']}, ensure_ascii=False)
+        request = urllib.request.Request(self.url, data=body.encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _check(json.loads(response.read().decode('utf-8')))
+        except (OSError, ValueError) as e:
+            raise InterpretError(f"解读服务请求失败：{e}") from e
+
+
+class InterpretCache:
+    """两级 LRU 缓存：内存中的有序字典，加上按最近使用时间淘汰的 SQLite 表"""
+
+    def __init__(self, path, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        (self._disk_count,) = conn.execute("SELECT COUNT(*) FROM interpretations").fetchone()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key) -> Optional[Dict]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM interpretations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE interpretations SET used = ? WHERE key = ?", (time.time(), key))
+        value = json.loads(row[0])
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        conn = self._conn()
+        with conn:
+            inserted = conn.execute("INSERT OR IGNORE INTO interpretations (key, value, used) VALUES (?, ?, ?)",
+                                    (key, json.dumps(value, ensure_ascii=False), time.time())).rowcount
+            with self._lock:
+                self._disk_count += inserted
+                over = self._disk_count > self.disk_entries
+            if over:
+                # 计数只是本进程的估计，淘汰前按实际条数重算
+                (count,) = conn.execute("SELECT COUNT(*) FROM interpretations").fetchone()
+                excess = count - self.disk_entries
+                if excess > 0:
+                    conn.execute("DELETE FROM interpretations WHERE key IN "
+                                 "(SELECT key FROM interpretations ORDER BY used LIMIT ?)", (excess,))
+                with self._lock:
+                    self._disk_count = min(count, self.disk_entries)
+
+    def missing(self, keys: Sequence[str], batch=500) -> List[str]:
+        """尚未缓存的键，按批查询"""
+        conn = self._conn()
+        found = set()
+        for i in range(0, len(keys), batch):
+            chunk = keys[i:i + batch]
+            rows = conn.execute(f"SELECT key FROM interpretations WHERE key IN ({','.join('?' * len(chunk))})",
+                                chunk)
+            found.update(key for (key,) in rows)
+        return [key for key in keys if key not in found]
+
+    def __len__(self):
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM interpretations").fetchone()
+        return count
+
+
+class InterpretService:
+    """带缓存的解读服务：未命中时在有界线程池中调用后端，同一首诗同时只调用一次"""
+
+    def __init__(self, backend: InterpretBackend, cache: InterpretCache, max_workers=4):
+        self.backend = backend
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="interpret")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'failed': 0}
+        self.last_error: Optional[BaseException] = None
+        atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+
+    def key(self, poem) -> str:
+        return poem_key(poem, self.backend.prompt_version)
+
+    def cached(self, poem) -> Optional[Dict]:
+        """只查缓存，不调用后端"""
+        return self.cache.get(self.key(poem))
+
+    def submit(self, poem) -> Future:
+        """请求一首诗的解读；已缓存时返回已完成的 Future，正在生成时返回同一个 Future"""
+        key = self.key(poem)
+        value = self.cache.get(key)
+        with self._lock:
+            if value is not None:
+                self._counters['hits'] += 1
+                future = Future()
+                future.set_result(value)
+                return future
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future
+            self._counters['misses'] += 1
+            future = self._inflight[key] = self._executor.submit(self._run, key, poem)
+        return future
+
+    def get(self, poem, timeout=None) -> Dict:
+        """阻塞等待解读"""
+        return self.submit(poem).result(timeout)
+
+    def _run(self, key, poem):
+        try:
+            value = _check(self.backend.interpret(poem))
+            self.cache.put(key, value)
+            return value
+        except Exception as e:
+            with self._lock:
+                self._counters['failed'] += 1
+                self.last_error = e
+            raise
+        finally:
+            # 失败的结果不缓存，下次请求重新调用后端
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'inflight': len(self._inflight), **self._counters}
+
+
+def warm_up(service: InterpretService, poems: Iterable, workers=None, progress=None):
+    """为整个语料库预生成解读，同时进行的后端调用不超过 workers 个
+
+    返回 (诗歌总数, 原已缓存, 本次生成, 失败)；progress(已完成, 待生成) 用于报告进度。
+    """
+    poems = list(poems)
+    keys = [service.key(poem) for poem in poems]
+    todo = set(service.cache.missing(keys))
+    pending = [poem for poem, key in zip(poems, keys) if key in todo]
+    slots = threading.BoundedSemaphore(workers or service.max_workers)
+    done = threading.Event() if pending else None
+    counts = {'finished': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def finished(future):
+        slots.release()
+        with lock:
+            counts['finished'] += 1
+            counts['failed'] += future.exception() is not None
+            if progress:
+                progress(counts['finished'], len(pending))
+            if counts['finished'] == len(pending):
+                done.set()
+
+    for poem in pending:
+        slots.acquire()
+        service.submit(poem).add_done_callback(finished)
+    if done is not None:
+        done.wait()
+    return len(poems), len(poems) - len(todo), len(pending) - counts['failed'], counts['failed']
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    backend: InterpretBackend = None
+    requests = 0
+    lock = threading.Lock()
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        with self.lock:
+            type(self).requests += 1
+        try:
+            poem = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+            self._send(200, self.backend.interpret(poem))
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": str(e)})
+
+    def do_GET(self):
+        # 已处理的请求数，用于确认并发请求确实被合并
+        self._send(200, {"requests": self.requests})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # 预生成时的并发连接数可能远超默认的 5
+
+
+def start_stand_in(port=0, latency=0.0):
+    """在后台线程启动本地替身服务，返回服务器对象（server_address 中是实际端口）"""
+    handler = type('StandInHandler', (_StandInHandler,), {'backend': LocalBackend(latency), 'requests': 0})
+    server = _StandInServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, name='interpret-stand-in', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI扩展解读工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="启动本地替身解读服务")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency', type=float, default=0.0, help="模拟的响应时间（秒）")
+    warm = sub.add_parser('warm', help="为整个语料库预生成解读")
+    warm.add_argument('json_path', nargs='?', default='data/poems.json')
+    warm.add_argument('--url', help="解读服务地址，不给出时使用本地后端")
+    warm.add_argument('--cache', default='data/interpret.db')
+    warm.add_argument('--workers', type=int, default=8, help="同时进行的后端调用数")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = start_stand_in(args.port, args.latency)
+        print(f"替身解读服务运行于 http://127.0.0.1:{server.server_address[1]}（Ctrl+C 退出）")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'warm':
+        from utils.corpus import load_corpus
+        poems = load_corpus(args.json_path)
+        backend = HttpBackend(args.url) if args.url else LocalBackend()
+        service = InterpretService(backend, InterpretCache(args.cache), max_workers=args.workers)
+        if len(poems) > service.cache.disk_entries:
+            print(f"注意：缓存容量 {service.cache.disk_entries} 条小于语料库 {len(poems)} 首，较早的解读会被淘汰")
+        start = time.perf_counter()
+
+        def report(finished, total):
+            if finished % 1000 == 0 or finished == total:
+                print(f"  {finished}/{total}", flush=True)
+        total, cached, generated, failed = warm_up(service, poems, args.workers, report)
+        elapsed = time.perf_counter() - start
+        print(f"共 {total} 首：已有缓存 {cached}，本次生成 {generated}，失败 {failed}，用时 {elapsed:.1f}s")
+        if failed:
+            print(f"最近一次失败：{service.last_error}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""诗句索引与飞花令
+
+把每首诗的正文按标点切成诗句，诗句按语料顺序编号。索引文件保存三部分：
+- 每句所属的诗歌序号与在正文中的起止位置，诗句文本显示时再从语料库读取；
+- 单字 → 含该字的诗句编号，有序的 uint32 倒排表；
+- 规范化诗句的 64 位散列按序排列，配合编号用二分查找判断作答是否是语料中的诗句；
+  语料中重复出现的诗句另记下同文诗句的最小编号，判断“已用过”时按它比较。
+
+索引与语料库一样通过 mmap 只读映射，打开不随诗句数增长，查询都是二分查找，百万句规模下
+判定与提示都在微秒级。
+
+构建：python -m utils.lines build data/poems.json
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Tuple
+
+from utils.corpus import corpus_path_for, load_corpus
+from utils.grading import normalize
+
+MAGIC = b'PEML'
+VERSION = 1
+# 文件头：魔数、版本号、保留位、诗歌数、诗句数、不同字数、倒排表总长度
+HEADER = struct.Struct('<4sHHIIII')
+
+MAX_LINE_CHARS = 0xFFFF
+
+# 飞花令的候选令字，开局时从语料中足够常见的字里抽取
+FEIHUA_CHARS = "月花春风山水云雪酒夜秋江雨人天"
+MIN_FEIHUA_LINES = 20
+MAX_MISSES = 3
+
+
+def lines_path_for(json_path):
+    """返回JSON数据文件对应的诗句索引路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.lines'
+
+
+def _digest(normalized) -> int:
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def line_key(text) -> int:
+    """规范化诗句的 64 位散列（跨进程稳定）"""
+    return _digest(normalize(text))
+
+
+def build_lines(json_path, lines_path=None):
+    """为整个语料库建立诗句索引，返回诗句总数"""
+    lines_path = lines_path or lines_path_for(json_path)
+    corpus = load_corpus(json_path)
+
+    line_poem = array('I')
+    line_start = array('H')
+    line_len = array('H')
+    keys = []
+    postings = {}
+    for poem_idx, content in enumerate(corpus.column('content')):
+        # 诗句位置在编译语料库时已经切好
+        for start, end in corpus.line_spans(poem_idx):
+            if end > MAX_LINE_CHARS:
+                break
+            line_id = len(line_poem)
+            text = content[start:end]
+            line_poem.append(poem_idx)
+            line_start.append(start)
+            line_len.append(end - start)
+            keys.append((line_key(text), line_id))
+            for ch in set(text):
+                postings.setdefault(ch, []).append(line_id)
+
+    # 散列相同的诗句按规范化文本确认，同文诗句都指向最小编号
+    keys.sort()
+    canonical = array('I', range(len(line_poem)))
+    start = 0
+    while start < len(keys):
+        end = start + 1
+        while end < len(keys) and keys[end][0] == keys[start][0]:
+            end += 1
+        if end - start > 1:
+            first = {}
+            for _, line_id in keys[start:end]:
+                content = corpus.field(line_poem[line_id], 'content')
+                text = normalize(content[line_start[line_id]:line_start[line_id] + line_len[line_id]])
+                canonical[line_id] = first.setdefault(text, line_id)
+        start = end
+
+    chars = sorted(postings)
+    offsets = array('I', [0])
+    for ch in chars:
+        offsets.append(offsets[-1] + len(postings[ch]))
+
+    tmp_path = f"{lines_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(corpus), len(line_poem), len(chars), offsets[-1]))
+        f.write(array('Q', [key for key, _ in keys]).tobytes())
+        f.write(array('I', [line_id for _, line_id in keys]).tobytes())
+        f.write(canonical.tobytes())
+        f.write(line_poem.tobytes())
+        f.write(line_start.tobytes())
+        f.write(line_len.tobytes())
+        f.write(array('I', map(ord, chars)).tobytes())
+        f.write(offsets.tobytes())
+        for ch in chars:
+            f.write(array('I', postings[ch]).tobytes())
+    os.replace(tmp_path, lines_path)
+    return len(line_poem)
+
+
+class LineIndex:
+    """只读诗句索引，各数组都是映射文件上的 memoryview"""
+
+    def __init__(self, lines_path, corpus):
+        self.path = lines_path
+        self._corpus = corpus
+        with open(lines_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, poems, lines, nchars, total = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or poems != len(corpus):
+            self._mm.close()
+            raise ValueError(f"诗句索引与语料库不匹配: {lines_path}")
+        self._count = lines
+
+        view = memoryview(self._mm)
+        pos = HEADER.size
+
+        def take(code, n):
+            nonlocal pos
+            size = array(code).itemsize * n
+            section = view[pos:pos + size].cast(code)
+            pos += size
+            return section
+
+        self._keys = take('Q', lines)
+        self._key_ids = take('I', lines)
+        self._canonical = take('I', lines)
+        self._line_poem = take('I', lines)
+        self._line_start = take('H', lines)
+        self._line_len = take('H', lines)
+        self._chars = take('I', nchars)
+        self._offsets = take('I', nchars + 1)
+        self._postings = take('I', total)
+
+    def __len__(self):
+        return self._count
+
+    def poem_of(self, line_id) -> int:
+        """诗句所属的诗歌序号"""
+        return self._line_poem[line_id]
+
+    def line(self, line_id) -> str:
+        """诗句文本"""
+        start = self._line_start[line_id]
+        content = self._corpus.field(self._line_poem[line_id], 'content')
+        return content[start:start + self._line_len[line_id]]
+
+    def postings(self, char) -> memoryview:
+        """含该字的全部诗句编号（升序）"""
+        code = ord(char)
+        pos = bisect_left(self._chars, code)
+        if pos == len(self._chars) or self._chars[pos] != code:
+            return self._postings[0:0]
+        return self._postings[self._offsets[pos]:self._offsets[pos + 1]]
+
+    def count(self, char) -> int:
+        return len(self.postings(char))
+
+    def contains(self, line_id, char) -> bool:
+        """诗句中是否有这个字"""
+        postings = self.postings(char)
+        pos = bisect_left(postings, line_id)
+        return pos < len(postings) and postings[pos] == line_id
+
+    def find(self, text) -> Optional[int]:
+        """作答对应的诗句编号；语料中重复出现的诗句总是返回最小的编号，查无此句返回 None"""
+        target = normalize(text)
+        if not target:
+            return None
+        key = _digest(target)
+        pos = bisect_left(self._keys, key)
+        while pos < self._count and self._keys[pos] == key:
+            line_id = self._key_ids[pos]
+            line = self.line(line_id)
+            if line == target or normalize(line) == target:
+                return self._canonical[line_id]
+            pos += 1
+        return None
+
+    def canonical(self, line_id) -> int:
+        """同一诗句文本的最小编号"""
+        return self._canonical[line_id]
+
+    def hint(self, char, used=(), rng=random) -> Optional[int]:
+        """随机给出一句含该字且未用过的诗句，全部用完时返回 None"""
+        postings = self.postings(char)
+        if not postings:
+            return None
+        start = rng.randrange(len(postings))
+        for i in range(len(postings)):
+            canonical = self._canonical[postings[(start + i) % len(postings)]]
+            if canonical not in used:
+                return canonical
+        return None
+
+    def pick_char(self, rng=random) -> Optional[str]:
+        """抽取令字：候选字中语料里足够常见的一个；语料较小时取候选字里最常见的"""
+        counts = {ch: self.count(ch) for ch in FEIHUA_CHARS}
+        candidates = [ch for ch, n in counts.items() if n >= MIN_FEIHUA_LINES]
+        if candidates:
+            return rng.choice(candidates)
+        char, n = max(counts.items(), key=lambda item: item[1])
+        return char if n else None
+
+
+class Play(NamedTuple):
+    ok: bool
+    message: str
+    line_id: Optional[int]  # 作答对应的诗句，无效作答为 None
+    reply: Optional[int]  # 对手接的诗句，None 表示对手接不上
+
+
+class FeihuaRound:
+    """一局飞花令：学习者与对手轮流说出含令字的诗句，说过的句子不能再用，错满三次结束"""
+
+    __slots__ = ('char', 'used', 'history', 'score', 'misses', 'hints', 'over')
+
+    def __init__(self, char):
+        self.char = char
+        self.used = set()  # 已用诗句的最小编号
+        self.history: List[Tuple[int, bool]] = []  # (诗句编号, 是否学习者所出)
+        self.score = 0
+        self.misses = 0
+        self.hints = 0
+        self.over = False
+
+    def play(self, index: LineIndex, answer, rng=random) -> Play:
+        """判定一次作答，有效时对手随即接一句"""
+        if self.over:
+            return Play(False, "本局已结束", None, None)
+        text = normalize(answer)
+        if not text:
+            return Play(False, "请先输入诗句", None, None)
+
+        line_id = None
+        if self.char not in text:
+            message = f"诗句中没有「{self.char}」字"
+        else:
+            line_id = index.find(text)
+            message = "语料库中没有这句诗" if line_id is None else "这句已经用过了"
+        if line_id is None or line_id in self.used:
+            self.misses += 1
+            self.over = self.misses >= MAX_MISSES
+            return Play(False, message, None, None)
+
+        self.used.add(line_id)
+        self.history.append((line_id, True))
+        self.score += 1
+        reply = index.hint(self.char, self.used, rng)
+        if reply is None:
+            self.over = True
+            return Play(True, "对手接不上了，你赢了！", line_id, None)
+        self.used.add(reply)
+        self.history.append((reply, False))
+        return Play(True, "接得好！", line_id, reply)
+
+    def hint(self, index: LineIndex, rng=random) -> Optional[int]:
+        """给学习者提示一句可用的诗句（不计入已用）"""
+        self.hints += 1
+        return index.hint(self.char, self.used, rng)
+
+
+_lines_cache = {}
+_lines_lock = threading.Lock()
+
+
+def load_line_index(json_path='data/poems.json'):
+    """加载共享诗句索引，缺失或早于语料库时在本进程内重新构建"""
+    json_path = os.path.abspath(json_path)
+    with _lines_lock:
+        index = _lines_cache.get(json_path)
+        if index is not None:
+            return index
+
+        corpus = load_corpus(json_path)
+        lines_path = lines_path_for(json_path)
+        stale = (not os.path.exists(lines_path)
+                 or os.path.getmtime(lines_path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            build_lines(json_path, lines_path)
+
+        try:
+            index = LineIndex(lines_path, corpus)
+        except ValueError:
+            build_lines(json_path, lines_path)
+            index = LineIndex(lines_path, corpus)
+        _lines_cache[json_path] = index
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="诗句索引工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="为语料库建立诗句与单字倒排索引")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .lines 文件")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        count = build_lines(args.json_path, args.output)
+        print(f"已索引 {count} 句诗，用时 {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
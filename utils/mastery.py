@@ -0,0 +1,199 @@
+"""学习报告的掌握度视图
+
+视图只保存用户自己答过的几百行（按诗歌序号排列的 numpy 列），筛选、排序都在这些行上做；
+未学习的诗不逐首展开，按“全库（或所筛作者的诗）去掉已学的”推算出当前页的诗歌序号。
+每次重跑的开销与用户答过的诗数有关，与语料库大小无关。
+"""
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+DAY = 86400.0
+
+# 掌握程度分档：(名称, 下限, 上限)，未答过的诗单独成档
+MASTERY_BANDS = (
+    ("薄弱", 0.0, 0.4),
+    ("一般", 0.4, 0.8),
+    ("熟练", 0.8, 1.01),
+)
+UNSEEN_BAND = "未学习"
+
+# 最近复习筛选：(名称, 天数下限, 天数上限)
+REVIEW_WINDOWS = (
+    ("7天内", 0, 7),
+    ("30天内", 0, 30),
+    ("30天以上未复习", 30, None),
+)
+
+SORT_KEYS = ("掌握度从低到高", "掌握度从高到低", "最近复习", "诗歌顺序")
+
+
+class AuthorCodes(NamedTuple):
+    names: List[str]
+    codes: np.ndarray  # 每首诗作者在 names 中的序号
+    poems: List[np.ndarray]  # 每位作者的诗歌序号（升序）
+
+
+def build_author_codes(poems) -> AuthorCodes:
+    """把作者列编码为整数并建立作者到诗歌序号的索引，每个进程构建一次"""
+    names: Dict[str, int] = {}
+    codes = np.fromiter((names.setdefault(author, len(names)) for author in poems.column('author')),
+                        dtype=np.int32, count=len(poems))
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    bounds = np.cumsum(np.bincount(codes, minlength=len(names)))[:-1]
+    return AuthorCodes(list(names), codes, np.split(order, bounds))
+
+
+class MasteryPage(NamedTuple):
+    indices: np.ndarray  # 本页的诗歌序号
+    total: int  # 筛选后的总行数
+    pages: int
+
+
+def _complement(positions, start, stop):
+    """在 0, 1, 2, … 中去掉升序的 positions 后，取第 start~stop 个数"""
+    k = np.arange(start, stop, dtype=np.int64)
+    return k + np.searchsorted(positions - np.arange(len(positions)), k, side='right')
+
+
+class MasteryView:
+    """一个用户答过的诗的掌握度列，未学习的诗按需推算"""
+
+    def __init__(self, authors: AuthorCodes, mastery: Dict[int, Tuple[float, int, float]], now=None):
+        self.authors = authors
+        self.size = len(authors.codes)
+        self.now = now if now is not None else time.time()
+        idx = np.fromiter(mastery.keys(), dtype=np.int64, count=len(mastery))
+        values = np.array(list(mastery.values()), dtype=np.float64).reshape(-1, 3)
+        keep = (idx >= 0) & (idx < self.size)
+        order = np.argsort(idx[keep], kind='stable')
+        self.indices = idx[keep][order]
+        values = values[keep][order]
+        self.mastery = values[:, 0].astype(np.float32)
+        self.attempts = values[:, 1].astype(np.int32)
+        self.last_reviewed = values[:, 2]
+
+    def _universe(self, author):
+        """筛选作者时为这些作者的诗歌序号（升序），否则为 None 表示全库"""
+        if not author:
+            return None
+        matched = [self.authors.poems[code] for code, name in enumerate(self.authors.names) if author in name]
+        return np.sort(np.concatenate(matched)) if matched else np.zeros(0, dtype=np.int32)
+
+    def _seen_mask(self, universe, band=None, reviewed=None):
+        mask = np.ones(len(self.indices), dtype=bool)
+        if universe is not None:
+            if not len(universe):
+                return np.zeros(len(self.indices), dtype=bool)
+            pos = np.minimum(np.searchsorted(universe, self.indices), len(universe) - 1)
+            mask &= universe[pos] == self.indices
+        if band is not None and band != UNSEEN_BAND:
+            _, low, high = next(b for b in MASTERY_BANDS if b[0] == band)
+            mask &= (self.mastery >= low) & (self.mastery < high)
+        if reviewed is not None:
+            _, low, high = next(w for w in REVIEW_WINDOWS if w[0] == reviewed)
+            age = (self.now - self.last_reviewed) / DAY
+            mask &= age >= low
+            if high is not None:
+                mask &= age < high
+        return mask
+
+    def select(self, author='', band=None, reviewed=None, sort=SORT_KEYS[0]) -> 'MasterySelection':
+        """筛选并排序，返回可按页取诗歌序号的结果
+
+        未学习的诗视为掌握度最低、从未复习：按掌握度从低到高时排在最前，其余排序排在已学的诗之后，
+        同档内按诗歌顺序。
+        """
+        universe = self._universe(author)
+        in_universe = self._seen_mask(universe)
+        seen = np.flatnonzero(self._seen_mask(universe, band, reviewed) & (band != UNSEEN_BAND))
+        if sort == "掌握度从低到高":
+            seen = seen[np.argsort(self.mastery[seen], kind='stable')]
+        elif sort == "掌握度从高到低":
+            seen = seen[np.argsort(-self.mastery[seen], kind='stable')]
+        elif sort == "最近复习":
+            seen = seen[np.argsort(-self.last_reviewed[seen], kind='stable')]
+        return MasterySelection(self, universe, in_universe, seen, band, reviewed, sort)
+
+    def query(self, author='', band=None, reviewed=None, sort=SORT_KEYS[0],
+              page=0, page_size=50) -> MasteryPage:
+        """筛选、排序并返回第 page 页（从 0 起）的诗歌序号"""
+        return self.select(author, band, reviewed, sort).page(page, page_size)
+
+    def band_counts(self) -> Dict[str, int]:
+        """各掌握档位的诗歌数"""
+        counts = {UNSEEN_BAND: self.size - len(self.indices)}
+        for name, low, high in MASTERY_BANDS:
+            counts[name] = int(np.count_nonzero((self.mastery >= low) & (self.mastery < high)))
+        return counts
+
+    def rows(self, poems, indices) -> Dict[str, list]:
+        """组装一页的表格列"""
+        def reviewed(ts):
+            return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)) if ts else ""
+
+        pos = np.searchsorted(self.indices, indices)
+        found = [int(p) if p < len(self.indices) and self.indices[p] == i else None for p, i in zip(pos, indices)]
+        return {
+            "诗歌": [poems.field(int(i), 'title') for i in indices],
+            "作者": [self.authors.names[self.authors.codes[i]] for i in indices],
+            "掌握度": [0 if p is None else round(float(self.mastery[p]) * 100) for p in found],
+            "答题次数": [0 if p is None else int(self.attempts[p]) for p in found],
+            "最近复习": ["" if p is None else reviewed(self.last_reviewed[p]) for p in found],
+        }
+
+
+class MasterySelection:
+    """一次筛选排序的结果：已学的诗按排序排好，未学习的诗在取页时推算"""
+
+    def __init__(self, view, universe, in_universe, seen, band, reviewed, sort):
+        self.view = view
+        self.universe = universe
+        self.in_universe = in_universe
+        self.seen = seen
+        self.band = band
+        self.reviewed = reviewed
+        self.sort = sort
+        universe_size = view.size if universe is None else len(universe)
+        # 未学习的诗只在不按掌握档位（或正按“未学习”）且不按复习时间筛选时出现
+        with_unseen = band in (None, UNSEEN_BAND) and reviewed is None
+        self.unseen_total = universe_size - int(np.count_nonzero(in_universe)) if with_unseen else 0
+        self.total = len(seen) + self.unseen_total
+
+    def pages(self, page_size=50) -> int:
+        return max(1, -(-self.total // page_size))
+
+    def page(self, page=0, page_size=50) -> MasteryPage:
+        """第 page 页（从 0 起）的诗歌序号"""
+        view, universe, seen = self.view, self.universe, self.seen
+        total = self.total
+        pages = self.pages(page_size)
+        page = min(max(page, 0), pages - 1)
+        start, stop = page * page_size, min((page + 1) * page_size, total)
+
+        if self.sort == "诗歌顺序" and self.band is None and self.reviewed is None:
+            # 已学与未学的诗合起来正是全部（所筛作者的）诗，按顺序直接切片
+            rows = np.arange(start, stop) if universe is None else universe[start:stop]
+            return MasteryPage(rows.astype(np.int64), total, pages)
+
+        def seen_part(a, b):
+            return view.indices[seen[a:b]]
+
+        def unseen_part(a, b):
+            positions = view.indices[self.in_universe]
+            if universe is not None:
+                positions = np.searchsorted(universe, positions)
+            rows = _complement(positions, a, b)
+            return rows if universe is None else universe[rows].astype(np.int64)
+
+        parts = [(len(seen), seen_part), (self.unseen_total, unseen_part)]
+        if self.sort == "掌握度从低到高":
+            parts.reverse()
+        chunks = []
+        for length, part in parts:
+            if start < length and stop > start:
+                chunks.append(part(start, min(stop, length)))
+            start, stop = max(start - length, 0), max(stop - length, 0)
+        rows = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        return MasteryPage(rows, total, pages)
@@ -0,0 +1,193 @@
+"""近体诗格律校验与候选重排
+
+每个字预先算好一个位掩码：第 0~29 位表示所属的平声韵部（多音字可同属多个韵部），
+全为 0 即仄声。一句诗的平仄压成一个整数（第 i 位为 1 表示第 i 字为平），
+二四分明、粘对、押韵都化为位运算，每秒可校验数万首候选。
+
+测速：python -m utils.meter bench --candidates 20000
+"""
+import argparse
+import random
+import time
+from array import array
+from typing import Callable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from utils.corpus import line_texts
+from utils.prosody import CJK_END, CJK_START, PING_RHYMES, rhyme_name
+
+
+def _build_masks():
+    masks = array('I', bytes(4 * (CJK_END - CJK_START + 1)))
+    for bit, (_, chars) in enumerate(PING_RHYMES):
+        for ch in chars:
+            masks[ord(ch) - CJK_START] |= 1 << bit
+    return masks
+
+
+# 码位 → 平声韵部位掩码
+RHYME_MASKS = _build_masks()
+
+
+def char_mask(char) -> int:
+    code = ord(char) - CJK_START
+    return RHYME_MASKS[code] if 0 <= code < len(RHYME_MASKS) else 0
+
+
+def line_tones(line) -> int:
+    """一句的平仄位串：第 i 位为 1 表示第 i 个字为平声"""
+    bits = 0
+    for i, ch in enumerate(line):
+        if char_mask(ch):
+            bits |= 1 << i
+    return bits
+
+
+class MeterCheck(NamedTuple):
+    score: float  # 0~1，越高越合律
+    tonal_ok: bool  # 二四分明且粘对无误
+    rhyme_ok: bool  # 偶数句押同一平声韵、不押韵句仄收
+    rhyme: int  # 韵部编号（1 起），0 为未押平声韵
+    faults: Tuple[str, ...]
+
+    @property
+    def rhyme_name(self):
+        return rhyme_name(self.rhyme)
+
+
+def _bit(bits, pos):
+    return (bits >> pos) & 1
+
+
+def check_lines(lines: Sequence[str]) -> MeterCheck:
+    """按近体诗规则校验若干句（可以是未写完的前几句）"""
+    if not lines:
+        return MeterCheck(0.0, False, False, 0, ("没有诗句",))
+    length = len(lines[0])
+    faults = []
+    if length not in (5, 7) or any(len(line) != length for line in lines):
+        faults.append("句子字数不齐")
+        return MeterCheck(0.0, False, False, 0, tuple(faults))
+
+    tones = [line_tones(line) for line in lines]
+    key_positions = (1, 3) if length == 5 else (1, 3, 5)
+    checks = 0
+    for i, bits in enumerate(tones):
+        for a, b in zip(key_positions, key_positions[1:]):
+            checks += 1
+            if _bit(bits, a) == _bit(bits, b):
+                faults.append(f"第{i + 1}句第{a + 1}、{b + 1}字平仄不分明")
+        if i % 2 == 1:
+            checks += 1
+            if _bit(bits, 1) == _bit(tones[i - 1], 1):
+                faults.append(f"第{i + 1}句失对")
+        elif i > 0:
+            checks += 1
+            if _bit(bits, 1) != _bit(tones[i - 1], 1):
+                faults.append(f"第{i + 1}句失粘")
+    tonal_faults = len(faults)
+
+    # 押韵：偶数句句末字的韵部掩码求交，首句可押可不押；其余句仄收
+    rhyme_mask = (1 << len(PING_RHYMES)) - 1
+    rhyme_checks = 0
+    for i in range(1, len(lines), 2):
+        rhyme_checks += 1
+        mask = char_mask(lines[i][-1])
+        if not mask:
+            faults.append(f"第{i + 1}句句末应为平声韵脚")
+        elif rhyme_mask & mask:
+            rhyme_mask &= mask
+        else:
+            faults.append(f"第{i + 1}句出韵")
+        if _bit(tones[i], length - 1) and _bit(tones[i], length - 2) and _bit(tones[i], length - 3):
+            faults.append(f"第{i + 1}句三平尾")
+    for i in range(2, len(lines), 2):
+        rhyme_checks += 1
+        if char_mask(lines[i][-1]):
+            faults.append(f"第{i + 1}句不押韵句应仄收")
+
+    rhyme_ok = len(faults) == tonal_faults and len(lines) > 1
+    rhyme = (rhyme_mask & -rhyme_mask).bit_length() if rhyme_ok else 0
+    total = checks + rhyme_checks
+    score = 1.0 - len(faults) / total if total else 0.0
+    return MeterCheck(max(score, 0.0), tonal_faults == 0, rhyme_ok, rhyme, tuple(faults))
+
+
+def check_poem(content) -> MeterCheck:
+    """校验一首诗的正文"""
+    return check_lines(line_texts(content))
+
+
+def rerank(candidates: Sequence[Sequence[str]], top=1) -> List[Tuple[MeterCheck, Sequence[str]]]:
+    """对若干候选（每个为诗句列表）按格律得分从高到低排序，返回前 top 个"""
+    scored = [(check_lines(lines), lines) for lines in candidates]
+    scored.sort(key=lambda item: item[0].score, reverse=True)
+    return scored[:top]
+
+
+def compose_lines(generate: Callable[[int, List[str]], str], count, per_line=16) -> Iterator[str]:
+    """逐句生成并重排：每句生成 per_line 个候选，保留与已定诗句合在一起得分最高的一个
+
+    generate(i, chosen) 返回第 i 句的一个候选。每句选定后立即产出，调用方可以边生成边显示。
+    """
+    chosen: List[str] = []
+    for i in range(count):
+        best, best_score = None, -1.0
+        for _ in range(per_line):
+            line = generate(i, chosen)
+            score = check_lines(chosen + [line]).score
+            if score > best_score:
+                best, best_score = line, score
+                if score >= 1.0:
+                    break
+        chosen.append(best)
+        yield best
+
+
+def highlights(check: MeterCheck, limit=2) -> List[str]:
+    """把校验结果写成创作亮点/待改进说明"""
+    notes = []
+    if check.rhyme_ok:
+        notes.append(f"偶数句押{check.rhyme_name}，不押韵句仄收")
+    if check.tonal_ok:
+        notes.append("二四分明，粘对合律")
+    if check.tonal_ok and check.rhyme_ok:
+        notes.append("符合近体诗的平仄与用韵要求")
+    for fault in check.faults[:limit]:
+        notes.append(f"待改进：{fault}")
+    return notes
+
+
+def _random_poem(rng, chars, length, lines=4):
+    return ["".join(rng.choice(chars) for _ in range(length)) for _ in range(lines)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="格律校验工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    check_cmd = sub.add_parser('check', help="校验一首诗")
+    check_cmd.add_argument('content')
+    bench = sub.add_parser('bench', help="测量校验吞吐")
+    bench.add_argument('--candidates', type=int, default=20000)
+    bench.add_argument('--length', type=int, default=7, choices=(5, 7))
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        result = check_poem(args.content)
+        print(f"得分 {result.score:.2f}，{'合律' if result.tonal_ok else '平仄有误'}，"
+              f"{result.rhyme_name if result.rhyme_ok else '用韵有误'}")
+        for fault in result.faults:
+            print(f"  {fault}")
+        return
+
+    rng = random.Random(0)
+    chars = "".join(chars for _, chars in PING_RHYMES) + "月日白里上下不入万一玉落夜雪水酒"
+    candidates = [_random_poem(rng, chars, args.length) for _ in range(args.candidates)]
+    start = time.perf_counter()
+    best = rerank(candidates)[0]
+    elapsed = time.perf_counter() - start
+    print(f"校验 {args.candidates} 首候选用时 {elapsed * 1000:.1f}ms，"
+          f"{args.candidates / elapsed:,.0f} 首/秒；最高分 {best[0].score:.2f}")
+
+
+if __name__ == '__main__':
+    main()
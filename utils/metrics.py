@@ -0,0 +1,275 @@
+"""运行指标
+
+进程内的计时、计数与取值：计时用摘要（总次数、总耗时，以及最近若干次观测的 p50/p95/p99），
+计数用于缓存命中与未命中，取值用于进程内存等。指标按 Prometheus 文本格式导出，可定期写入
+文本文件（供 node_exporter 的 textfile 收集器读取），也可在本进程内开一个 HTTP 端点直接抓取。
+
+查看导出文件：python -m utils.metrics show data/metrics.prom
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1024  # 每个序列保留最近的观测数
+
+METRIC_HELP = {
+    'poetry_rerun_seconds': "一次整页重跑的耗时",
+    'poetry_page_seconds': "页面主体的渲染耗时",
+    'poetry_load_poems_seconds': "每次重跑获取语料库的耗时",
+    'poetry_question_seconds': "对诗挑战选题的耗时",
+    'poetry_grading_seconds': "判分耗时",
+    'poetry_feihua_seconds': "飞花令判定作答并由对手接句的耗时",
+    'poetry_creation_seconds': "AI创作从提交到完成的耗时",
+    'poetry_creation_first_line_seconds': "AI创作的首行用时",
+    'poetry_session_bytes': "会话状态占用的内存（估算）",
+    'poetry_cache_requests_total': "共享资源缓存的请求次数",
+    'poetry_cache_misses_total': "共享资源缓存未命中（需要加载或构建）的次数",
+    'poetry_process_max_rss_bytes': "进程峰值常驻内存",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Summary:
+    """累计次数与总和，并用环形数组保留最近的观测值计算分位数"""
+
+    __slots__ = ('count', 'total', '_window', '_pos')
+
+    def __init__(self, size=WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self._window = array('d', bytes(8 * size))
+        self._pos = 0
+
+    def observe(self, value):
+        self._window[self._pos % len(self._window)] = value
+        self._pos += 1
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=QUANTILES) -> List[float]:
+        values = sorted(self._window[:min(self._pos, len(self._window))])
+        if not values:
+            return [0.0 for _ in qs]
+        return [values[min(int(q * len(values)), len(values) - 1)] for q in qs]
+
+
+class SeriesRow(NamedTuple):
+    name: str
+    labels: Labels
+    kind: str  # summary / counter / gauge
+    count: int
+    value: float  # 摘要为总和，计数与取值为当前值
+    quantiles: Tuple[float, ...]
+
+
+class MetricsRegistry:
+    """线程安全的指标表，以 (指标名, 标签) 区分序列"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries: Dict[Tuple[str, Labels], Summary] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary()
+            summary.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """计时一段代码；被 st.stop / st.rerun 之类的异常打断时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def rows(self) -> List[SeriesRow]:
+        """所有序列的当前快照"""
+        peak = peak_rss_bytes()
+        if peak is not None:
+            self.set('poetry_process_max_rss_bytes', peak)
+        with self._lock:
+            rows = [SeriesRow(name, labels, 'summary', s.count, s.total, tuple(s.quantiles()))
+                    for (name, labels), s in self._summaries.items()]
+            rows += [SeriesRow(name, labels, 'counter', int(v), v, ())
+                     for (name, labels), v in self._counters.items()]
+            rows += [SeriesRow(name, labels, 'gauge', 1, v, ())
+                     for (name, labels), v in self._gauges.items()]
+        return sorted(rows, key=lambda row: (row.name, row.labels))
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        current = None
+        for row in self.rows():
+            if row.name != current:
+                current = row.name
+                lines.append(f"# HELP {row.name} {METRIC_HELP.get(row.name, row.name)}")
+                lines.append(f"# TYPE {row.name} {row.kind}")
+            if row.kind == 'summary':
+                for q, value in zip(QUANTILES, row.quantiles):
+                    lines.append(f"{row.name}{_format_labels(row.labels + (('quantile', str(q)),))} {value:.6g}")
+                lines.append(f"{row.name}_sum{_format_labels(row.labels)} {row.value:.6g}")
+                lines.append(f"{row.name}_count{_format_labels(row.labels)} {row.count}")
+            else:
+                lines.append(f"{row.name}{_format_labels(row.labels)} {row.value:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """原子写入导出文件"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels)
+    return "{" + body + "}"
+
+
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+span = REGISTRY.span
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """本进程的峰值常驻内存（字节）；Windows 没有 resource 模块，返回 None"""
+    if sys.platform == 'win32':
+        return None
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss 在 macOS 上以字节计，在 Linux 等系统上以 KiB 计
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def approx_size(obj, _seen=None) -> int:
+    """估算对象及其引用的容器、__slots__ 属性占用的字节数
+
+    不进入普通对象的 __dict__：会话中的生成任务等对象引用着进程共享的模型，不应计入会话。
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(approx_size(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter(path=None, interval=15.0, port=None):
+    """启动后台导出：每 interval 秒写一次文本文件；给出端口时另开 HTTP 端点供 Prometheus 抓取"""
+    if path:
+        def write_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    REGISTRY.write(path)
+                except OSError:
+                    pass
+        threading.Thread(target=write_loop, name='metrics-writer', daemon=True).start()
+    server = None
+    if port:
+        server = ThreadingHTTPServer(('', port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def parse_prometheus(text) -> List[Tuple[str, Dict[str, str], float]]:
+    """解析导出的文本（只支持本模块写出的格式）"""
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, value = line.rsplit(' ', 1)
+        labels = {}
+        if '{' in series:
+            series, body = series[:-1].split('{', 1)
+            for item in body.split('",'):
+                key, _, raw = item.partition('="')
+                labels[key] = raw.rstrip('"')
+        samples.append((series, labels, float(value)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行指标工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('show', help="汇总显示导出文件中的耗时分位数与缓存命中率")
+    show.add_argument('path', nargs='?', default='data/metrics.prom')
+    args = parser.parse_args()
+
+    with open(args.path, 'r', encoding='utf-8') as f:
+        samples = parse_prometheus(f.read())
+    timings: Dict[Tuple[str, str], Dict[str, float]] = {}
+    caches: Dict[str, Dict[str, float]] = {}
+    for name, labels, value in samples:
+        if name.endswith('_seconds') and 'quantile' in labels:
+            key = (name, ','.join(f"{k}={v}" for k, v in labels.items() if k != 'quantile'))
+            timings.setdefault(key, {})[labels['quantile']] = value
+        elif name.endswith('_seconds_count'):
+            key = (name[:-len('_count')], ','.join(f"{k}={v}" for k, v in labels.items()))
+            timings.setdefault(key, {})['count'] = value
+        elif name.startswith('poetry_cache_'):
+            caches.setdefault(labels.get('cache', ''), {})[name] = value
+    print(f"{'指标':<40}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for (name, labels), values in sorted(timings.items()):
+        label = f"{name}{{{labels}}}" if labels else name
+        print(f"{label:<40}{values.get('count', 0):>8.0f}" + "".join(
+            f"{values.get(str(q), 0) * 1000:>8.1f}ms" for q in QUANTILES))
+    for cache, values in sorted(caches.items()):
+        requests = values.get('poetry_cache_requests_total', 0)
+        misses = values.get('poetry_cache_misses_total', 0)
+        ratio = (requests - misses) / requests if requests else 0.0
+        print(f"缓存 {cache}：请求 {requests:.0f} 次，未命中 {misses:.0f} 次，命中率 {ratio:.1%}")
+
+
+if __name__ == '__main__':
+    main()
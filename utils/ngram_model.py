@@ -0,0 +1,310 @@
+"""字级 n-gram 语言模型
+
+在诗句上统计字的三元/二元/一元转移次数，存为可 mmap 的紧凑数组：
+字用整数编号，每个上下文的后继字按 CSR 方式连续存放（行指针 + 后继编号 + 累计次数）。
+加载只需映射文件，采样时对累计次数二分查找，每个字只需数微秒。
+
+训练：python -m utils.ngram_model train data/poems.json --workers 8
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
+
+from utils.corpus import corpus_path_for, line_texts, load_corpus
+
+MAGIC = b'PEMN'
+VERSION = 1
+# 文件头：魔数、版本号、保留位、字表大小、三元上下文数、二元边数、三元边数
+HEADER = struct.Struct('<4sHHIIII')
+
+BOS = '^'  # 句首占位符，编号固定为 0
+
+
+def model_path_for(json_path):
+    """返回JSON数据文件对应的模型路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.ngram'
+
+
+def count_ngrams(lines: Iterable[str]) -> Counter:
+    """统计一批诗句中的三元组，键为3个字的字符串，句首以 BOS 补齐"""
+    counts = Counter()
+    for line in lines:
+        padded = BOS + BOS + line
+        counts.update(padded[i:i + 3] for i in range(len(line)))
+    return counts
+
+
+def _write_model(trigrams: Counter, model_path):
+    unigrams = Counter()
+    bigrams = Counter()
+    for key, n in trigrams.items():
+        unigrams[key[2]] += n
+        bigrams[key[1:]] += n
+
+    vocab = [BOS] + sorted(unigrams)
+    ids = {ch: i for i, ch in enumerate(vocab)}
+    size = len(vocab)
+
+    unigram_cum = array('Q')
+    total = 0
+    for ch in vocab:
+        total += unigrams.get(ch, 0)
+        unigram_cum.append(total)
+
+    # 二元：行号即上一个字的编号
+    bigram_rows = [[] for _ in range(size)]
+    for key, n in bigrams.items():
+        bigram_rows[ids[key[0]]].append((ids[key[1]], n))
+    bi_ptr, bi_succ, bi_cum = _csr(bigram_rows)
+
+    # 三元：上下文键 = 前两个字编号 a * size + b，有序存放
+    trigram_rows = {}
+    for key, n in trigrams.items():
+        context = ids[key[0]] * size + ids[key[1]]
+        trigram_rows.setdefault(context, []).append((ids[key[2]], n))
+    contexts = array('Q', sorted(trigram_rows))
+    tri_ptr, tri_succ, tri_cum = _csr(trigram_rows[c] for c in contexts)
+
+    vocab_bytes = ''.join(vocab).encode('utf-8')
+    sections = [unigram_cum, bi_ptr, bi_succ, bi_cum, contexts, tri_ptr, tri_succ, tri_cum]
+
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, size, len(contexts), len(bi_succ), len(tri_succ)))
+        f.write(struct.pack('<I', len(vocab_bytes)))
+        f.write(vocab_bytes)
+        f.write(b'\0' * (-f.tell() % 8))  # 数组按8字节对齐
+        for section in sections:
+            f.write(section.tobytes())
+            f.write(b'\0' * (-f.tell() % 8))
+    os.replace(tmp_path, model_path)
+    return size, len(contexts)
+
+
+def _csr(rows):
+    """把若干行 [(后继编号, 次数)] 转为行指针、后继编号、行内累计次数三个数组"""
+    ptr, succ, cum = array('I', [0]), array('I'), array('Q')
+    for row in rows:
+        running = 0
+        for succ_id, n in sorted(row):
+            running += n
+            succ.append(succ_id)
+            cum.append(running)
+        ptr.append(len(succ))
+    return ptr, succ, cum
+
+
+def _read_lines(path) -> Iterator[str]:
+    """读取训练语料：JSON 诗歌数据取正文，其余文件按每行一句读取"""
+    if path.endswith('.json'):
+        # 按语料库预存的诗句位置切片，不再重新切分正文
+        corpus = load_corpus(path)
+        for idx, content in enumerate(corpus.column('content')):
+            for start, end in corpus.line_spans(idx):
+                yield content[start:end]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for text in f:
+                yield from line_texts(text)
+
+
+def _batches(lines, size):
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+def train(source_path, model_path=None, workers=None, batch_size=20000):
+    """训练模型并写入文件；诗句按批流式分发到进程池计数，返回 (字表大小, 三元上下文数)"""
+    model_path = model_path or model_path_for(source_path)
+    workers = workers or os.cpu_count() or 1
+    trigrams = Counter()
+    batches = _batches(_read_lines(source_path), batch_size)
+    if workers == 1:
+        for batch in batches:
+            trigrams.update(count_ngrams(batch))
+    else:
+        # 同时在途的批次数有上限，读入速度不会超过计数速度
+        with ProcessPoolExecutor(workers) as pool:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append(pool.submit(count_ngrams, batch))
+                if len(in_flight) >= workers * 2:
+                    trigrams.update(in_flight.popleft().result())
+            while in_flight:
+                trigrams.update(in_flight.popleft().result())
+    return _write_model(trigrams, model_path)
+
+
+class NgramModel:
+    """只读 n-gram 模型，所有转移表都是映射文件上的 memoryview"""
+
+    def __init__(self, model_path):
+        self.path = model_path
+        with open(model_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, size, n_contexts, n_bi, n_tri = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"不支持的模型文件: {model_path}")
+        (vocab_len,) = struct.unpack_from('<I', self._mm, HEADER.size)
+        pos = HEADER.size + 4
+        self.vocab = self._mm[pos:pos + vocab_len].decode('utf-8')
+        self.ids = {ch: i for i, ch in enumerate(self.vocab)}
+        pos += vocab_len
+
+        view = memoryview(self._mm)
+
+        def take(fmt, count):
+            nonlocal pos
+            pos += -pos % 8
+            itemsize = struct.calcsize(fmt)
+            section = view[pos:pos + count * itemsize].cast(fmt)
+            pos += count * itemsize
+            return section
+
+        self._unigram_cum = take('Q', size)
+        self._bi_ptr = take('I', size + 1)
+        self._bi_succ = take('I', n_bi)
+        self._bi_cum = take('Q', n_bi)
+        self._contexts = take('Q', n_contexts)
+        self._tri_ptr = take('I', n_contexts + 1)
+        self._tri_succ = take('I', n_tri)
+        self._tri_cum = take('Q', n_tri)
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def _row(self, prev2, prev1):
+        """返回 (后继数组, 累计次数数组, 起, 止)，三元无数据时退回二元、一元"""
+        context = prev2 * len(self.vocab) + prev1
+        i = bisect_left(self._contexts, context)
+        if i < len(self._contexts) and self._contexts[i] == context:
+            lo, hi = self._tri_ptr[i], self._tri_ptr[i + 1]
+            return self._tri_succ, self._tri_cum, lo, hi
+        lo, hi = self._bi_ptr[prev1], self._bi_ptr[prev1 + 1]
+        if hi > lo:
+            return self._bi_succ, self._bi_cum, lo, hi
+        return None, self._unigram_cum, 0, len(self.vocab)
+
+    def sample_next(self, prev2, prev1, rng=random, boost=(), factor=4.0, exclude=frozenset()):
+        """按条件概率采样下一个字的编号；boost 中的字权重放大 factor 倍，exclude 中的字不选"""
+        return self._sample(self._row(prev2, prev1), rng, boost, factor, exclude)
+
+    def _sample(self, row, rng, boost, factor, exclude, tries=8):
+        succ, cum, lo, hi = row
+        if hi <= lo or cum[hi - 1] == 0:
+            return None
+
+        boosted = []
+        for char_id in boost:
+            if char_id in exclude:
+                continue
+            if succ is None:
+                pos = char_id
+            else:
+                pos = bisect_left(succ, char_id, lo, hi)
+                if pos >= hi or succ[pos] != char_id:
+                    continue
+            weight = cum[pos] - (cum[pos - 1] if pos > lo else 0)
+            boosted.append((char_id, (factor - 1) * weight))
+        extra = sum(weight for _, weight in boosted)
+        total = cum[hi - 1]
+
+        # 拒绝采样：落到 exclude 中的字时重抽
+        for _ in range(tries):
+            r = rng.random() * (total + extra)
+            if r < extra:
+                for char_id, weight in boosted:
+                    r -= weight
+                    if r < 0:
+                        return char_id
+                return boosted[-1][0]
+            pos = min(bisect_right(cum, r - extra, lo, hi), hi - 1)
+            char_id = succ[pos] if succ is not None else pos
+            if char_id not in exclude:
+                return char_id
+        return None
+
+    def generate_line(self, length, rng=random, prefix='', boost: Sequence[str] = (), factor=4.0):
+        """生成一句指定字数的诗句；prefix 为强制的开头，boost 为偏好的字"""
+        boost_ids = [self.ids[ch] for ch in boost if ch in self.ids]
+        line = list(prefix[:length])
+        prev2, prev1 = 0, 0
+        for ch in line:
+            prev2, prev1 = prev1, self.ids.get(ch, 0)
+        unigram_row = (None, self._unigram_cum, 0, len(self.vocab))
+        while len(line) < length:
+            exclude = {self.ids[ch] for ch in line if ch in self.ids}
+            exclude.add(0)
+            char_id = self.sample_next(prev2, prev1, rng, boost_ids, factor, exclude)
+            if char_id is None:
+                char_id = self._sample(unigram_row, rng, boost_ids, factor, exclude)
+            if char_id is None:
+                break
+            line.append(self.vocab[char_id])
+            prev2, prev1 = prev1, char_id
+        return ''.join(line)
+
+
+_model_cache = {}
+_model_lock = threading.Lock()
+
+
+def load_model(json_path='data/poems.json'):
+    """加载共享模型，缺失或早于语料库时在本进程内重新训练"""
+    json_path = os.path.abspath(json_path)
+    with _model_lock:
+        model = _model_cache.get(json_path)
+        if model is not None:
+            return model
+
+        load_corpus(json_path)
+        model_path = model_path_for(json_path)
+        stale = (not os.path.exists(model_path)
+                 or os.path.getmtime(model_path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            train(json_path, model_path, workers=1)
+
+        try:
+            model = NgramModel(model_path)
+        except ValueError:
+            train(json_path, model_path, workers=1)
+            model = NgramModel(model_path)
+        _model_cache[json_path] = model
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字级 n-gram 模型工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    train_cmd = sub.add_parser('train', help="在诗歌语料上训练模型")
+    train_cmd.add_argument('source', nargs='?', default='data/poems.json',
+                           help="诗歌JSON数据，或每行一句的文本文件")
+    train_cmd.add_argument('-o', '--output', help="模型输出路径，默认与输入同名的 .ngram 文件")
+    train_cmd.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        start = time.perf_counter()
+        size, contexts = train(args.source, args.output, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"字表 {size} 个字，三元上下文 {contexts} 个，用时 {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
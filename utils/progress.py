@@ -0,0 +1,319 @@
+"""学习进度的持久化存储
+
+答题与创作记录先放进内存队列，由单个写线程按批写入 SQLite（WAL 模式），
+一批只开一次事务，多人同时答题时页面线程不会排队等磁盘。
+每道题同时更新逐首掌握度表和每个用户一行的汇总表，报告页直接读汇总，不回放历史。
+
+统计：python -m utils.progress stats data/progress.db
+"""
+import argparse
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    user_id TEXT NOT NULL,
+    poem_idx INTEGER NOT NULL,
+    qid INTEGER,
+    correct INTEGER NOT NULL,
+    answer TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_user ON attempts (user_id, ts);
+CREATE TABLE IF NOT EXISTS mastery (
+    user_id TEXT NOT NULL,
+    poem_idx INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    mastery REAL NOT NULL,
+    last_reviewed REAL NOT NULL,
+    PRIMARY KEY (user_id, poem_idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summary (
+    user_id TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    creations INTEGER NOT NULL DEFAULT 0,
+    poems_seen INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL DEFAULT 0
+);
+"""
+
+# 掌握度为答题结果的指数滑动平均，近期的对错权重更高
+MASTERY_RATE = 0.4
+# flush 默认最多等待的秒数，写线程卡住时读操作不会一直阻塞
+FLUSH_TIMEOUT = 10.0
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_MASTERY = """
+INSERT INTO mastery (user_id, poem_idx, attempts, correct, mastery, last_reviewed)
+VALUES (?, ?, 1, ?, ? * {rate}, ?)
+ON CONFLICT (user_id, poem_idx) DO UPDATE SET
+    attempts = attempts + 1,
+    correct = correct + excluded.correct,
+    mastery = mastery + {rate} * (excluded.correct - mastery),
+    last_reviewed = excluded.last_reviewed
+""".format(rate=MASTERY_RATE)
+
+_UPSERT_SUMMARY = """
+INSERT INTO summary (user_id, attempts, correct, creations, updated) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    correct = correct + excluded.correct,
+    creations = creations + excluded.creations,
+    updated = excluded.updated
+"""
+
+
+class Attempt(NamedTuple):
+    user_id: str
+    poem_idx: int
+    qid: Optional[int]
+    correct: bool
+    answer: str
+    ts: float
+
+
+class Creation(NamedTuple):
+    user_id: str
+    ts: float
+
+
+class _FlushRequest:
+    """flush 放入队列的标记，写线程处理完它之前的记录后置位"""
+
+    __slots__ = ('event', 'ok')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.ok = True
+
+
+class UserSummary:
+    """每个用户的汇总计数，记录时同步更新，报告页直接读取"""
+
+    __slots__ = ('attempts', 'correct', 'creations', 'poems_seen')
+
+    def __init__(self, attempts=0, correct=0, creations=0, poems_seen=0):
+        self.attempts = attempts
+        self.correct = correct
+        self.creations = creations
+        self.poems_seen = poems_seen
+
+    @property
+    def accuracy(self):
+        return self.correct / self.attempts if self.attempts else 0.0
+
+
+class ProgressStore:
+    """按批写入的学习进度库；读操作使用各线程自己的连接"""
+
+    def __init__(self, path, flush_interval=0.5, max_batch=512):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._summaries: Dict[str, UserSummary] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        # 写入失败的批次数与最近一次错误；失败的批次会被丢弃，写线程继续处理后续记录
+        self.failed_batches = 0
+        self.last_error: Optional[BaseException] = None
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="progress-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- 写入 ----
+
+    def record_attempt(self, user_id, poem_idx, correct, answer="", qid=None):
+        """记录一次答题；立即计入内存汇总，落盘由写线程批量完成"""
+        summary = self.summary(user_id)
+        with self._lock:
+            summary.attempts += 1
+            summary.correct += bool(correct)
+        self._queue.put(Attempt(user_id, poem_idx, qid, bool(correct), answer, time.time()))
+
+    def record_creation(self, user_id):
+        summary = self.summary(user_id)
+        with self._lock:
+            summary.creations += 1
+        self._queue.put(Creation(user_id, time.time()))
+
+    def flush(self, timeout=FLUSH_TIMEOUT) -> bool:
+        """等待此前入队的记录全部写入；超时或其中有批次写入失败时返回 False"""
+        if self._closed:
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        if not request.event.wait(timeout):
+            logger.warning("进度库 %s 在 %.1fs 内未能写完排队的记录", self.path, timeout)
+            return False
+        return request.ok
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        # 自上次 flush 以来是否有批次写入失败，随下一个 flush 请求报告
+        failed = False
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            # 攒够一批或等满间隔再写；遇到 flush 请求立即写
+            while item is not None:
+                if isinstance(item, _FlushRequest):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write(conn, batch)
+            except Exception as e:
+                # 一批写入失败（库被锁、磁盘已满等）只丢弃这一批，写线程继续运行
+                failed = True
+                self.failed_batches += 1
+                self.last_error = e
+                logger.exception("进度库 %s 写入 %d 条记录失败", self.path, len(batch))
+            finally:
+                for waiter in waiters:
+                    waiter.ok = not failed
+                    waiter.event.set()
+                if waiters:
+                    failed = False
+            if item is None:
+                conn.close()
+                return
+
+    def _write(self, conn, batch):
+        attempts = [item for item in batch if isinstance(item, Attempt)]
+        deltas: Dict[str, list] = {}
+        for item in batch:
+            delta = deltas.setdefault(item.user_id, [0, 0, 0, 0.0])
+            if isinstance(item, Attempt):
+                delta[0] += 1
+                delta[1] += item.correct
+            else:
+                delta[2] += 1
+            delta[3] = max(delta[3], item.ts)
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO attempts (user_id, poem_idx, qid, correct, answer, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                attempts)
+            conn.executemany(_UPSERT_MASTERY, [(a.user_id, a.poem_idx, a.correct, a.correct, a.ts)
+                                               for a in attempts])
+            conn.executemany(_UPSERT_SUMMARY, [(user, *delta) for user, delta in deltas.items()])
+            seen = {}
+            for user in {a.user_id for a in attempts}:
+                (count,) = conn.execute("SELECT COUNT(*) FROM mastery WHERE user_id = ?", (user,)).fetchone()
+                seen[user] = count
+            conn.executemany("UPDATE summary SET poems_seen = ? WHERE user_id = ?",
+                             [(count, user) for user, count in seen.items()])
+        with self._lock:
+            for user, count in seen.items():
+                if user in self._summaries:
+                    self._summaries[user].poems_seen = count
+        self.batches += 1
+
+    # ---- 读取 ----
+
+    def summary(self, user_id) -> UserSummary:
+        """用户汇总：首次访问从汇总表读取，之后常驻内存"""
+        with self._lock:
+            summary = self._summaries.get(user_id)
+        if summary is not None:
+            return summary
+        row = self._reader().execute(
+            "SELECT attempts, correct, creations, poems_seen FROM summary WHERE user_id = ?",
+            (user_id,)).fetchone()
+        with self._lock:
+            return self._summaries.setdefault(user_id, UserSummary(*row) if row else UserSummary())
+
+    def mastery(self, user_id) -> Dict[int, Tuple[float, int, float]]:
+        """逐首掌握度：诗歌序号 → (掌握度, 答题次数, 最近复习时间)"""
+        self.flush()
+        rows = self._reader().execute(
+            "SELECT poem_idx, mastery, attempts, last_reviewed FROM mastery WHERE user_id = ?",
+            (user_id,))
+        return {idx: (mastery, attempts, last) for idx, mastery, attempts, last in rows}
+
+    def attempt_history(self, user_id):
+        """用户的全部答题记录 (诗歌序号, 是否答对, 时间)，按时间先后"""
+        self.flush()
+        return self._reader().execute(
+            "SELECT poem_idx, correct, ts FROM attempts WHERE user_id = ? ORDER BY ts", (user_id,)).fetchall()
+
+    def recent_attempts(self, user_id, limit=5):
+        """最近的答题记录，按时间倒序"""
+        self.flush()
+        return self._reader().execute(
+            "SELECT poem_idx, qid, correct, answer, ts FROM attempts WHERE user_id = ? ORDER BY ts DESC LIMIT ?",
+            (user_id, limit)).fetchall()
+
+
+_store_cache = {}
+_store_lock = threading.Lock()
+
+
+def load_progress_store(path='data/progress.db'):
+    """进程内共享的进度库"""
+    with _store_lock:
+        store = _store_cache.get(path)
+        if store is None:
+            store = _store_cache[path] = ProgressStore(path)
+        return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="学习进度库工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    stats = sub.add_parser('stats', help="统计进度库概况")
+    stats.add_argument('path', nargs='?', default='data/progress.db')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.path)
+    users, attempts, correct, creations = conn.execute(
+        "SELECT COUNT(*), SUM(attempts), SUM(correct), SUM(creations) FROM summary").fetchone()
+    (pairs,) = conn.execute("SELECT COUNT(*) FROM mastery").fetchone()
+    print(f"用户 {users} 个，答题 {attempts or 0} 次（答对 {correct or 0}），"
+          f"创作 {creations or 0} 次，逐首掌握度 {pairs} 条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""格律分析：平仄、韵部与诗体判定
+
+以平水韵平声三十韵为查表依据：收录的字记为平声并带韵部编号，其余常用汉字按仄声处理
+（多音字按平声收录）。查表为按码位索引的字节数组，一次下标访问即可得到声调与韵部。
+
+批量分析：python -m utils.prosody build data/poems.json
+"""
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional, Tuple
+
+from utils.corpus import corpus_path_for, line_texts, load_corpus
+
+# 平水韵平声韵部及常用字
+PING_RHYMES = (
+    ("上平一东", "东同铜桐筒童僮瞳中衷忠虫终戎崇嵩弓躬宫融雄熊穹穷冯风枫丰充隆空公功工攻蒙笼聋珑洪红鸿虹丛翁聪通蓬烘潼胧砻葱匆"),
+    ("上平二冬", "冬农宗钟龙舂松冲容蓉庸封胸雍浓重从逢缝踪茸峰锋烽蛩慵恭供琮淙侬凶墉镛佣溶邛"),
+    ("上平三江", "江扛窗邦缸降双庞逄腔撞幢桩"),
+    ("上平四支", "支枝移为垂吹陂碑奇宜仪皮儿离施知驰池规危夷师姿迟眉悲之芝时诗棋旗辞词期祠基疑姬丝司葵医帷思滋持随痴维卮麋螭肌脂雌披嬉尸狸炊湄篱兹差疲茨卑亏蕤骑歧岐谁斯私窥熙欺疵赀羁彝髭颐资糜饥衰锥姨夔祗伊蓍追缁箕椎罴篪匙脾坻嶷骊綦怡尼漪牺饴而鸱推縻璃祁绥逵羲羸肢骐訾狮嗤咨其睢漓蠡噫馗辎胝鳍陲淇淄筛厮痍貔僖贻祺嘻鹂瓷琦嵋怩熹孜蚩罹魑丕琪耆惟提禧栀畸磁萁骓"),
+    ("上平五微", "微薇晖辉挥韦围帏违霏菲妃飞非扉肥腓威畿机讥矶稀希衣依归饥欷诽绯晞葳巍沂圻颀"),
+    ("上平六鱼", "鱼渔初书舒居裾车渠余予舆胥狙锄疏蔬梳虚嘘徐猪闾庐驴诸除储如墟於畲琚旟璩苴樗蛆沮菹纾蜍蕖"),
+    ("上平七虞", "虞愚娱隅刍无芜巫于盂衢儒濡襦须株诛蛛殊瑜榆谀愉腴区驱躯朱珠趋扶符凫雏敷夫肤纡输枢厨俱驹模谟蒲胡湖瑚乎壶狐弧孤辜姑觚菰徒途涂荼图屠奴呼吾梧吴租卢鲈苏酥乌枯粗都铺禺诬竽吁瞿劬需俞逾觎揄萸臾渝岖娄孚桴俘迂姝拘摹糊鸪沽呱蛄驽逋舻垆徂孥泸栌嚅蚨诹毋芙喁颅轳邾洙麸芦呜"),
+    ("上平八齐", "齐蹊妻萋凄堤低题提蹄啼鸡稽兮倪霓西栖犀嘶撕梯鼙批挤迷泥溪圭闺睽奎携畦黎犁藜黧脐醯齑"),
+    ("上平九佳", "佳街鞋牌柴钗差涯阶偕谐骸排乖怀淮豺侪埋霾斋娲蜗蛙皆喈揩"),
+    ("上平十灰", "灰恢魁隈回徊槐梅枚玫媒煤雷颓崔催摧堆陪杯醅嵬推诙裴培盔偎煨瑰隗开哀埃台苔该才材财裁来莱栽哉灾猜胎孩虺崖皑"),
+    ("上平十一真", "真因茵辛新薪晨辰臣人仁神亲申伸绅身宾滨邻鳞麟珍瞋尘陈春津秦频苹颦银垠筠巾民珉贫淳醇纯唇伦纶轮沦匀旬巡驯钧均臻榛姻寅彬鹑皴遵循甄岷谆椿询恂峋莘堙屯呻粼磷辚"),
+    ("上平十二文", "文闻纹云氛分纷芬焚坟群裙君军勤斤筋勋熏曛醺荤耘芸汾氲殷欣芹"),
+    ("上平十三元", "元原源园猿辕烦繁蕃樊翻萱喧冤言轩藩魂浑温孙门尊樽存敦墩暾蹲豚村盆奔论坤昏婚阍痕根恩吞沅媛援爰幡番垣鸳宛掀昆琨鲲扪荪髡跟抡犍袁"),
+    ("上平十四寒", "寒韩翰丹单安难餐滩坛檀弹残干肝竿乾阑栏澜兰看刊丸桓纨端湍酸团抟攒官观冠鸾銮栾峦欢宽盘蟠邯郸摊玕拦珊狻鞍"),
+    ("上平十五删", "删关弯湾还环鬟寰班斑颁般蛮颜奸攀顽山闲艰间悭潺孱扳"),
+    ("下平一先", "先前千阡笺天坚肩贤弦烟燕莲怜田填钿年颠巅牵妍研眠渊涓蠲编玄泉迁仙鲜钱煎然延筵毡蝉缠廛联篇偏绵全宣镌穿川缘鸢旋船涎鞭专圆员虔愆骞权拳椽传焉跹舷鹃蜷娟悬边"),
+    ("下平二萧", "萧箫挑貂刁凋雕迢条跳苕调枭浇聊辽寥撩僚寮尧幺宵消霄销超朝潮嚣樵谯骄娇焦蕉椒饶烧遥姚摇谣瑶韶昭招飘标杓镳瓢苗描猫要腰邀乔桥侨妖夭漂翘祧佻徼哓"),
+    ("下平三肴", "肴巢交郊茅嘲钞包胶爻苞梢蛟庖匏坳敲胞抛鲛崤铙咆哮捎茭淆"),
+    ("下平四豪", "豪毫操髦刀萄猱桃糟漕旄袍挠蒿涛皋号陶鳌曹遭羔高嘈搔毛滔骚韬缫膏牢醪逃槽劳洮叨饕"),
+    ("下平五歌", "歌多罗河戈阿和波科柯陀娥蛾鹅萝荷过磨螺禾哥娑驼佗沱峨那苛诃珂轲莎蓑梭婆摩魔讹坡颇俄哦呵皤涡窝茄迦伽磋跎何他"),
+    ("下平六麻", "麻花霞家茶华沙车牙蛇瓜斜邪芽嘉瑕纱鸦遮叉奢涯巴耶嗟遐加笳赊槎差蟆骅葩衙琶杷爬葭划夸哗"),
+    ("下平七阳", "阳杨扬香乡光昌堂章张王房芳长塘妆常凉霜藏场央泱鸯秧狂黄篁簧徨惶煌凰遑皇梁粱良量粮墙蔷嫱桑汤疆僵缰姜浆将箱厢湘镶相裳尝偿肠忘芒茫邙铓伤商殇觞羊洋疮庄装床唐糖棠郎廊狼琅螂当珰纲刚缸囊行杭航昂苍仓沧方坊防枋亡彰璋樟獐漳猖娼强锵翔详祥庠康慷糠攘穰禳瓤忙旁滂傍"),
+    ("下平八庚", "庚更羹盲横觥彭棚亨英瑛烹平评枰京惊荆明盟鸣荣莹兵兄卿生甥笙牲擎鲸迎衡耕萌氓宏闳茎莺樱鹦泓橙筝争清情晴精睛菁旌晶盈楹瀛嬴营婴缨贞成城诚呈程酲声征轻名令并倾萦琼赓撑瞠峥嵘狰铮"),
+    ("下平九青", "青经泾形刑邢型陉亭庭廷霆蜓停丁宁钉仃馨星腥醒惺娉灵龄玲伶零听汀冥溟铭瓶屏萍荧萤荥扃坰硎苓聆瓴翎俜町"),
+    ("下平十蒸", "蒸承丞惩澄陵凌绫冰膺鹰应蝇绳渑乘升兴缯凭仍兢矜凝称登灯僧增曾憎层能朋鹏弘肱腾滕藤恒棱崩"),
+    ("下平十一尤", "尤邮优忧流留榴骝刘由游猷悠攸牛修羞秋周州洲舟酬仇柔俦畴筹稠邱抽湫遒收鸠搜驺愁休囚求裘球浮谋牟眸矛侯猴喉讴沤鸥瓯楼陬偷头投钩沟幽虬啾彪疣绸浏瘤犹揉鳅蹂踌惆篝"),
+    ("下平十二侵", "侵寻浔林霖临针斟沉深淫心琴禽擒钦衾吟今襟金音阴岑簪琳森参骖涔壬任霪砧歆箴黔"),
+    ("下平十三覃", "覃潭谭南男谙庵含涵函岚蚕探贪耽龛堪谈甘三酣篮柑惭蓝担"),
+    ("下平十四盐", "盐檐廉帘嫌严占髯谦奁纤签瞻蟾炎添兼缣尖潜阎镰粘淹箝甜恬拈暹詹歼沾苫"),
+    ("下平十五咸", "咸缄谗衔岩帆衫杉监凡馋芟喃搀"),
+)
+
+CJK_START, CJK_END = 0x4E00, 0x9FFF
+ZE_RHYME = len(PING_RHYMES) + 1  # 韵部编号：1~30 为平声韵部，31 表示仄韵
+
+
+def _build_tone_table():
+    table = bytearray(CJK_END - CJK_START + 1)
+    for group, (_, chars) in enumerate(PING_RHYMES, start=1):
+        for ch in chars:
+            pos = ord(ch) - CJK_START
+            if table[pos] == 0:  # 多韵部的字取第一个
+                table[pos] = group
+    return bytes(table)
+
+
+# 码位 → 平声韵部编号（0 为仄声）
+TONE_TABLE = _build_tone_table()
+
+PING, ZE = '○', '●'
+
+
+def rhyme_group(char) -> Optional[int]:
+    """返回字的平声韵部编号，仄声为 0，非汉字为 None"""
+    code = ord(char)
+    if not CJK_START <= code <= CJK_END:
+        return None
+    return TONE_TABLE[code - CJK_START]
+
+
+def char_tone(char) -> Optional[str]:
+    """返回字的平仄符号：○ 平、● 仄，非汉字为 None"""
+    group = rhyme_group(char)
+    if group is None:
+        return None
+    return PING if group else ZE
+
+
+def rhyme_name(code) -> str:
+    """韵部编号对应的名称"""
+    if code == ZE_RHYME:
+        return "仄韵"
+    if 1 <= code <= len(PING_RHYMES):
+        return PING_RHYMES[code - 1][0]
+    return "无韵"
+
+
+FORMS = (
+    "杂言古诗",
+    "五言绝句", "七言绝句", "五言律诗", "七言律诗", "五言排律", "七言排律",
+    "五言古绝", "七言古绝", "五言古诗", "七言古诗",
+)
+FORM_CODES = {name: code for code, name in enumerate(FORMS)}
+
+
+class ProsodyResult(NamedTuple):
+    form: str
+    lines: Tuple[str, ...]
+    tones: Tuple[str, ...]
+    rhyme: int  # 韵部编号，见 rhyme_name
+    rhyme_lines: Tuple[int, ...]  # 押韵的句序号
+    regulated: bool  # 是否合乎近体诗格律
+
+    @property
+    def rhyme_name(self):
+        return rhyme_name(self.rhyme)
+
+
+def _is_regulated(tones, length):
+    """近体诗格律检查：句内二四（六）分明、联内相对、联间相粘
+
+    多音字一律按平声查表，难免误判，每四句允许一处出入。
+    """
+    key_positions = (1, 3) if length == 5 else (1, 3, 5)
+    faults = 0
+    for line in tones:
+        if any(line[a] == line[b] for a, b in zip(key_positions, key_positions[1:])):
+            faults += 1
+    for i in range(0, len(tones) - 1, 2):
+        if tones[i][1] == tones[i + 1][1]:  # 对
+            faults += 1
+        if i + 2 < len(tones) and tones[i + 1][1] != tones[i + 2][1]:  # 粘
+            faults += 1
+    return faults <= max(1, len(tones) // 4)
+
+
+def _rhyme_lines(lines, rhyme) -> Tuple[int, ...]:
+    """已知韵部时押韵的句序号：平韵为句末字属该韵部的偶数句（及首句），仄韵为全部偶数句"""
+    if rhyme == ZE_RHYME:
+        return tuple(range(1, len(lines), 2))
+    if not rhyme:
+        return ()
+    return tuple(i for i, line in enumerate(lines) if (i % 2 or i == 0) and rhyme_group(line[-1]) == rhyme)
+
+
+def _rhyme(lines):
+    """偶数句句末字同属一个平声韵部即为平韵，偶数句句末多为仄声则为仄韵"""
+    even = [rhyme_group(line[-1]) or 0 for line in lines[1::2]]
+    groups = Counter(g for g in even if g)
+    if groups:
+        group, count = groups.most_common(1)[0]
+        if count * 2 > len(even):
+            return group
+    if even and sum(1 for g in even if g == 0) * 2 > len(even):
+        return ZE_RHYME
+    return 0
+
+
+def line_tones(lines) -> Tuple[str, ...]:
+    """逐字查表得到各句的平仄符号"""
+    return tuple(''.join(char_tone(ch) or '？' for ch in line) for line in lines)
+
+
+def analyze_poem(content) -> ProsodyResult:
+    """分析一段诗文的诗体、平仄与用韵"""
+    return analyze_lines(tuple(line_texts(content)))
+
+
+def analyze_lines(lines: Tuple[str, ...]) -> ProsodyResult:
+    """分析已切分的诗句；语料库中的诗直接传入预存位置切出的 PoemShape.lines"""
+    tones = line_tones(lines)
+    rhyme = _rhyme(lines) if lines else 0
+    rhyme_lines = _rhyme_lines(lines, rhyme)
+
+    lengths = {len(line) for line in lines}
+    if len(lengths) != 1 or lengths.isdisjoint((5, 7)) or len(lines) < 4 or len(lines) % 2:
+        return ProsodyResult("杂言古诗", lines, tones, rhyme, rhyme_lines, False)
+
+    length = lengths.pop()
+    words = "五言" if length == 5 else "七言"
+    regulated = rhyme not in (0, ZE_RHYME) and _is_regulated(tones, length)
+    if len(lines) == 4:
+        form = words + ("绝句" if regulated else "古绝")
+    elif len(lines) == 8 and regulated:
+        form = words + "律诗"
+    elif regulated:
+        form = words + "排律"
+    else:
+        form = words + "古诗"
+    return ProsodyResult(form, lines, tones, rhyme, rhyme_lines, regulated)
+
+
+# ---- 批量分析与结果缓存 ----
+
+MAGIC = b'PEMP'
+# 2：诗句改按语料库统一的切分规则
+VERSION = 2
+HEADER = struct.Struct('<4sHHI')
+# 每首诗：诗体编号、韵部编号、是否合律
+RECORD = struct.Struct('<BBB')
+
+
+def prosody_path_for(json_path):
+    """返回JSON数据文件对应的格律分析结果路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.prosody'
+
+
+def _analyze_records(poem_lines):
+    records = bytearray()
+    for lines in poem_lines:
+        result = analyze_lines(lines)
+        records += RECORD.pack(FORM_CODES[result.form], result.rhyme, result.regulated)
+    return bytes(records)
+
+
+def build_prosody(json_path, output=None, workers=None, chunk_size=5000):
+    """批量分析整个语料库并写入定长记录文件，返回诗体分布"""
+    output = output or prosody_path_for(json_path)
+    corpus = load_corpus(json_path)
+    # 诗句按语料库预存的位置切出，与页面显示的诗句一致
+    chunks = [[corpus[i].lines for i in range(start, min(start + chunk_size, len(corpus)))]
+              for start in range(0, len(corpus), chunk_size)]
+
+    forms = Counter()
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+
+    def write(parts):
+        # 按块的先后顺序边算边写，不必等全部结果
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(corpus)))
+            for part in parts:
+                f.write(part)
+                forms.update(FORMS[code] for code in part[::RECORD.size])
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        write(map(_analyze_records, chunks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            write(pool.map(_analyze_records, chunks))
+    os.replace(tmp_path, output)
+    return forms
+
+
+class ProsodyTable:
+    """按诗歌序号读取缓存的诗体与韵部"""
+
+    def __init__(self, path, corpus):
+        self.path = path
+        self._corpus = corpus
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or count != len(corpus):
+            self._mm.close()
+            raise ValueError(f"格律分析结果与语料库不匹配: {path}")
+
+    def __len__(self):
+        return len(self._corpus)
+
+    def form(self, idx) -> str:
+        return FORMS[self._mm[HEADER.size + idx * RECORD.size]]
+
+    def summary(self, idx) -> Tuple[str, str, bool]:
+        """返回 (诗体, 韵部名称, 是否合律)"""
+        form, rhyme, regulated = RECORD.unpack_from(self._mm, HEADER.size + idx * RECORD.size)
+        return FORMS[form], rhyme_name(rhyme), bool(regulated)
+
+    def get(self, idx) -> ProsodyResult:
+        """完整分析结果：诗体与韵部读缓存，诗句按预存位置切片，只有平仄逐字查表"""
+        form, rhyme, regulated = RECORD.unpack_from(self._mm, HEADER.size + idx * RECORD.size)
+        lines = self._corpus[idx].lines
+        return ProsodyResult(FORMS[form], lines, line_tones(lines), rhyme, _rhyme_lines(lines, rhyme),
+                             bool(regulated))
+
+
+_prosody_cache = {}
+_prosody_lock = threading.Lock()
+
+
+def load_prosody(json_path='data/poems.json'):
+    """加载共享的格律分析结果，缺失或早于语料库时重新批量分析"""
+    json_path = os.path.abspath(json_path)
+    with _prosody_lock:
+        table = _prosody_cache.get(json_path)
+        if table is not None:
+            return table
+
+        corpus = load_corpus(json_path)
+        path = prosody_path_for(json_path)
+        stale = (not os.path.exists(path)
+                 or os.path.getmtime(path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            build_prosody(json_path, path, workers=1)
+        try:
+            table = ProsodyTable(path, corpus)
+        except ValueError:
+            build_prosody(json_path, path, workers=1)
+            table = ProsodyTable(path, corpus)
+        _prosody_cache[json_path] = table
+        return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="格律分析工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="批量分析整个语料库")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .prosody 文件")
+    build.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    build.add_argument('--csv', help="另外导出逐首分析结果到CSV文件")
+    show = sub.add_parser('show', help="分析一段诗文")
+    show.add_argument('content')
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        result = analyze_poem(args.content)
+        print(f"{result.form}（{result.rhyme_name}）")
+        for line, tones in zip(result.lines, result.tones):
+            print(f"{line}  {tones}")
+        return
+
+    start = time.perf_counter()
+    forms = build_prosody(args.json_path, args.output, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"已分析 {sum(forms.values())} 首诗，用时 {elapsed:.2f}s")
+    for form, count in forms.most_common():
+        print(f"  {form}: {count}")
+
+    if args.csv:
+        corpus = load_corpus(args.json_path)
+        table = ProsodyTable(args.output or prosody_path_for(args.json_path), corpus)
+        with open(args.csv, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['title', 'author', 'form', 'rhyme', 'regulated', 'tones'])
+            for i in range(len(corpus)):
+                result = table.get(i)
+                writer.writerow([corpus.field(i, 'title'), corpus.field(i, 'author'), result.form,
+                                 result.rhyme_name, int(result.regulated), '/'.join(result.tones)])
+        print(f"逐首结果已导出到 {args.csv}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,446 @@
+"""学习报告：单个学生的报告渲染，以及整班批量生成
+
+批量生成时把学生按块分给进程池，每个工作进程只读地打开进度库和语料库，一块学生用两次查询取出
+汇总与逐首掌握度，渲染出文本、CSV、HTML 报告，并顺带累计全班统计。主进程按块的先后顺序把报告
+逐个写入目录或 zip，同时在途的块数有上限，内存占用与班级人数无关；最后写出全班汇总与花名册。
+
+python -m utils.report build data/progress.db -o reports.zip --workers 8
+python -m utils.report build data/progress.db -o reports/ --users class1.txt --formats txt html
+"""
+import argparse
+import csv
+import hashlib
+import html
+import io
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.corpus import PoemCorpus, load_corpus
+from utils.mastery import MASTERY_BANDS
+from utils.progress import UserSummary
+
+FORMATS = ('txt', 'csv', 'html')
+# 正确率分档（百分比下限）
+ACCURACY_BUCKETS = (0, 20, 40, 60, 80)
+SUGGESTIONS = (
+    "坚持每日学习一首新诗",
+    "定期复习已学诗歌",
+    "多参与对诗挑战",
+    "尝试创作自己的诗歌",
+)
+WEAK_LIMIT = 5
+
+
+class StudentReport(NamedTuple):
+    user_id: str
+    summary: UserSummary
+    poems: List[Tuple[int, float, int, float]]  # (诗歌序号, 掌握度, 答题次数, 最近复习时间)，按序号排列
+
+
+def student_report(user_id, summary: UserSummary, mastery: Dict[int, Tuple[float, int, float]]) -> StudentReport:
+    """由进度库的汇总与逐首掌握度组装一份报告"""
+    poems = [(idx, m, attempts, last) for idx, (m, attempts, last) in sorted(mastery.items())]
+    return StudentReport(user_id, summary, poems)
+
+
+_BAND_NAMES = tuple(name for name, _, _ in MASTERY_BANDS)
+_BAND_LOWS = tuple(low for _, low, _ in MASTERY_BANDS[1:])
+
+
+def mastery_band(value) -> str:
+    return _BAND_NAMES[bisect_right(_BAND_LOWS, value)]
+
+
+def band_counts(report: StudentReport) -> Dict[str, int]:
+    counts = {name: 0 for name, _, _ in MASTERY_BANDS}
+    for _, value, _, _ in report.poems:
+        counts[mastery_band(value)] += 1
+    return counts
+
+
+def weak_poems(report: StudentReport, k=WEAK_LIMIT) -> List[int]:
+    """掌握薄弱的诗中掌握度最低的几首的序号"""
+    weak = MASTERY_BANDS[0][0]
+    rows = sorted(report.poems, key=lambda row: row[1])[:k]
+    return [idx for idx, m, _, _ in rows if mastery_band(m) == weak]
+
+
+def _timestamp(ts):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)) if ts else ""
+
+
+def render_text(report: StudentReport, poems, now=None) -> str:
+    """纯文本报告，学习报告页的下载按钮也用它"""
+    summary = report.summary
+    bands = band_counts(report)
+    lines = [
+        "AI唐诗工坊学习报告",
+        "===================",
+        f"学习者：{report.user_id}",
+        "",
+        "学习概况：",
+        f"- 学习诗歌：{summary.poems_seen}首",
+        f"- 挑战次数：{summary.attempts}次",
+        f"- 得分：{summary.correct}分",
+        f"- 正确率：{summary.accuracy * 100:.1f}%",
+        f"- 创作次数：{summary.creations}次",
+        "- 掌握程度：" + "、".join(f"{name} {count} 首" for name, count in bands.items()),
+        "",
+        "已学习诗歌：",
+    ]
+    lines += [f"- {poems.field(idx, 'title')} ({poems.field(idx, 'author')})：掌握度 {m * 100:.0f}%"
+              for idx, m, _, _ in report.poems]
+    lines += ["", "学习建议："]
+    suggestions = list(SUGGESTIONS)
+    weak = weak_poems(report)
+    if weak:
+        suggestions.insert(0, "优先复习：" + "、".join(f"《{poems.field(idx, 'title')}》" for idx in weak))
+    lines += [f"{i}. {text}" for i, text in enumerate(suggestions, 1)]
+    lines += ["", f"生成时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}", ""]
+    return "\n".join(lines)
+
+
+def render_csv(report: StudentReport, poems) -> str:
+    """逐首掌握度表"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['诗歌', '作者', '掌握度', '掌握程度', '答题次数', '最近复习'])
+    for idx, m, attempts, last in report.poems:
+        writer.writerow([poems.field(idx, 'title'), poems.field(idx, 'author'), round(m * 100),
+                         mastery_band(m), attempts, _timestamp(last)])
+    return out.getvalue()
+
+
+_HTML_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{title}</title>
+<style>body{{font-family:sans-serif;max-width:860px;margin:2em auto}}table{{border-collapse:collapse;width:100%}}
+th,td{{border:1px solid #ddd;padding:4px 8px;text-align:left}}th{{background:#eef}}</style></head>
+<body>
+{body}
+</body></html>
+"""
+
+
+def _cell(value) -> str:
+    # 数字不必转义；逐首表格有上百行，每格都走 html.escape 会成为渲染的主要开销
+    return str(value) if isinstance(value, (int, float)) else html.escape(value)
+
+
+def _html_table(header: Sequence[str], rows: Iterable[Sequence]) -> str:
+    cells = "".join(f"<th>{html.escape(h)}</th>" for h in header)
+    body = "".join("<tr><td>" + "</td><td>".join(map(_cell, row)) + "</td></tr>" for row in rows)
+    return f"<table><tr>{cells}</tr>{body}</table>"
+
+
+def render_html(report: StudentReport, poems, now=None) -> str:
+    summary = report.summary
+    facts = [("学习诗歌", f"{summary.poems_seen}首"), ("挑战次数", f"{summary.attempts}次"),
+             ("正确率", f"{summary.accuracy * 100:.1f}%"), ("创作次数", f"{summary.creations}次")]
+    facts += [(name, f"{count}首") for name, count in band_counts(report).items()]
+    rows = [(poems.field(idx, 'title'), poems.field(idx, 'author'), f"{m * 100:.0f}%", mastery_band(m),
+             attempts, _timestamp(last)) for idx, m, attempts, last in report.poems]
+    body = (f"<h1>学习报告：{html.escape(report.user_id)}</h1>"
+            + _html_table(("项目", "数值"), facts)
+            + "<h2>已学习诗歌</h2>"
+            + _html_table(("诗歌", "作者", "掌握度", "掌握程度", "答题次数", "最近复习"), rows)
+            + f"<p>生成时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}</p>")
+    return _HTML_PAGE.format(title=f"学习报告 - {html.escape(report.user_id)}", body=body)
+
+
+class ClassStats:
+    """可合并的全班统计，各进程分块累计后在主进程合并"""
+
+    __slots__ = ('students', 'active', 'attempts', 'correct', 'creations', 'poems_seen',
+                 'accuracy', 'bands', 'poem_students', 'poem_weak')
+
+    def __init__(self):
+        self.students = 0
+        self.active = 0  # 答过题的学生数
+        self.attempts = 0
+        self.correct = 0
+        self.creations = 0
+        self.poems_seen = 0
+        self.accuracy = Counter()  # 正确率分档 → 学生数
+        self.bands = Counter()  # 掌握程度 → 人次
+        self.poem_students = Counter()  # 诗歌序号 → 学过的学生数
+        self.poem_weak = Counter()  # 诗歌序号 → 掌握薄弱的学生数
+
+    def add(self, report: StudentReport):
+        summary = report.summary
+        self.students += 1
+        self.attempts += summary.attempts
+        self.correct += summary.correct
+        self.creations += summary.creations
+        self.poems_seen += summary.poems_seen
+        if summary.attempts:
+            self.active += 1
+            percent = summary.accuracy * 100
+            self.accuracy[max(low for low in ACCURACY_BUCKETS if low <= percent)] += 1
+        weak_band = MASTERY_BANDS[0][0]
+        for idx, m, _, _ in report.poems:
+            band = mastery_band(m)
+            self.bands[band] += 1
+            self.poem_students[idx] += 1
+            if band == weak_band:
+                self.poem_weak[idx] += 1
+        return self
+
+    def merge(self, other: 'ClassStats'):
+        for name in ('students', 'active', 'attempts', 'correct', 'creations', 'poems_seen'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in ('accuracy', 'bands', 'poem_students', 'poem_weak'):
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    @property
+    def avg_accuracy(self) -> float:
+        return self.correct / self.attempts if self.attempts else 0.0
+
+    def accuracy_histogram(self) -> Dict[str, int]:
+        bounds = list(ACCURACY_BUCKETS) + [101]
+        return {f"{low}-{min(high - 1, 100)}%": self.accuracy[low] for low, high in zip(bounds, bounds[1:])}
+
+    def weakest_poems(self, k=10) -> List[Tuple[int, int, int]]:
+        """薄弱人数最多的诗：(诗歌序号, 薄弱人数, 学过人数)"""
+        return [(idx, weak, self.poem_students[idx]) for idx, weak in self.poem_weak.most_common(k)]
+
+
+def render_class_text(stats: ClassStats, poems, now=None) -> str:
+    lines = [
+        "AI唐诗工坊全班学习汇总",
+        "=======================",
+        f"学生人数：{stats.students}（答过题 {stats.active} 人）",
+        f"答题次数：{stats.attempts}，答对 {stats.correct}，整体正确率 {stats.avg_accuracy * 100:.1f}%",
+        f"人均学习诗歌：{stats.poems_seen / max(stats.students, 1):.1f}首，创作 {stats.creations} 次",
+        "",
+        "正确率分布（答过题的学生）：",
+    ]
+    lines += [f"- {label}：{count} 人" for label, count in stats.accuracy_histogram().items()]
+    lines += ["", "掌握程度（人次）：" + "、".join(f"{name} {stats.bands[name]}" for name, _, _ in MASTERY_BANDS)]
+    lines += ["", "全班最薄弱的诗："]
+    lines += [f"- {poems.field(idx, 'title')} ({poems.field(idx, 'author')})：薄弱 {weak} / 学过 {seen} 人"
+              for idx, weak, seen in stats.weakest_poems()]
+    lines += ["", f"生成时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}", ""]
+    return "\n".join(lines)
+
+
+def render_class_html(stats: ClassStats, poems, now=None) -> str:
+    facts = [("学生人数", stats.students), ("答过题", stats.active), ("答题次数", stats.attempts),
+             ("整体正确率", f"{stats.avg_accuracy * 100:.1f}%"), ("创作次数", stats.creations)]
+    weak = [(poems.field(idx, 'title'), poems.field(idx, 'author'), weak, seen)
+            for idx, weak, seen in stats.weakest_poems()]
+    body = ("<h1>全班学习汇总</h1>" + _html_table(("项目", "数值"), facts)
+            + "<h2>正确率分布</h2>" + _html_table(("正确率", "人数"), stats.accuracy_histogram().items())
+            + "<h2>全班最薄弱的诗</h2>" + _html_table(("诗歌", "作者", "薄弱人数", "学过人数"), weak)
+            + f"<p>生成时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}</p>")
+    return _HTML_PAGE.format(title="全班学习汇总", body=body)
+
+
+ROSTER_HEADER = ('学生', '学习诗歌', '挑战次数', '答对', '正确率', '创作次数') + tuple(
+    name for name, _, _ in MASTERY_BANDS)
+
+
+def roster_row(report: StudentReport) -> Tuple:
+    summary = report.summary
+    return (report.user_id, summary.poems_seen, summary.attempts, summary.correct,
+            f"{summary.accuracy * 100:.1f}%", summary.creations) + tuple(band_counts(report).values())
+
+
+# ---- 批量生成 ----
+
+def list_users(db_path) -> List[str]:
+    """进度库中的全部学生"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return [user for (user,) in conn.execute("SELECT user_id FROM summary ORDER BY user_id")]
+    finally:
+        conn.close()
+
+
+def load_reports(conn, user_ids: Sequence[str]) -> List[StudentReport]:
+    """一块学生的报告数据：汇总与掌握度各一次查询"""
+    marks = ",".join("?" * len(user_ids))
+    summaries = {row[0]: UserSummary(*row[1:]) for row in conn.execute(
+        f"SELECT user_id, attempts, correct, creations, poems_seen FROM summary WHERE user_id IN ({marks})",
+        user_ids)}
+    mastery: Dict[str, Dict[int, Tuple[float, int, float]]] = {user: {} for user in user_ids}
+    for user, idx, m, attempts, last in conn.execute(
+            f"SELECT user_id, poem_idx, mastery, attempts, last_reviewed FROM mastery "
+            f"WHERE user_id IN ({marks})", user_ids):
+        mastery[user][idx] = (m, attempts, last)
+    return [student_report(user, summaries.get(user, UserSummary()), mastery[user]) for user in user_ids]
+
+
+_SAFE_NAME_RE = re.compile(r'[^\w\-.]+')
+
+
+def report_name(user_id) -> str:
+    """学生报告的文件名（不含扩展名）：可读部分之后附学生标识的短散列，
+    a/b 与 a_b 这类替换字符后相同的标识不会写到同一个文件"""
+    digest = hashlib.blake2b(user_id.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{_SAFE_NAME_RE.sub('_', user_id).strip('.') or '_'}-{digest}"
+
+
+class ChunkResult(NamedTuple):
+    files: List[Tuple[str, str]]  # (相对路径, 内容)
+    roster: List[Tuple]
+    stats: ClassStats
+
+
+_worker_conn = None
+_worker_corpus = None
+_worker_formats: Tuple[str, ...] = FORMATS
+_worker_now = None
+
+
+def _init_worker(db_path, bin_path, formats, now):
+    global _worker_conn, _worker_corpus, _worker_formats, _worker_now
+    _worker_conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    _worker_corpus = PoemCorpus(bin_path)
+    _worker_formats = tuple(formats)
+    _worker_now = now
+
+
+def _render_chunk(user_ids) -> ChunkResult:
+    files, roster, stats = [], [], ClassStats()
+    poems = _worker_corpus
+    for report in load_reports(_worker_conn, user_ids):
+        name = f"students/{report_name(report.user_id)}"
+        if 'txt' in _worker_formats:
+            files.append((f"{name}.txt", render_text(report, poems, _worker_now)))
+        if 'csv' in _worker_formats:
+            files.append((f"{name}.csv", render_csv(report, poems)))
+        if 'html' in _worker_formats:
+            files.append((f"{name}.html", render_html(report, poems, _worker_now)))
+        roster.append(roster_row(report))
+        stats.add(report)
+    return ChunkResult(files, roster, stats)
+
+
+def _bounded(pool, func, items, window):
+    """按提交顺序产出结果，同时在途的任务不超过 window 个"""
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+class _DirSink:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        os.makedirs(os.path.join(self.path, 'students'), exist_ok=True)
+        return self
+
+    def write(self, name, text):
+        with open(os.path.join(self.path, name), 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _ZipSink:
+    """逐个写入 zip 条目；先写临时文件，完成后原子替换"""
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp = f"{path}.{os.getpid()}.tmp"
+
+    def __enter__(self):
+        self._zip = zipfile.ZipFile(self._tmp, 'w', compression=zipfile.ZIP_DEFLATED)
+        return self
+
+    def write(self, name, text):
+        self._zip.writestr(name, text.encode('utf-8'))
+
+    def __exit__(self, exc_type, *exc):
+        self._zip.close()
+        if exc_type is None:
+            os.replace(self._tmp, self.path)
+        else:
+            os.remove(self._tmp)
+        return False
+
+
+def generate_reports(db_path, output, json_path='data/poems.json', users: Optional[Sequence[str]] = None,
+                     formats: Sequence[str] = FORMATS, workers=None, chunk_size=50, now=None) -> ClassStats:
+    """为一批学生生成报告写入 output（以 .zip 结尾时写成压缩包，否则为目录），返回全班统计
+
+    users 默认为进度库中的全部学生。除每人的报告外，另写出 class_summary.txt/html 与 roster.csv。
+    """
+    now = now if now is not None else time.time()
+    corpus = load_corpus(json_path)
+    users = list(users) if users is not None else list_users(db_path)
+    chunks = [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+    stats = ClassStats()
+    roster = [ROSTER_HEADER]
+    sink = _ZipSink(output) if output.endswith('.zip') else _DirSink(output)
+
+    workers = workers or os.cpu_count() or 1
+    with sink:
+        if workers == 1 or len(chunks) <= 1:
+            _init_worker(db_path, corpus.path, formats, now)
+            results = map(_render_chunk, chunks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                       initargs=(db_path, corpus.path, tuple(formats), now))
+            results = _bounded(pool, _render_chunk, chunks, workers * 2)
+        try:
+            for result in results:
+                for name, text in result.files:
+                    sink.write(name, text)
+                roster.extend(result.roster)
+                stats.merge(result.stats)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        out = io.StringIO()
+        csv.writer(out).writerows(roster)
+        sink.write('roster.csv', out.getvalue())
+        sink.write('class_summary.txt', render_class_text(stats, corpus, now))
+        sink.write('class_summary.html', render_class_html(stats, corpus, now))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="学习报告批量生成工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="为整班学生生成报告")
+    build.add_argument('db_path', nargs='?', default='data/progress.db')
+    build.add_argument('-o', '--output', default='reports.zip', help="以 .zip 结尾时写成压缩包，否则写入目录")
+    build.add_argument('--json-path', default='data/poems.json')
+    build.add_argument('--users', help="学生名单文件，每行一个学生标识；默认为进度库中的全部学生")
+    build.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    build.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    build.add_argument('--chunk-size', type=int, default=50, help="每个任务的学生数")
+    args = parser.parse_args()
+
+    users = None
+    if args.users:
+        with open(args.users, encoding='utf-8') as f:
+            users = [line.strip() for line in f if line.strip()]
+    start = time.perf_counter()
+    stats = generate_reports(args.db_path, args.output, args.json_path, users, args.formats,
+                             args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"已生成 {stats.students} 名学生的报告（{'、'.join(args.formats)}），用时 {elapsed:.2f}s → {args.output}")
+    print(f"全班答题 {stats.attempts} 次，整体正确率 {stats.avg_accuracy * 100:.1f}%", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
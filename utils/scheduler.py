@@ -0,0 +1,209 @@
+"""对诗挑战的间隔复习调度（SM-2）
+
+每个用户一份紧凑的卡片表：卡片参数存放在并列的 array 中，诗歌序号到槽位用一个字典映射；
+到期队列是以 (到期秒数 << 24 | 槽位) 为键的小顶堆，更新卡片时只压入新键，
+弹出时丢弃与卡片当前到期时间不符的旧键；旧键超过卡片数时按现有卡片重建堆，
+堆的大小随卡片数而不随答题次数增长。取下一题 O(log n)：有到期的复习题先出，
+否则抽一首没学过的新诗，随机抽不中时从只前进的游标处顺序找。
+
+测速：python -m benchmarks.bench_scheduler --users 5000
+"""
+import heapq
+import random
+import threading
+import time
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MINUTE = 60
+DAY = 86400
+SLOT_BITS = 24
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+# 答错后隔多久再考一次
+RELEARN_SECONDS = 10 * MINUTE
+MIN_EASE = 1.3
+INITIAL_EASE = 2.5
+
+
+class NextItem(NamedTuple):
+    poem_idx: int
+    review: bool  # True 为到期复习，False 为新诗
+    due: Optional[float]
+
+
+class UserSchedule:
+    """一个用户的全部卡片与到期堆"""
+
+    __slots__ = ('_slots', '_poem', '_due', '_interval', '_ease', '_reps', '_lapses', '_heap', '_cursor')
+
+    def __init__(self):
+        self._slots: Dict[int, int] = {}
+        self._poem = array('i')
+        self._due = array('l')  # 到期时间（秒）
+        self._interval = array('l')  # 当前间隔（秒）
+        self._ease = array('f')
+        self._reps = array('H')  # 连续答对次数
+        self._lapses = array('H')  # 累计答错次数
+        self._heap: List[int] = []
+        # 此前的诗都已学过；卡片只增不减，游标只前进
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self._poem)
+
+    def _slot(self, poem_idx):
+        slot = self._slots.get(poem_idx)
+        if slot is None:
+            slot = self._slots[poem_idx] = len(self._poem)
+            self._poem.append(poem_idx)
+            self._due.append(0)
+            self._interval.append(0)
+            self._ease.append(INITIAL_EASE)
+            self._reps.append(0)
+            self._lapses.append(0)
+        return slot
+
+    def review(self, poem_idx, correct, now):
+        """按 SM-2 更新卡片：答对记 4 分、答错记 1 分"""
+        slot = self._slot(poem_idx)
+        quality = 4 if correct else 1
+        ease = self._ease[slot] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        self._ease[slot] = max(MIN_EASE, ease)
+        if correct:
+            reps = self._reps[slot] + 1
+            if reps == 1:
+                interval = DAY
+            elif reps == 2:
+                interval = 6 * DAY
+            else:
+                interval = int(self._interval[slot] * self._ease[slot])
+            self._reps[slot] = min(reps, 0xFFFF)
+        else:
+            interval = RELEARN_SECONDS
+            self._reps[slot] = 0
+            self._lapses[slot] = min(self._lapses[slot] + 1, 0xFFFF)
+        self._interval[slot] = interval
+        due = int(now) + interval
+        self._due[slot] = due
+        heapq.heappush(self._heap, due << SLOT_BITS | slot)
+        if len(self._heap) > 2 * len(self._poem):
+            self._heap = [d << SLOT_BITS | slot for slot, d in enumerate(self._due)]
+            heapq.heapify(self._heap)
+
+    def _prune(self):
+        """丢弃堆顶已过时的键"""
+        heap = self._heap
+        while heap:
+            key = heap[0]
+            if self._due[key & SLOT_MASK] == key >> SLOT_BITS:
+                return key
+            heapq.heappop(heap)
+        return None
+
+    def next_due(self, exclude=None) -> Optional[Tuple[int, int]]:
+        """最早到期的卡片 (诗歌序号, 到期秒数)，跳过诗歌 exclude"""
+        held = []
+        key = self._prune()
+        while key is not None and self._poem[key & SLOT_MASK] == exclude:
+            # 暂时取出被跳过的卡片，看它之后最早到期的是哪张，再放回去
+            held.append(heapq.heappop(self._heap))
+            key = self._prune()
+        for k in held:
+            heapq.heappush(self._heap, k)
+        if key is None:
+            return None
+        return self._poem[key & SLOT_MASK], key >> SLOT_BITS
+
+    def upcoming(self, limit=5) -> List[Tuple[int, int, int]]:
+        """按到期先后列出最近一次答错、尚待重学的卡片 (诗歌序号, 到期秒数, 答错次数)"""
+        due, reps, lapses = self._due, self._reps, self._lapses
+        relearning = (key for key in self._heap
+                      if due[key & SLOT_MASK] == key >> SLOT_BITS
+                      and reps[key & SLOT_MASK] == 0 and lapses[key & SLOT_MASK])
+        return [(self._poem[key & SLOT_MASK], key >> SLOT_BITS, lapses[key & SLOT_MASK])
+                for key in heapq.nsmallest(limit, relearning)]
+
+    def knows(self, poem_idx):
+        return poem_idx in self._slots
+
+    def first_unseen(self, corpus_size, exclude=None) -> Optional[int]:
+        """序号最小的没学过的诗（跳过 exclude）；游标只前进，一个用户累计只扫描一遍语料库"""
+        poem_idx = self._cursor
+        while poem_idx < corpus_size and poem_idx in self._slots:
+            poem_idx += 1
+        self._cursor = poem_idx
+        if poem_idx == exclude:
+            poem_idx += 1
+            while poem_idx < corpus_size and poem_idx in self._slots:
+                poem_idx += 1
+        return poem_idx if poem_idx < corpus_size else None
+
+    def nbytes(self):
+        """卡片与堆占用的大致字节数"""
+        arrays = (self._poem, self._due, self._interval, self._ease, self._reps, self._lapses)
+        size = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        return size + len(self._slots) * 100 + len(self._heap) * 36
+
+
+class Scheduler:
+    """所有用户的复习调度；首次访问某用户时按答题历史重建其卡片"""
+
+    def __init__(self, corpus_size, store=None, rng=None):
+        self.corpus_size = corpus_size
+        self.store = store
+        self._rng = rng or random.Random()
+        self._users: Dict[str, UserSchedule] = {}
+        self._lock = threading.Lock()
+
+    def user(self, user_id) -> UserSchedule:
+        with self._lock:
+            schedule = self._users.get(user_id)
+        if schedule is not None:
+            return schedule
+        schedule = UserSchedule()
+        if self.store is not None:
+            for poem_idx, correct, ts in self.store.attempt_history(user_id):
+                if poem_idx < self.corpus_size:
+                    schedule.review(poem_idx, correct, ts)
+        with self._lock:
+            return self._users.setdefault(user_id, schedule)
+
+    def record(self, user_id, poem_idx, correct, answer="", qid=None, now=None):
+        """记录一次答题：更新卡片，并写入进度库"""
+        schedule = self.user(user_id)
+        with self._lock:
+            schedule.review(poem_idx, correct, now if now is not None else time.time())
+        if self.store is not None:
+            self.store.record_attempt(user_id, poem_idx, correct, answer, qid=qid)
+
+    def next_item(self, user_id, now=None, exclude=None) -> NextItem:
+        """下一题：到期的复习题优先，其次是没学过的新诗，都没有时取最早到期的；都跳过 exclude"""
+        now = now if now is not None else time.time()
+        schedule = self.user(user_id)
+        with self._lock:
+            due = schedule.next_due(exclude)
+        if due is not None and due[1] <= now:
+            return NextItem(due[0], True, due[1])
+        if len(schedule) < self.corpus_size:
+            # 学过的诗远少于语料库时，随机抽取几次即可命中新诗
+            for _ in range(32):
+                poem_idx = self._rng.randrange(self.corpus_size)
+                if not schedule.knows(poem_idx) and poem_idx != exclude:
+                    return NextItem(poem_idx, False, None)
+            with self._lock:
+                poem_idx = schedule.first_unseen(self.corpus_size, exclude)
+            if poem_idx is not None:
+                return NextItem(poem_idx, False, None)
+        if due is not None:
+            return NextItem(due[0], True, due[1])
+        return NextItem(self._rng.randrange(self.corpus_size), False, None)
+
+    def upcoming(self, user_id, limit=5):
+        schedule = self.user(user_id)
+        with self._lock:
+            return schedule.upcoming(limit)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(schedule.nbytes() for schedule in self._users.values())
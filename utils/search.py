@@ -0,0 +1,150 @@
+"""诗歌检索索引
+
+对标题、作者、正文建立单字与相邻双字（bigram）倒排表，另建拼音首字母前缀表，
+用于“智能赏析”的边输入边搜索；(标题, 作者) → 序号表用于 O(1) 定位诗歌。
+"""
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from utils.corpus import line_texts
+
+# 参与检索的字段，按结果排序优先级排列
+SEARCH_FIELDS = ('title', 'author', 'content')
+
+# GB2312 一级汉字按拼音排序，各声母首字的区位码（高低字节拼接后减 65536）
+_GB2312_BOUNDARIES = (
+    (-20319, 'a'), (-20283, 'b'), (-19775, 'c'), (-19218, 'd'), (-18710, 'e'),
+    (-18526, 'f'), (-18239, 'g'), (-17922, 'h'), (-17417, 'j'), (-16474, 'k'),
+    (-16212, 'l'), (-15640, 'm'), (-15165, 'n'), (-14922, 'o'), (-14914, 'p'),
+    (-14630, 'q'), (-14149, 'r'), (-14090, 's'), (-13318, 't'), (-12838, 'w'),
+    (-12556, 'x'), (-11847, 'y'), (-11055, 'z'),
+)
+_GB2312_CODES = [code for code, _ in _GB2312_BOUNDARIES]
+_GB2312_LEVEL1_END = -10247
+
+@lru_cache(maxsize=None)
+def pinyin_initial(char) -> Optional[str]:
+    """返回汉字的拼音首字母，仅支持 GB2312 一级汉字，其余返回 None"""
+    try:
+        raw = char.encode('gb2312')
+    except UnicodeEncodeError:
+        return None
+    if len(raw) != 2:
+        return None
+    code = raw[0] * 256 + raw[1] - 65536
+    if not _GB2312_CODES[0] <= code <= _GB2312_LEVEL1_END:
+        return None
+    return _GB2312_BOUNDARIES[bisect_left(_GB2312_CODES, code + 1) - 1][1]
+
+
+def pinyin_initials(text) -> str:
+    """返回文本的拼音首字母串，无法识别的字直接跳过"""
+    return ''.join(filter(None, (pinyin_initial(ch) for ch in text)))
+
+
+def _clean(text):
+    return ''.join(line_texts(text))
+
+
+def _grams(text):
+    """文本的单字与双字集合，双字不跨越标点（与语料库同一套切分规则）"""
+    grams = set()
+    for segment in line_texts(text):
+        grams.update(segment)
+        grams.update(segment[i:i + 2] for i in range(len(segment) - 1))
+    return grams
+
+
+def _query_grams(query):
+    if len(query) == 1:
+        return [query]
+    return [a + b for a, b in zip(query, query[1:])]
+
+
+def _contains(postings, doc):
+    pos = bisect_left(postings, doc)
+    return pos < len(postings) and postings[pos] == doc
+
+
+class PoemSearchIndex:
+    """诗歌倒排索引，所有倒排表均为有序的 uint32 数组"""
+
+    def __init__(self, titles: List[str], authors: List[str], contents: List[str]):
+        self._postings: Dict[str, Dict[str, array]] = {}
+        for field, values in (('title', titles), ('author', authors), ('content', contents)):
+            table = {}
+            for doc, text in enumerate(values):
+                for gram in _grams(text):
+                    table.setdefault(gram, []).append(doc)
+            self._postings[field] = {gram: array('I', docs) for gram, docs in table.items()}
+
+        self._by_title_author = {}
+        for doc, key in enumerate(zip(titles, authors)):
+            self._by_title_author.setdefault(key, doc)
+
+        # 拼音首字母前缀表：标题在前、作者在后，各自按首字母排序
+        self._initials = []
+        for values in (titles, authors):
+            entries = sorted((pinyin_initials(text), doc) for doc, text in enumerate(values))
+            self._initials.append(([key for key, _ in entries], array('I', [doc for _, doc in entries])))
+
+    def lookup(self, title, author) -> Optional[int]:
+        """按 (标题, 作者) 查找诗歌序号"""
+        return self._by_title_author.get((title, author))
+
+    def search(self, query, k=20) -> List[int]:
+        """返回与查询最相关的至多 k 首诗的序号
+
+        纯字母查询按拼音首字母前缀匹配标题和作者，其余要求命中查询中的全部单字/双字。
+        """
+        query = _clean(query.strip())
+        if not query:
+            return []
+        if query.isascii() and query.isalpha():
+            return self._search_initials(query.lower(), k)
+
+        # 按字段优先级（标题 > 作者 > 正文）依次取命中结果，凑满 k 条即停止
+        grams = _query_grams(query)
+        results = []
+        seen = set()
+        for field in SEARCH_FIELDS:
+            postings = self._postings[field]
+            lists = [postings.get(gram) for gram in grams]
+            if not all(lists):
+                continue
+            lists.sort(key=len)
+            shortest, rest = lists[0], lists[1:]
+            for doc in shortest:
+                if doc in seen or not all(_contains(other, doc) for other in rest):
+                    continue
+                seen.add(doc)
+                results.append(doc)
+                if len(results) >= k:
+                    return results
+        return results
+
+    def _search_initials(self, prefix, k):
+        results = []
+        seen = set()
+        for keys, docs in self._initials:
+            start = bisect_left(keys, prefix)
+            end = bisect_left(keys, prefix + '{')  # '{' 紧随 'z' 之后
+            for pos in range(start, end):
+                doc = docs[pos]
+                if doc not in seen:
+                    seen.add(doc)
+                    results.append(doc)
+                    if len(results) >= k:
+                        return results
+        return results
+
+
+def build_search_index(poems) -> PoemSearchIndex:
+    """从语料库构建检索索引，优先按列读取避免逐首创建记录"""
+    if hasattr(poems, 'column'):
+        columns = [list(poems.column(field)) for field in SEARCH_FIELDS]
+    else:
+        columns = [[poem[field] for poem in poems] for field in SEARCH_FIELDS]
+    return PoemSearchIndex(*columns)
@@ -0,0 +1,59 @@
+"""会话内的答题记录
+
+每个会话只保存固定容量的环形缓冲：诗歌序号、题目编号、对错放在定长 array 中，
+作答原文截断后存放，标题与正确答案在显示时再按编号从语料库和题库读取。
+得分与次数是累计计数，不随答题数增长，单个会话的内存是常数。
+"""
+from array import array
+from typing import List, NamedTuple
+
+# 作答原文最多保留的字数
+MAX_ANSWER_CHARS = 64
+
+
+class AnswerRecord(NamedTuple):
+    poem_idx: int
+    qid: int
+    correct: bool
+    user_answer: str
+
+
+class SessionLog:
+    """定长答题日志与累计得分"""
+
+    __slots__ = ('capacity', 'score', 'total', '_poem', '_qid', '_correct', '_answers')
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self.score = 0
+        self.total = 0
+        self._poem = array('i', [0]) * capacity
+        self._qid = array('q', [0]) * capacity
+        self._correct = bytearray(capacity)
+        self._answers = [''] * capacity
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def record(self, poem_idx, qid, correct, user_answer):
+        slot = self.total % self.capacity
+        self._poem[slot] = poem_idx
+        self._qid[slot] = qid
+        self._correct[slot] = bool(correct)
+        self._answers[slot] = user_answer[:MAX_ANSWER_CHARS]
+        self.total += 1
+        self.score += bool(correct)
+
+    @property
+    def accuracy(self):
+        return self.score / self.total if self.total else 0.0
+
+    def recent(self, n=5) -> List[AnswerRecord]:
+        """最近 n 条记录，按先后顺序"""
+        n = min(n, len(self))
+        records = []
+        for i in range(self.total - n, self.total):
+            slot = i % self.capacity
+            records.append(AnswerRecord(self._poem[slot], self._qid[slot],
+                                        bool(self._correct[slot]), self._answers[slot]))
+        return records
@@ -0,0 +1,353 @@
+"""诗歌相似度引擎
+
+以正文与标题的单字、双字为特征构建 TF-IDF 向量（NumPy 稀疏 CSR 数组），
+分块计算全库两两相似度并预存每首诗的 top-k 近邻；页面只需读取一行近邻表。
+新增诗歌时只计算新诗与全库的相似度，并把更相近的新诗并入旧诗的近邻表，无需全量重建；
+增量加入的诗沿用上次全量构建时的 IDF，累计超过 REBUILD_FRACTION 后全量重建以更新权重。
+状态文件记录所收录诗歌标题与正文的指纹，已收录的诗被改动或重排时改为全量重建。
+
+构建：python -m utils.similarity build data/poems.json
+增量：python -m utils.similarity update data/poems.json
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.corpus import corpus_path_for, line_texts, load_corpus
+
+DEFAULT_K = 10
+# 文档频率超过该比例的特征不参与候选召回（仍计入向量范数）
+MAX_DF_RATIO = 0.05
+MIN_MAX_DF = 50
+BLOCK_SIZE = 64
+# 上次全量构建后增量加入的诗超过当时诗歌数的该比例时，改为全量重建
+REBUILD_FRACTION = 0.2
+
+NEIGHBOR_DTYPE = np.dtype([('idx', '<i4'), ('score', '<f4')])
+
+
+def state_path_for(json_path):
+    """返回JSON数据文件对应的向量状态路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.simvec.npz'
+
+
+def neighbors_path_for(json_path):
+    """返回JSON数据文件对应的近邻表路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.neighbors.npy'
+
+
+def corpus_fingerprint(corpus, n_docs) -> bytes:
+    """语料库前 n_docs 首诗标题与正文的指纹，用于判断已收录的诗是否被改动或重排"""
+    digest = hashlib.blake2b(str(n_docs).encode('ascii'), digest_size=16)
+    for name in ('title', 'content'):
+        digest.update(corpus.column_bytes(name, n_docs))
+    return digest.digest()
+
+
+def doc_terms(title, content) -> Counter:
+    """一首诗的特征词频：正文与标题中的单字和不跨标点的双字"""
+    terms = Counter()
+    for line in line_texts(content) + line_texts(title):
+        terms.update(line)
+        terms.update(line[i:i + 2] for i in range(len(line) - 1))
+    return terms
+
+
+class SimilarityIndex:
+    """TF-IDF 向量、近邻表与作者索引"""
+
+    def __init__(self, vocab: Dict[str, int], df, doc_ptr, doc_term_ids, doc_weights, neighbors, n_base,
+                 fingerprint=b''):
+        self.vocab = vocab
+        self.df = df
+        self.doc_ptr = doc_ptr
+        self.doc_term_ids = doc_term_ids
+        self.doc_weights = doc_weights
+        self.neighbors = neighbors
+        # 构建全量向量时的诗歌数，IDF 以此为准，增量加入的诗沿用同一套权重
+        self.n_base = n_base
+        # 已收录诗歌的 corpus_fingerprint，旧版状态文件没有该字段时为空
+        self.fingerprint = fingerprint
+        self.by_author: Dict[str, np.ndarray] = {}
+
+    @property
+    def n_docs(self):
+        return len(self.doc_ptr) - 1
+
+    # ---- 向量化 ----
+
+    def _idf(self, term_ids):
+        return np.log((1 + self.n_base) / (1 + self.df[term_ids])) + 1.0
+
+    def _vectorize(self, term_counts: List[Counter]):
+        """把词频转为 L2 归一化的 TF-IDF 稀疏行，未见过的特征加入词表"""
+        ptr, ids, tfs = [0], [], []
+        for counts in term_counts:
+            for term, tf in counts.items():
+                term_id = self.vocab.setdefault(term, len(self.vocab))
+                ids.append(term_id)
+                tfs.append(tf)
+            ptr.append(len(ids))
+        ids = np.asarray(ids, dtype=np.int32)
+        ptr = np.asarray(ptr, dtype=np.int64)
+        if len(self.df) < len(self.vocab):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+        return ptr, ids, 1.0 + np.log(np.asarray(tfs, dtype=np.float32))
+
+    def _apply_idf(self, ptr, ids, tf_weights):
+        weights = (tf_weights * self._idf(ids)).astype(np.float32)
+        rows = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(ptr) - 1))
+        norms[norms == 0] = 1.0
+        return weights / norms[rows].astype(np.float32)
+
+    # ---- 相似度计算 ----
+
+    def _postings(self):
+        """按特征排列的倒排表（CSC），用于召回候选诗"""
+        order = np.argsort(self.doc_term_ids, kind='stable')
+        docs = np.repeat(np.arange(self.n_docs, dtype=np.int32), np.diff(self.doc_ptr))[order]
+        counts = np.bincount(self.doc_term_ids, minlength=len(self.vocab))
+        term_ptr = np.concatenate([[0], np.cumsum(counts)])
+        return term_ptr, docs, self.doc_weights[order]
+
+    def _score_block(self, start, stop, postings, max_df):
+        """计算第 start~stop 首诗与全库每首诗的余弦相似度，返回 (stop-start) × n_docs 矩阵"""
+        term_ptr, post_docs, post_weights = postings
+        lo, hi = self.doc_ptr[start], self.doc_ptr[stop]
+        q_terms = self.doc_term_ids[lo:hi]
+        q_weights = self.doc_weights[lo:hi]
+        q_rows = np.repeat(np.arange(stop - start), np.diff(self.doc_ptr[start:stop + 1]))
+        keep = self.df[q_terms] <= max_df
+        q_terms, q_weights, q_rows = q_terms[keep], q_weights[keep], q_rows[keep]
+
+        lengths = term_ptr[q_terms + 1] - term_ptr[q_terms]
+        total = int(lengths.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        idx = np.repeat(term_ptr[q_terms], lengths) + offsets
+        cand_docs = post_docs[idx]
+        cand_weights = post_weights[idx] * np.repeat(q_weights, lengths)
+        cand_rows = np.repeat(q_rows, lengths)
+
+        n = self.n_docs
+        scores = np.bincount(cand_rows * n + cand_docs, weights=cand_weights,
+                             minlength=(stop - start) * n).reshape(stop - start, n)
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1.0  # 排除自身
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        # 诗歌数不足 k+1 时，多出的位置以 (-1, -1) 占位
+        result = np.empty((scores.shape[0], k), dtype=NEIGHBOR_DTYPE)
+        result['idx'], result['score'] = -1, -1.0
+        kk = min(k, scores.shape[1] - 1)
+        if kk <= 0:
+            return result
+        top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        result['idx'][:, :kk] = np.take_along_axis(top, order, axis=1)
+        result['score'][:, :kk] = np.take_along_axis(top_scores, order, axis=1)
+        return result
+
+    def _max_df(self):
+        return max(MIN_MAX_DF, int(self.n_base * MAX_DF_RATIO))
+
+    # ---- 构建与更新 ----
+
+    @classmethod
+    def build(cls, titles, contents, k=DEFAULT_K):
+        """为整个语料库构建向量与近邻表"""
+        index = cls({}, np.zeros(0, dtype=np.int32), None, None, None, None, len(contents))
+        ptr, ids, tf_weights = index._vectorize([doc_terms(t, c) for t, c in zip(titles, contents)])
+        index.df = np.bincount(ids, minlength=len(index.vocab)).astype(np.int32)
+        index.doc_ptr, index.doc_term_ids = ptr, ids
+        index.doc_weights = index._apply_idf(ptr, ids, tf_weights)
+
+        postings = index._postings()
+        blocks = []
+        for start in range(0, index.n_docs, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, index.n_docs)
+            blocks.append(cls._top_k(index._score_block(start, stop, postings, index._max_df()), k))
+        index.neighbors = np.concatenate(blocks) if blocks else np.zeros((0, k), dtype=NEIGHBOR_DTYPE)
+        return index
+
+    def add(self, titles, contents):
+        """增量加入新诗：计算新诗的近邻，并把更相近的新诗并入旧诗的近邻表"""
+        old_n = self.n_docs
+        k = self.neighbors.shape[1]
+        ptr, ids, tf_weights = self._vectorize([doc_terms(t, c) for t, c in zip(titles, contents)])
+        self.df += np.bincount(ids, minlength=len(self.vocab)).astype(np.int32)
+        weights = self._apply_idf(ptr, ids, tf_weights)
+        self.doc_ptr = np.concatenate([self.doc_ptr, ptr[1:] + self.doc_ptr[-1]])
+        self.doc_term_ids = np.concatenate([self.doc_term_ids, ids])
+        self.doc_weights = np.concatenate([self.doc_weights, weights])
+
+        neighbors = [self.neighbors.copy()]
+        postings = self._postings()
+        for start in range(old_n, self.n_docs, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, self.n_docs)
+            scores = self._score_block(start, stop, postings, self._max_df())
+            neighbors.append(self._top_k(scores, k))
+            if k:
+                self._merge_block(neighbors[0], scores[:, :old_n].T, start)
+        self.neighbors = np.concatenate(neighbors)
+        return self.n_docs - old_n
+
+    @staticmethod
+    def _merge_block(neighbors, candidates, start):
+        """把一块新诗并入旧诗的近邻表：candidates 为旧诗 × 新诗的相似度，新诗序号从 start 起
+
+        只处理有新诗超过当前第 k 名（含 -1 占位）的旧诗，每行在原近邻与这块新诗中重新取前 k 名。
+        """
+        k = neighbors.shape[1]
+        rows = np.flatnonzero((candidates > neighbors['score'][:, -1:]).any(axis=1))
+        if not len(rows):
+            return
+        current = neighbors[rows]
+        scores = np.concatenate([current['score'], candidates[rows].astype(np.float32)], axis=1)
+        new_idx = np.arange(start, start + candidates.shape[1], dtype=np.int32)
+        idx = np.concatenate([current['idx'], np.broadcast_to(new_idx, (len(rows), len(new_idx)))], axis=1)
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        neighbors['idx'][rows] = np.take_along_axis(idx, top, axis=1)
+        neighbors['score'][rows] = np.take_along_axis(scores, top, axis=1)
+
+    def index_authors(self, authors):
+        """建立作者 → 诗歌序号数组的索引"""
+        by_author = {}
+        for doc, author in enumerate(authors):
+            by_author.setdefault(author, []).append(doc)
+        self.by_author = {author: np.asarray(docs, dtype=np.int32) for author, docs in by_author.items()}
+
+    # ---- 查询 ----
+
+    def similar(self, doc, k=3, min_score=0.0) -> List[Tuple[int, float]]:
+        """返回与第 doc 首诗最相似的至多 k 首诗 (序号, 相似度)"""
+        row = self.neighbors[doc][:k]
+        return [(int(idx), float(score)) for idx, score in row if score > min_score]
+
+    def by_same_author(self, author, exclude=None, k=2) -> List[int]:
+        """返回同一作者的至多 k 首诗"""
+        docs = self.by_author.get(author, ())
+        result = []
+        for doc in docs:
+            if doc != exclude:
+                result.append(int(doc))
+                if len(result) >= k:
+                    break
+        return result
+
+    # ---- 持久化 ----
+
+    def save(self, state_path, neighbors_path):
+        terms = np.array(sorted(self.vocab, key=self.vocab.get))
+        tmp_state = f"{state_path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_state, terms=terms, df=self.df, doc_ptr=self.doc_ptr,
+                 doc_term_ids=self.doc_term_ids, doc_weights=self.doc_weights,
+                 n_base=np.array([self.n_base]), fingerprint=np.frombuffer(self.fingerprint, dtype=np.uint8))
+        os.replace(tmp_state, state_path)
+        tmp_neighbors = f"{neighbors_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_neighbors, self.neighbors)
+        os.replace(tmp_neighbors, neighbors_path)
+
+    @classmethod
+    def load(cls, state_path, neighbors_path, with_vectors=True):
+        """加载近邻表（mmap 只读）；with_vectors 为 True 时一并加载增量更新所需的向量"""
+        neighbors = np.load(neighbors_path, mmap_mode='r')
+        if not with_vectors:
+            return cls({}, None, None, None, None, neighbors, 0)
+        with np.load(state_path) as state:
+            vocab = {term: i for i, term in enumerate(state['terms'].tolist())}
+            fingerprint = state['fingerprint'].tobytes() if 'fingerprint' in state.files else b''
+            return cls(vocab, state['df'], state['doc_ptr'], state['doc_term_ids'],
+                       state['doc_weights'], np.array(neighbors), int(state['n_base'][0]), fingerprint)
+
+
+def build_similarity(json_path, k=DEFAULT_K):
+    """全量构建并保存相似度索引"""
+    corpus = load_corpus(json_path)
+    index = SimilarityIndex.build(list(corpus.column('title')), list(corpus.column('content')), k)
+    index.fingerprint = corpus_fingerprint(corpus, len(corpus))
+    index.save(state_path_for(json_path), neighbors_path_for(json_path))
+    return index
+
+
+def update_similarity(json_path):
+    """把语料库末尾新增的诗加入已有索引
+
+    已收录的诗被删改或重排（指纹不符），或上次全量构建后加入的诗超过 REBUILD_FRACTION 时，
+    改为全量重建。无论是否有新诗都会重写索引文件，使其修改时间晚于语料库，下次启动不再判为过期。
+    """
+    corpus = load_corpus(json_path)
+    state_path, neighbors_path = state_path_for(json_path), neighbors_path_for(json_path)
+    if not (os.path.exists(state_path) and os.path.exists(neighbors_path)):
+        return build_similarity(json_path)
+    index = SimilarityIndex.load(state_path, neighbors_path)
+    if (index.n_docs > len(corpus) or index.fingerprint != corpus_fingerprint(corpus, index.n_docs)
+            or len(corpus) - index.n_base > index.n_base * REBUILD_FRACTION):
+        return build_similarity(json_path, index.neighbors.shape[1])
+    titles = [corpus.field(i, 'title') for i in range(index.n_docs, len(corpus))]
+    contents = [corpus.field(i, 'content') for i in range(index.n_docs, len(corpus))]
+    if titles:
+        index.add(titles, contents)
+        index.fingerprint = corpus_fingerprint(corpus, len(corpus))
+    index.save(state_path, neighbors_path)
+    return index
+
+
+_similarity_cache = {}
+_similarity_lock = threading.Lock()
+
+
+def load_similarity(json_path='data/poems.json'):
+    """加载共享的相似度索引，近邻表过期时先增量更新"""
+    json_path = os.path.abspath(json_path)
+    with _similarity_lock:
+        index = _similarity_cache.get(json_path)
+        if index is not None:
+            return index
+
+        corpus = load_corpus(json_path)
+        neighbors_path = neighbors_path_for(json_path)
+        stale = (not os.path.exists(neighbors_path)
+                 or os.path.getmtime(neighbors_path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            update_similarity(json_path)
+        index = SimilarityIndex.load(state_path_for(json_path), neighbors_path, with_vectors=False)
+        if len(index.neighbors) != len(corpus):
+            build_similarity(json_path)
+            index = SimilarityIndex.load(state_path_for(json_path), neighbors_path, with_vectors=False)
+        index.index_authors(corpus.column('author'))
+        _similarity_cache[json_path] = index
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="诗歌相似度索引工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="全量构建向量与近邻表")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-k', type=int, default=DEFAULT_K, help="每首诗保存的近邻数")
+    update = sub.add_parser('update', help="只为新增的诗计算近邻并合并")
+    update.add_argument('json_path', nargs='?', default='data/poems.json')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        index = build_similarity(args.json_path, args.k)
+    else:
+        index = update_similarity(args.json_path)
+    elapsed = time.perf_counter() - start
+    print(f"近邻表共 {index.n_docs} 首诗，特征 {len(index.vocab)} 个，用时 {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
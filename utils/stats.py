@@ -0,0 +1,218 @@
+"""语料库统计
+
+一次遍历即可得到诗歌数、作者与朝代分布、字频、诗体分布、字数与句数分布。输入可以是任意
+诗歌迭代器，不需要整个列表常驻内存；各分片的部分结果可以合并，因此批量统计按区间分发到
+进程池并行计算。结果与语料库一同缓存为 JSON，首页和学习报告直接读取，不再重新扫描。
+
+统计：python -m utils.stats build data/poems.json --workers 8
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from utils.corpus import corpus_path_for, load_corpus
+from utils.prosody import analyze_lines, analyze_poem
+
+STATS_VERSION = 2
+COUNTERS = ('authors', 'dynasties', 'chars', 'forms', 'lengths', 'lines')
+
+
+class CorpusStats:
+    """可合并的语料统计；字数与句数按精确取值计数，分布图与分位数都由此得出"""
+
+    __slots__ = ('total', 'content_chars') + COUNTERS
+
+    def __init__(self):
+        self.total = 0
+        self.content_chars = 0  # 正文原文（含标点、换行）的总长度
+        self.authors = Counter()
+        self.dynasties = Counter()
+        self.chars = Counter()  # 只统计诗句中的字，不含标点
+        self.forms = Counter()
+        self.lengths = Counter()  # 每首诗的字数
+        self.lines = Counter()  # 每首诗的句数
+
+    def add_fields(self, author, dynasty, content, lines=None):
+        """计入一首诗；lines 为已按预存位置切好的诗句，缺省时从正文切分"""
+        result = analyze_poem(content) if lines is None else analyze_lines(lines)
+        self.total += 1
+        self.content_chars += len(content)
+        self.authors[author] += 1
+        if dynasty is not None:
+            self.dynasties[dynasty] += 1
+        self.forms[result.form] += 1
+        self.lines[len(result.lines)] += 1
+        length = 0
+        for line in result.lines:
+            self.chars.update(line)
+            length += len(line)
+        self.lengths[length] += 1
+
+    def add(self, poem):
+        """计入一首诗；只要求 author 与 content，缺少朝代的记录不计入朝代分布"""
+        self.add_fields(poem['author'], poem.get('dynasty'), poem['content'])
+
+    def update(self, poems: Iterable):
+        """逐首计入，输入只需可迭代"""
+        for poem in poems:
+            self.add(poem)
+        return self
+
+    def merge(self, other: 'CorpusStats'):
+        """合并另一分片的统计结果"""
+        self.total += other.total
+        self.content_chars += other.content_chars
+        for name in COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    @property
+    def avg_length(self) -> float:
+        """平均每首正文原文的长度（含标点），与 get_poem_stats 的 avg_length 一致"""
+        return self.content_chars / self.total if self.total else 0.0
+
+    @property
+    def avg_chars(self) -> float:
+        """平均每首的字数，不含标点"""
+        return sum(n * c for n, c in self.lengths.items()) / self.total if self.total else 0.0
+
+    def length_histogram(self, bucket=10) -> Dict[str, int]:
+        """字数分布，按 bucket 字一档"""
+        histogram = Counter()
+        for length, count in self.lengths.items():
+            histogram[length // bucket * bucket] += count
+        return {f"{low}-{low + bucket - 1}字": histogram[low] for low in sorted(histogram)}
+
+    def summary(self) -> Dict[str, object]:
+        """兼容 get_poem_stats 的概要，键名与同名属性含义一致"""
+        return {
+            'total': self.total,
+            'authors': len(self.authors),
+            'dynasties': len(self.dynasties),
+            'distinct_chars': len(self.chars),
+            'avg_length': self.avg_length,
+            'avg_chars': self.avg_chars,
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        data = {'version': STATS_VERSION, 'total': self.total, 'content_chars': self.content_chars}
+        for name in COUNTERS:
+            data[name] = [[key, count] for key, count in getattr(self, name).most_common()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data) -> 'CorpusStats':
+        if data.get('version') != STATS_VERSION:
+            raise ValueError("语料统计缓存版本不匹配")
+        stats = cls()
+        stats.total = data['total']
+        stats.content_chars = data['content_chars']
+        for name in COUNTERS:
+            getattr(stats, name).update(dict(data[name]))
+        return stats
+
+
+def collect_stats(poems: Iterable) -> CorpusStats:
+    """一次遍历统计任意诗歌迭代器"""
+    return CorpusStats().update(poems)
+
+
+def _stats_range(json_path, start, stop) -> CorpusStats:
+    # 子进程自行映射语料库，只传区间，不必把诗文序列化给每个进程
+    corpus = load_corpus(json_path)
+    stats = CorpusStats()
+    for i in range(start, stop):
+        poem = corpus[i]
+        stats.add_fields(poem['author'], poem['dynasty'], poem['content'], poem.lines)
+    return stats
+
+
+def stats_path_for(json_path):
+    """返回JSON数据文件对应的统计缓存路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.stats.json'
+
+
+def build_stats(json_path, output=None, workers=None, chunk_size=20000) -> CorpusStats:
+    """统计整个语料库并写入缓存文件（原子替换）"""
+    json_path = os.path.abspath(json_path)
+    output = output or stats_path_for(json_path)
+    corpus = load_corpus(json_path)
+    workers = workers or os.cpu_count() or 1
+    ranges: List[Tuple[int, int]] = [(start, min(start + chunk_size, len(corpus)))
+                                     for start in range(0, len(corpus), chunk_size)]
+
+    if workers == 1 or len(ranges) <= 1:
+        stats = _stats_range(json_path, 0, len(corpus))
+    else:
+        stats = CorpusStats()
+        with ProcessPoolExecutor(workers) as pool:
+            parts = pool.map(_stats_range, [json_path] * len(ranges),
+                             [r[0] for r in ranges], [r[1] for r in ranges])
+            for part in parts:
+                stats.merge(part)
+
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(stats.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp_path, output)
+    return stats
+
+
+_stats_cache = {}
+_stats_lock = threading.Lock()
+
+
+def load_stats(json_path='data/poems.json') -> CorpusStats:
+    """加载共享的语料统计，缓存缺失、早于语料库或与之不符时重新统计"""
+    json_path = os.path.abspath(json_path)
+    with _stats_lock:
+        stats = _stats_cache.get(json_path)
+        if stats is not None:
+            return stats
+
+        corpus = load_corpus(json_path)
+        path = stats_path_for(json_path)
+        stale = (not os.path.exists(path)
+                 or os.path.getmtime(path) < os.path.getmtime(corpus_path_for(json_path)))
+        stats = None
+        if not stale:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    stats = CorpusStats.from_dict(json.load(f))
+            except (ValueError, KeyError):
+                stats = None
+        if stats is None or stats.total != len(corpus):
+            stats = build_stats(json_path, path, workers=1)
+        _stats_cache[json_path] = stats
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语料库统计工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="统计整个语料库并写入缓存")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .stats.json 文件")
+    build.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    build.add_argument('--top', type=int, default=10, help="显示前几位的作者与用字")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = build_stats(args.json_path, args.output, args.workers)
+    elapsed = time.perf_counter() - start
+    summary = stats.summary()
+    print(f"已统计 {stats.total} 首诗，用时 {elapsed:.2f}s：作者 {summary['authors']} 位，"
+          f"用字 {summary['distinct_chars']} 个，平均 {summary['avg_chars']:.1f} 字")
+    print("诗体：" + "、".join(f"{form} {count}" for form, count in stats.forms.most_common()))
+    print("作者：" + "、".join(f"{name} {count}" for name, count in stats.authors.most_common(args.top)))
+    print("用字：" + "".join(ch for ch, _ in stats.chars.most_common(args.top * 2)))
+
+
+if __name__ == '__main__':
+    main()
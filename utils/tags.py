@@ -0,0 +1,310 @@
+"""主题与意象标注：批量给整个语料库打标签，建立标签 → 诗歌序号的位图倒排索引
+
+标签分两类：AI创作页的八个主题（按各主题的典型意象用字判定），以及明月、青山、秋风等常见意象词。
+每个标签存一行位图（每首诗一位），多个标签的组合查询就是逐行按位与，再取出置位的序号；
+某首诗的标签则是按列取位。结果文件通过 mmap 在所有会话间共享。
+
+批量标注：python -m utils.tags build data/poems.json
+组合查询：python -m utils.tags query 山水田园 明月
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+
+from utils.corpus import corpus_path_for, load_corpus
+from utils.themes import THEME_IMAGERY
+
+THEMES = tuple(THEME_IMAGERY)
+# 常见意象词，按出现即标注
+IMAGERY = (
+    "明月", "秋月", "山月", "月光", "青山", "空山", "寒山", "关山", "白云", "浮云",
+    "春风", "秋风", "东风", "西风", "春雨", "夜雨", "细雨", "风雨", "流水", "春水",
+    "秋水", "江水", "长江", "黄河", "江南", "江湖", "孤舟", "扁舟", "归舟", "渔舟",
+    "落花", "桃花", "梅花", "菊花", "杨柳", "芳草", "松风", "竹林", "落日", "夕阳",
+    "斜阳", "黄昏", "落叶", "寒霜", "白雪", "烟波", "天涯", "故乡", "故人", "归雁",
+    "鸿雁", "孤城", "边关", "玉门", "烽火", "大漠", "长亭", "酒杯", "美酒", "琵琶",
+    "钟声", "白发", "楼台", "柴门",
+)
+TAGS = THEMES + IMAGERY
+TAG_IDS = {tag: i for i, tag in enumerate(TAGS)}
+# 一首诗用到某主题的典型意象字达到这个数目才标注该主题，每首最多标注 MAX_THEMES 个
+THEME_MIN_CHARS = 2
+MAX_THEMES = 3
+
+MAGIC = b'PEMT'
+VERSION = 1
+# 魔数、版本、标签数、诗歌数、标签表摘要；随后是各标签的诗歌数 (uint32) 与位图
+HEADER = struct.Struct('<4sHHI8s')
+ROW_ALIGN = 8
+
+
+def tags_path_for(json_path):
+    """返回JSON数据文件对应的标签索引路径"""
+    root, _ = os.path.splitext(json_path)
+    return root + '.tags'
+
+
+def _vocab_digest():
+    return hashlib.blake2b("\n".join(TAGS).encode('utf-8'), digest_size=8).digest()
+
+
+def tag_poem(content) -> List[int]:
+    """一首诗的标签编号：命中意象字最多的几个主题在前，其后为出现的意象词"""
+    chars = set(content)
+    scored = []
+    for i, theme in enumerate(THEMES):
+        hits = sum(1 for ch in THEME_IMAGERY[theme] if ch in chars)
+        if hits >= THEME_MIN_CHARS:
+            scored.append((-hits, i))
+    scored.sort()
+    tag_ids = [i for _, i in scored[:MAX_THEMES]]
+    tag_ids += [len(THEMES) + i for i, word in enumerate(IMAGERY) if word[0] in chars and word in content]
+    return tag_ids
+
+
+def _tag_matrix(contents):
+    """一批诗的标签矩阵（标签 × 诗歌，布尔值）"""
+    matrix = np.zeros((len(TAGS), len(contents)), dtype=bool)
+    for j, content in enumerate(contents):
+        matrix[tag_poem(content), j] = True
+    return matrix
+
+
+def build_tags(json_path, output=None, workers=None, chunk_size=5000):
+    """批量标注整个语料库并写入位图索引，返回各标签的诗歌数"""
+    output = output or tags_path_for(json_path)
+    corpus = load_corpus(json_path)
+    contents = corpus.column('content')
+    chunks = []
+    while True:
+        chunk = [c for _, c in zip(range(chunk_size), contents)]
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        parts = list(map(_tag_matrix, chunks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_tag_matrix, chunks))
+
+    matrix = np.concatenate(parts, axis=1) if parts else np.zeros((len(TAGS), 0), dtype=bool)
+    counts = matrix.sum(axis=1).astype('<u4')
+    row_bytes = -(-len(corpus) // (8 * ROW_ALIGN)) * ROW_ALIGN
+    bits = np.zeros((len(TAGS), row_bytes), dtype=np.uint8)
+    packed = np.packbits(matrix, axis=1, bitorder='little')
+    bits[:, :packed.shape[1]] = packed
+
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(TAGS), len(corpus), _vocab_digest()))
+        f.write(counts.tobytes())
+        f.write(b'\0' * (-f.tell() % ROW_ALIGN))
+        f.write(bits.tobytes())
+    os.replace(tmp_path, output)
+    return dict(zip(TAGS, counts.tolist()))
+
+
+class CreationSeed(NamedTuple):
+    tags: List[str]  # 实际参与匹配的标签
+    matched: int  # 同时带有这些标签的诗歌数
+    references: List[int]  # 抽取的参考诗序号
+    imagery: List[str]  # 匹配诗中最常同现的其他意象
+
+
+class TagIndex:
+    """标签位图索引：组合查询、单首标签与按共同标签推荐"""
+
+    def __init__(self, path, corpus):
+        self.path = path
+        self._corpus = corpus
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_tags, count, digest = HEADER.unpack_from(self._mm, 0)
+        if (magic != MAGIC or version != VERSION or n_tags != len(TAGS)
+                or digest != _vocab_digest() or count != len(corpus)):
+            self._mm.close()
+            raise ValueError(f"标签索引与语料库或标签表不匹配: {path}")
+        self._counts = np.frombuffer(self._mm, dtype='<u4', count=n_tags, offset=HEADER.size)
+        offset = HEADER.size + self._counts.nbytes
+        offset += -offset % ROW_ALIGN
+        row_bytes = -(-count // (8 * ROW_ALIGN)) * ROW_ALIGN
+        self._bits = np.frombuffer(self._mm, dtype=np.uint8, count=n_tags * row_bytes,
+                                   offset=offset).reshape(n_tags, row_bytes)
+        # 按 64 位字做按位与，取序号时再展开成位
+        self._words = self._bits.view('<u8')
+
+    def __len__(self):
+        return len(self._corpus)
+
+    def count(self, tag) -> int:
+        """带有该标签的诗歌数"""
+        return int(self._counts[TAG_IDS[tag]])
+
+    def _expand(self, words):
+        """位图 → 升序的诗歌序号，只展开非零的字"""
+        nonzero = np.flatnonzero(words)
+        if len(nonzero) * 4 > len(words):
+            # 较稠密时整行展开更快
+            return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder='little'))
+        bits = np.unpackbits(words[nonzero].view(np.uint8), bitorder='little').reshape(-1, 64)
+        word_idx, bit_idx = np.nonzero(bits)
+        return nonzero[word_idx] * 64 + bit_idx
+
+    def query(self, tags: Sequence[str]) -> np.ndarray:
+        """同时带有全部标签的诗歌序号（升序）；未收录的标签抛出 KeyError"""
+        if not tags:
+            return np.arange(len(self))
+        tag_ids = sorted((TAG_IDS[tag] for tag in tags), key=lambda i: self._counts[i])
+        acc = self._words[tag_ids[0]].copy()
+        for i in tag_ids[1:]:
+            np.bitwise_and(acc, self._words[i], out=acc)
+        return self._expand(acc)
+
+    def tags_of(self, idx) -> List[str]:
+        """一首诗的标签，主题在前"""
+        column = (self._bits[:, idx >> 3] >> (idx & 7)) & 1
+        return [TAGS[i] for i in np.flatnonzero(column)]
+
+    def themes_of(self, idx) -> List[str]:
+        return [tag for tag in self.tags_of(idx) if tag in THEME_IMAGERY]
+
+    def imagery_of(self, idx) -> List[str]:
+        return [tag for tag in self.tags_of(idx) if tag not in THEME_IMAGERY]
+
+    def related(self, idx, k=3) -> List[tuple]:
+        """与该诗共同标签最多的诗，返回 [(序号, 共同标签数)]；同分按序号先后
+
+        用位切片计数：planes[b] 的第 i 位是第 i 首诗共同标签数的第 b 位，逐个标签按位做加法，
+        再从高分到低分取出恰好等于该分数的位图，凑满 k 首即止。
+        """
+        tag_ids = [TAG_IDS[tag] for tag in self.tags_of(idx)]
+        planes = []
+        for i in tag_ids:
+            carry = self._words[i].copy()
+            for plane in planes:
+                overflow = plane & carry
+                np.bitwise_xor(plane, carry, out=plane)
+                carry = overflow
+            if carry.any():
+                planes.append(carry)
+        own = ~np.uint64(1 << (idx & 63))
+        for plane in planes:
+            plane[idx >> 6] &= own
+
+        related = []
+        for score in range(min(len(tag_ids), 2 ** len(planes) - 1), 0, -1):
+            mask = np.bitwise_not(np.zeros_like(planes[0]))
+            for b, plane in enumerate(planes):
+                np.bitwise_and(mask, plane if score >> b & 1 else ~plane, out=mask)
+            related += [(int(i), score) for i in self._expand(mask)[:k - len(related)]]
+            if len(related) >= k:
+                break
+        return related
+
+    def cooccurring(self, ids: np.ndarray, k=4, exclude: Iterable[str] = (), sample=2000, rng=None) -> List[str]:
+        """一组诗中最常出现的意象词；诗很多时只统计随机抽取的 sample 首"""
+        if len(ids) > sample:
+            ids = np.asarray(ids)[(rng or random).sample(range(len(ids)), sample)]
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return []
+        counts = ((self._bits[len(THEMES):, ids >> 3] >> (ids & 7)) & 1).sum(axis=1)
+        exclude = set(exclude)
+        ranked = [IMAGERY[i] for i in np.argsort(-counts, kind='stable') if counts[i]]
+        return [word for word in ranked if word not in exclude][:k]
+
+    def creation_seed(self, themes: Sequence[str], keywords: Sequence[str], rng=None,
+                      references=3, imagery=4) -> CreationSeed:
+        """为AI创作挑选参考诗与同现意象
+
+        匹配所选主题与关键词中的已收录意象；没有诗同时满足时从后往前逐个放宽，直到有匹配为止。
+        """
+        rng = rng or random
+        tags = [tag for tag in list(themes) + list(keywords) if tag in TAG_IDS]
+        tags = list(dict.fromkeys(tags))
+        ids = self.query(tags)
+        while not len(ids) and tags:
+            tags.pop()
+            ids = self.query(tags)
+        picked = sorted(int(ids[i]) for i in rng.sample(range(len(ids)), min(references, len(ids))))
+        words = self.cooccurring(ids, imagery, exclude=keywords, rng=rng) if tags else []
+        return CreationSeed(tags, len(ids), picked, words)
+
+
+_tags_cache = {}
+_tags_lock = threading.Lock()
+
+
+def load_tag_index(json_path='data/poems.json'):
+    """加载共享的标签索引，缺失或早于语料库、标签表有变化时重新标注"""
+    json_path = os.path.abspath(json_path)
+    with _tags_lock:
+        index = _tags_cache.get(json_path)
+        if index is not None:
+            return index
+
+        corpus = load_corpus(json_path)
+        path = tags_path_for(json_path)
+        stale = (not os.path.exists(path)
+                 or os.path.getmtime(path) < os.path.getmtime(corpus_path_for(json_path)))
+        if stale:
+            build_tags(json_path, path, workers=1)
+        try:
+            index = TagIndex(path, corpus)
+        except ValueError:
+            build_tags(json_path, path, workers=1)
+            index = TagIndex(path, corpus)
+        _tags_cache[json_path] = index
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主题与意象标注工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="批量标注整个语料库")
+    build.add_argument('json_path', nargs='?', default='data/poems.json')
+    build.add_argument('-o', '--output', help="输出路径，默认与JSON同名的 .tags 文件")
+    build.add_argument('--workers', type=int, default=None, help="并行进程数，默认为CPU核数")
+    query = sub.add_parser('query', help="列出同时带有全部标签的诗")
+    query.add_argument('tags', nargs='+', help=f"主题（{'、'.join(THEMES)}）或意象词")
+    query.add_argument('--json-path', default='data/poems.json')
+    query.add_argument('-k', type=int, default=10, help="最多列出的首数")
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        unknown = [tag for tag in args.tags if tag not in TAG_IDS]
+        if unknown:
+            parser.error(f"未收录的标签：{'、'.join(unknown)}")
+        index = load_tag_index(args.json_path)
+        corpus = load_corpus(args.json_path)
+        start = time.perf_counter()
+        ids = index.query(args.tags)
+        elapsed = time.perf_counter() - start
+        print(f"共 {len(ids)} 首（查询 {elapsed * 1000:.2f}ms）")
+        for i in ids[:args.k]:
+            print(f"  {corpus.field(int(i), 'title')} - {corpus.field(int(i), 'author')}：{'、'.join(index.tags_of(int(i)))}")
+        return
+
+    start = time.perf_counter()
+    counts = build_tags(args.json_path, args.output, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"已标注 {len(load_corpus(args.json_path))} 首诗，用时 {elapsed:.2f}s")
+    for tag in THEMES:
+        print(f"  {tag}: {counts[tag]}")
+    common = sorted(IMAGERY, key=lambda word: -counts[word])[:10]
+    print("  常见意象：" + "、".join(f"{word} {counts[word]}" for word in common))
+
+
+if __name__ == '__main__':
+    main()
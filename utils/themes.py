@@ -0,0 +1,24 @@
+"""主题与风格用字
+
+AI创作、扩展解读与主题标注共用的词表，不依赖任何生成或分析模块，离线工具可以单独导入。
+"""
+
+# 各主题的典型意象用字：生成时提高这些字的权重，标注与解读时据此判定主题
+THEME_IMAGERY = {
+    "山水田园": "山水田园溪泉松林云鸟花竹",
+    "思乡怀人": "月乡归家故梦雁书泪夜",
+    "边塞征战": "沙关塞马剑旗胡雪烽戍",
+    "咏物言志": "松竹梅菊兰石志心节清",
+    "送别友情": "别君柳酒舟亭送离故人",
+    "爱情闺怨": "思泪妆红楼帘月春梦愁",
+    "咏史怀古": "古今王城台空旧兴亡史",
+    "节日时令": "春秋节夜灯花雨佳时酒",
+}
+# 风格决定每句字数与偏好用字
+STYLE_FORMS = {
+    "豪放飘逸": (7, "天酒剑风云飞"),
+    "沉郁顿挫": (7, "愁老病泪悲秋"),
+    "清新自然": (5, "清溪花鸟春光"),
+    "婉约细腻": (5, "柳花帘月香春"),
+    "雄浑壮阔": (7, "江河万里山天"),
+}
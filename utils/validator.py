@@ -12,10 +12,10 @@ def validate_poem_data(poem):
     return True, "数据格式正确"
 
 def get_poem_stats(poems):
-    """获取诗歌统计信息"""
-    stats = {
-        'total': len(poems),
-        'authors': len(set(poem['author'] for poem in poems)),
-        'avg_length': sum(len(poem['content']) for poem in poems) / len(poems) if poems else 0
-    }
-    return stats
\ No newline at end of file
+    """获取诗歌统计信息（一次遍历，poems 可以是任意可迭代对象）
+
+    avg_length 仍是正文（含标点）的平均长度；不含标点的平均字数见 avg_chars。
+    """
+    # 延迟导入：utils.stats 依赖语料库模块，而语料库模块依赖本模块的校验函数
+    from utils.stats import collect_stats
+    return collect_stats(poems).summary()
@@ -0,0 +1,79 @@
+"""繁体转简体
+
+内置诗词常用字的繁简对照，编译成 str.translate 用的码位映射表后缓存，逐字替换。
+也可加载 OpenCC 格式的字表（每行“繁<Tab>简 [其他简体]”）补充对照，按文件修改时间缓存。
+"""
+import os
+from functools import lru_cache
+
+# 繁简对照：每组两个字，前繁后简
+TRAD_SIMP_PAIRS = """
+東东 車车 長长 門门 風风 雲云 書书 馬马 鳥鸟 龍龙 魚鱼 萬万 與与 為为 爲为 來来 時时 國国 學学 語语
+說说 見见 開开 關关 間间 問问 聞闻 陽阳 陰阴 陳陈 張张 後后 從从 歸归 還还 過过 遠远 連连 進进 邊边
+這这 對对 當当 無无 義义 樂乐 鄉乡 難难 離离 雙双 雞鸡 頭头 顏颜 題题 願愿 類类 飛飞 飄飘 驚惊 體体
+髮发 鬢鬓 齊齐 龜龟 麥麦 黃黄 點点 黨党 淚泪 憶忆 誰谁 歲岁 歡欢 舊旧 獨独 淺浅 滿满 漢汉 滄沧 濤涛
+灣湾 燈灯 爐炉 爭争 牆墙 獵猎 環环 瓊琼 畫画 發发 盡尽 眾众 衆众 禮礼 禪禅 穩稳 窮穷 筆笔 節节 簡简
+紅红 紋纹 細细 終终 絕绝 絲丝 經经 綠绿 網网 緣缘 練练 縣县 繞绕 繼继 續续 纏缠 聲声 聽听 腸肠 臺台
+舉举 興兴 莊庄 華华 葉叶 蒼苍 蓋盖 蓮莲 蕭萧 藥药 蘇苏 蘭兰 處处 蟲虫 蠶蚕 衛卫 補补 裝装 規规 視视
+覺觉 親亲 觀观 記记 許许 詞词 試试 詩诗 話话 誠诚 誤误 請请 諸诸 謝谢 謠谣 識识 譜谱 議议 讀读 變变
+讓让 豈岂 豐丰 貝贝 負负 貧贫 貴贵 買买 費费 賀贺 賓宾 賜赐 賞赏 賢贤 賦赋 質质 贈赠 趙赵 軍军 輕轻
+載载 輝辉 輪轮 轉转 農农 迴回 週周 運运 遊游 達达 違违 遙遥 遲迟 遼辽 鄰邻 釣钓 鐘钟 鍾钟 錢钱 錦锦
+鏡镜 閉闭 閑闲 閒闲 閣阁 閨闺 闊阔 闌阑 陣阵 陸陆 隊队 隨随 隱隐 雖虽 雜杂 電电 霧雾 靈灵 靜静 韻韵
+響响 頂顶 項项 須须 順顺 頌颂 領领 顧顾 颯飒 飲饮 飯饭 餘余 館馆 騎骑 驅驱 驛驿 驢驴 鬥斗 魯鲁 鮮鲜
+鳴鸣 鴻鸿 鵝鹅 鶯莺 鷗鸥 鷺鹭 鹽盐 麗丽 齋斋 齒齿 裏里 裡里 麼么 們们 個个 戰战 殘残 殺杀 漁渔 灑洒
+煙烟 燒烧 紛纷 蕩荡 隻只 兒儿 劍剑 勞劳 勢势 卻却 歷历 曆历 嶺岭 峽峡 嶽岳 巖岩 廟庙 廣广 彈弹 徑径
+憐怜 懷怀 戀恋 揚扬 樓楼 橋桥 機机 檻槛 權权 氣气 濕湿 煩烦 熱热 燭烛 獻献 蘆芦 蟬蝉 觴觞 訪访 鐵铁
+鋒锋 闕阙 雛雏 霽霁 顆颗 鬱郁 鳳凤 倫伦 侶侣 傳传 傷伤 僅仅 優优 儀仪 兩两 凍冻 別别 創创 劉刘 勝胜
+區区 協协 厭厌 參参 嘆叹 歎叹 嚴严 園园 圍围 圖图 團团 塵尘 墜坠 壓压 壞坏 壯壮 壺壶 夢梦 夾夹 奪夺
+奮奋 婦妇 孫孙 寧宁 寫写 實实 寬宽 寶宝 將将 專专 尋寻 層层 屬属 島岛 幾几 廢废 彎弯 態态 慶庆 憂忧
+戲戏 擁拥 擊击 攜携 斷断 晉晋 晝昼 曉晓 會会 條条 棄弃 楊杨 榮荣 標标 樹树 漸渐 潛潜 濃浓 瀟潇 猶犹
+現现 瑤瑶 產产 畢毕 異异 盤盘 確确 禍祸 種种 稱称 積积 穀谷 築筑 糧粮 紀纪 約约 純纯 紗纱 紙纸 級级
+組组 結结 給给 絃弦 統统 綿绵 縱纵 總总 織织 繩绳 羅罗 翹翘 聖圣 聯联 聰聪 職职 脈脉 腦脑 膽胆 臉脸
+艱艰 蘋苹 螢萤 衝冲 襲袭 誇夸 調调 論论 謀谋 證证 護护 賊贼 賣卖 賤贱 贏赢 跡迹 蹤踪 軒轩 較较 辭辞
+郵邮 醫医 釋释 針针 銀银 鋪铺 錯错 鎖锁 閃闪 際际 險险 預预 頓顿 頻频 額额 顯显 飢饥 飽饱 養养 駐驻
+騷骚 驕骄 驗验 鬧闹 鵲鹊 鶴鹤 鷹鹰 齡龄 塢坞 鄭郑 蕪芜 綺绮 羈羁 簫箫 箏筝 鴉鸦 鵑鹃 嬌娇 嬋婵
+釵钗 瀉泻 瀾澜 潯浔 灘滩 漣涟 濁浊 濺溅 滯滞 盧卢 鄴邺 隴陇 蘊蕴 蘿萝 藝艺 薦荐 蓽荜 蔣蒋 蕓芸 謁谒
+諫谏 謫谪 譏讥 詠咏 詔诏 誦诵 談谈 貞贞 貪贪 貫贯 賈贾 賴赖 贊赞 趨趋 輿舆 轎轿 辯辩 邁迈 遺遗 選选
+遷迁 醜丑 錄录 鐮镰 鑄铸 鑒鉴 閱阅 闖闯 陝陕 隸隶 靄霭 頹颓 頰颊 頸颈 顫颤 餞饯 饑饥 馳驰 駕驾 駿骏
+騰腾 驟骤 髏髅 魷鱿 鯨鲸 鱗鳞 鴛鸳 鴦鸯 鵬鹏 鸚鹦 鹹咸 黴霉 龐庞 傘伞 儉俭 儂侬 凜凛 劇剧 勸劝 啟启
+喚唤 喪丧 嗚呜 嘯啸 噴喷 嚮向 囑嘱 墳坟 壇坛 壽寿 夥伙 奧奥 媽妈 嬰婴 孿孪 岡冈 崗岗 帥帅 帳帐 帶带
+幣币 幫帮 庫库 廳厅 彥彦 徵征 憑凭 懶懒 懸悬 懼惧 戶户 掃扫 掛挂 撫抚 擔担 據据 擺摆 攏拢 敗败 敵敌
+數数 斂敛 暉晖 暢畅 暫暂 構构 槍枪 樣样 橫横 檢检 櫻樱 欄栏 歐欧 殼壳 毀毁 氈毡 沖冲 滅灭 滬沪 漲涨
+潔洁 潤润 澀涩 濱滨 瀕濒 爛烂 爾尔 牽牵 犧牺 狀状 獅狮 獸兽 璽玺 瓏珑 甕瓮 癡痴 眥眦 睜睁 矯矫
+礎础 祕秘 禱祷 稅税 穌稣 窩窝 竄窜 筧笕 籠笼 籬篱 粵粤 緊紧 緒绪 緩缓 編编 縫缝 罰罚 耬耧
+肅肃 膠胶 臨临 舖铺 艦舰 芻刍 蓴莼 蔔卜 虛虚 蝕蚀 衊蔑 裊袅 覓觅 訴诉 詳详 誼谊 諾诺 謊谎 譽誉 貳贰
+賬账 趕赶 躍跃 輩辈 輸输 轟轰 辦办 遞递 適适 鄧邓 醖酝 釀酿 鈴铃 鉤钩 銷销 鋼钢 錘锤 鍋锅 鏈链 鐸铎
+閥阀 闆板 雋隽 霑沾 靦腼 韋韦 韓韩 頒颁 頗颇 顛颠 颱台 飼饲 餅饼 餵喂 饒饶 駁驳
+"""
+
+
+@lru_cache(maxsize=None)
+def translation_table():
+    """繁→简的码位映射表，首次使用时编译"""
+    table = {}
+    for pair in TRAD_SIMP_PAIRS.split():
+        trad, simp = pair
+        if trad != simp:
+            table[ord(trad)] = simp
+    return table
+
+
+@lru_cache(maxsize=8)
+def _mapping_table(path, mtime):
+    table = dict(translation_table())
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and len(parts[0]) == 1 and len(parts[1]) == 1 and parts[0] != parts[1]:
+                table[ord(parts[0])] = parts[1]
+    return table
+
+
+def load_mapping(path):
+    """内置对照加上外部字表的映射表；文件未改动时直接复用已编译的表"""
+    return _mapping_table(os.path.abspath(path), os.path.getmtime(path))
+
+
+def to_simplified(text, table=None):
+    """把文本中的繁体字转为简体，未收录的字保持不变"""
+    return text.translate(table if table is not None else translation_table())
@@ -0,0 +1,25 @@
+"""页面注册表
+
+侧边栏的每个功能对应本包下的一个页面模块，模块提供 render(poems)。页面模块在首次切换到
+该页面时才导入，它的依赖（NumPy 索引、语言模型、相似度引擎等）随之按需加载，之后整个进程复用；
+每次重跑只执行当前页面的 render，不再逐个判断、定义所有页面的代码与常量。
+
+运行监控页只在设置了环境变量 POETRY_ADMIN=1 时出现在侧边栏。
+"""
+import importlib
+import os
+
+PAGES = {
+    "🏠 首页": "views.home",
+    "📖 智能赏析": "views.appreciation",
+    "🏆 对诗挑战": "views.challenge",
+    "✍️ AI创作": "views.creation",
+    "📊 学习报告": "views.report",
+}
+if os.environ.get('POETRY_ADMIN') == '1':
+    PAGES["🛠️ 运行监控"] = "views.admin"
+
+
+def load_page(label):
+    """返回页面模块，首次访问时导入（之后由 sys.modules 缓存）"""
+    return importlib.import_module(PAGES[label])
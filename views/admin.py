@@ -0,0 +1,74 @@
+"""运行监控（需设置 POETRY_ADMIN=1）"""
+import streamlit as st
+
+from utils import metrics
+
+
+def _label_text(labels):
+    return "、".join(f"{key}={value}" for key, value in labels) or "—"
+
+
+def render(poems):
+    st.header("🛠️ 运行监控")
+    st.markdown("本进程自启动以来的重跑耗时、缓存命中与内存占用；分位数取每项最近 1024 次观测。")
+
+    if st.button("🔄 刷新"):
+        st.rerun()
+
+    rows = metrics.REGISTRY.rows()
+
+    # 耗时分位数
+    st.subheader("耗时")
+    timings = [row for row in rows if row.kind == 'summary' and row.name.endswith('_seconds')]
+    if timings:
+        st.dataframe(
+            {
+                "指标": [metrics.METRIC_HELP.get(row.name, row.name) for row in timings],
+                "标签": [_label_text(row.labels) for row in timings],
+                "次数": [row.count for row in timings],
+                "p50 (ms)": [round(row.quantiles[0] * 1000, 2) for row in timings],
+                "p95 (ms)": [round(row.quantiles[1] * 1000, 2) for row in timings],
+                "p99 (ms)": [round(row.quantiles[2] * 1000, 2) for row in timings],
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("暂无耗时数据")
+
+    # 缓存命中
+    st.subheader("共享资源缓存")
+    requests = {dict(row.labels)['cache']: row.value for row in rows if row.name == 'poetry_cache_requests_total'}
+    misses = {dict(row.labels)['cache']: row.value for row in rows if row.name == 'poetry_cache_misses_total'}
+    if requests:
+        caches = sorted(requests)
+        st.dataframe(
+            {
+                "缓存": caches,
+                "请求": [int(requests[c]) for c in caches],
+                "未命中": [int(misses.get(c, 0)) for c in caches],
+                "命中率": [(requests[c] - misses.get(c, 0)) / requests[c] * 100 for c in caches],
+            },
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "命中率": st.column_config.ProgressColumn("命中率", min_value=0, max_value=100, format="%.1f%%"),
+            },
+        )
+
+    # 内存
+    st.subheader("内存")
+    col_rss, col_session = st.columns(2)
+    for row in rows:
+        if row.name == 'poetry_process_max_rss_bytes':
+            col_rss.metric("进程峰值常驻内存", f"{row.value / 2**20:.0f} MiB")
+        elif row.name == 'poetry_session_bytes':
+            p50, p95, p99 = row.quantiles
+            col_session.metric("会话状态 p50", f"{p50 / 1024:.1f} KiB",
+                               help=f"p95 {p95 / 1024:.1f} KiB · p99 {p99 / 1024:.1f} KiB")
+
+    # 导出
+    st.divider()
+    st.caption("指标每 15 秒写入 data/metrics.prom；设置 POETRY_METRICS_PORT 可直接由 Prometheus 抓取")
+    st.download_button("📥 下载 Prometheus 文本", data=metrics.REGISTRY.render(),
+                       file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,142 @@
+"""智能赏析"""
+from concurrent.futures import wait
+
+import streamlit as st
+
+from views.resources import (load_interpret_service, load_prosody_table, load_search_index, load_similarity_index,
+                             load_tags)
+
+# 扩展解读未缓存时页面最多等待的时间，超过后改为后台生成、片段轮询
+INLINE_WAIT = 0.3
+POLL_INTERVAL = 1.0
+
+
+def render_interpretation(future):
+    """显示扩展解读；仍在生成时由片段定时检查，完成后整页重跑显示，不阻塞页面"""
+    if not future.done():
+        @st.fragment(run_every=POLL_INTERVAL)
+        def pending():
+            if future.done():
+                st.rerun()
+            st.caption("⏳ AI扩展解读生成中，完成后自动显示")
+        pending()
+        return
+    if future.exception() is not None:
+        st.warning(f"扩展解读暂不可用：{future.exception()}")
+        return
+
+    interpretation = future.result()
+
+    st.markdown("#### 核心主题")
+    for theme, note in interpretation['themes']:
+        st.markdown(f"- **{theme}**：{note}")
+
+    st.markdown("#### 艺术特色")
+    for feature in interpretation['features']:
+        st.markdown(f"- {feature}")
+
+
+def render(poems):
+    st.header("📖 智能赏析")
+    st.markdown("选择一首唐诗，获取AI的深度解析与赏析。")
+
+    if not poems:
+        st.warning("暂无诗歌数据，请检查数据文件")
+        return
+
+    # 诗歌选择：先检索再选择，候选列表只包含前若干条结果
+    search_index = load_search_index(poems)
+    query = st.text_input("搜索诗歌", placeholder="输入诗题、作者、诗句或拼音首字母，如：明月、李白、jys")
+    if query:
+        poem_options = search_index.search(query, k=20)
+    else:
+        default_idx = st.session_state.get('selected_poem_idx', 0)
+        if not 0 <= default_idx < len(poems):
+            default_idx = 0
+        poem_options = [default_idx] + [i for i in range(min(20, len(poems))) if i != default_idx]
+
+    if not poem_options:
+        st.info("没有找到匹配的诗歌，换个关键词试试")
+
+    selected_option = st.selectbox(
+        "选择一首唐诗", poem_options,
+        format_func=lambda i: f"{poems[i]['title']} - {poems[i]['author']}"
+    )
+
+    if selected_option is not None:
+        # 选项即诗歌序号，直接定位
+        poem = poems[selected_option]
+        # 解读已缓存时立即可用；否则在后台生成，同一首诗的并发请求只调用一次后端
+        interpretation = load_interpret_service().submit(poem)
+        wait([interpretation], timeout=INLINE_WAIT)
+
+        col1, col2 = st.columns([1, 2])
+
+        with col1:
+            st.subheader(poem['title'])
+            st.markdown(f"**作者**：{poem['author']}")
+            st.markdown(f"**朝代**：{poem['dynasty']}")
+
+            st.markdown("### 原文")
+            # 分句在编译语料库时已经切好，每句一行
+            for sentence in poem.sentences:
+                st.markdown(f"**{sentence}**")
+
+            st.markdown("---")
+            st.markdown("### 基本信息")
+            form, rhyme, _ = load_prosody_table().summary(selected_option)
+            st.info(f"**诗歌类型**：{form}")
+            st.info(f"**用韵**：{rhyme}")
+            with st.expander("平仄（○平 ●仄）"):
+                prosody = load_prosody_table().get(selected_option)
+                for line, tones in zip(prosody.lines, prosody.tones):
+                    st.markdown(f"{line}　`{tones}`")
+            if interpretation.done() and interpretation.exception() is None:
+                st.info(f"**题材**：{interpretation.result()['background']}诗")
+            imagery = load_tags().imagery_of(selected_option)
+            if imagery:
+                st.info(f"**意象**：{'、'.join(imagery)}")
+
+        with col2:
+            st.subheader("AI深度解析")
+
+            with st.expander("📝 白话译文", expanded=True):
+                st.success(poem['translation'])
+
+            with st.expander("🎨 诗歌赏析", expanded=True):
+                st.info(poem['explanation'])
+
+            with st.expander("💡 AI扩展解读"):
+                render_interpretation(interpretation)
+
+            with st.expander("📚 关联学习"):
+                # 推荐相关诗歌：读取预计算的近邻表与作者索引
+                similarity = load_similarity_index()
+                related_poems = [poems[i] for i in similarity.by_same_author(poem['author'], exclude=selected_option, k=2)]
+                if related_poems:
+                    st.markdown("#### 同作者作品")
+                    for rp in related_poems:
+                        st.markdown(f"- **{rp['title']}**：{rp['content'][:10]}...")
+
+                similar_poems = similarity.similar(selected_option, k=3)
+                if similar_poems:
+                    st.markdown("#### 意境相近的诗")
+                    for idx, score in similar_poems:
+                        sp = poems[idx]
+                        st.markdown(f"- **{sp['title']}**（{sp['author']}）：{sp['content'][:10]}... `相似度 {score:.2f}`")
+
+                # 主题与意象标签相同最多的诗，来自标签位图索引
+                tagged_poems = load_tags().related(selected_option, k=3)
+                if tagged_poems:
+                    st.markdown("#### 同题材、同意象的诗")
+                    for idx, shared in tagged_poems:
+                        tp = poems[idx]
+                        st.markdown(f"- **{tp['title']}**（{tp['author']}）：{tp['content'][:10]}... `共同标签 {shared}`")
+
+                st.markdown("#### 学习建议")
+                st.markdown("""
+                1. 尝试背诵全诗
+                2. 理解诗歌创作背景
+                3. 体会诗人情感表达
+                4. 学习诗歌的格律特点
+                """)
@@ -0,0 +1,244 @@
+"""对诗挑战"""
+import random
+import time
+
+import streamlit as st
+
+from utils import metrics
+from utils.grading import grade_answer
+from utils.lines import MAX_MISSES, FeihuaRound
+from views.resources import current_user, load_lines, load_question_bank, load_scheduler, load_search_index
+
+
+def render(poems):
+    st.header("🏆 对诗挑战")
+    st.markdown("测试你对唐诗的掌握程度，看看你能答对多少！")
+
+    if not poems:
+        st.warning("暂无诗歌数据，请检查数据文件")
+        return
+
+    mode = st.radio("挑战模式", ["诗句填空", "飞花令"], horizontal=True)
+    if mode == "飞花令":
+        render_feihua(poems)
+        return
+
+    question_bank = load_question_bank()
+
+    def next_challenge(exclude=None):
+        """由复习调度器选题：到期的错题优先，其次是没学过的诗"""
+        with metrics.span('poetry_question_seconds'):
+            item = load_scheduler().next_item(current_user(), exclude=exclude)
+            st.session_state.challenge_qid = question_bank.qid_for(item.poem_idx, random.randrange(question_bank.seeds))
+        st.session_state.challenge_review = item.review
+        st.session_state.show_answer = False
+        st.session_state.current_answer = ""
+
+    # 对诗挑战的交互只重跑这个片段：提交、显示答案、换题不再重新执行整个页面脚本
+    @st.fragment
+    def challenge_panel():
+        # 挑战控制面板
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            if st.button("🎯 开始新挑战", use_container_width=True):
+                next_challenge()
+
+        with col2:
+            if st.button("🔄 换一首诗", use_container_width=True) and st.session_state.challenge_qid is not None:
+                next_challenge(exclude=question_bank.question(st.session_state.challenge_qid).poem_idx)
+
+        with col3:
+            if st.button("📊 查看成绩", use_container_width=True):
+                st.session_state.show_score = True
+
+        # 显示当前挑战
+        if st.session_state.challenge_qid is not None:
+            # 会话中只保存题目编号，题目内容每次从题库中读取，渲染与判分使用同一道题
+            question = question_bank.question(st.session_state.challenge_qid)
+            poem = poems[question.poem_idx]
+            target_sentence = question.answer
+
+            st.divider()
+            st.subheader("挑战题目")
+
+            col_info, col_poem = st.columns([1, 2])
+
+            with col_info:
+                st.markdown(f"**诗歌**：{poem['title']}")
+                st.markdown(f"**作者**：{poem['author']}")
+                st.markdown(f"**难度**：{'⭐' * question.difficulty}")
+                if st.session_state.get('challenge_review'):
+                    st.caption("🔁 复习题：这首诗之前答错过或已到复习时间")
+
+            with col_poem:
+                st.markdown(f"**诗句填空**：")
+                st.markdown(f"> {question.display}")
+
+            # 用户输入
+            user_answer = st.text_input("请输入完整的隐藏诗句：", 
+                                       key="current_answer",
+                                       placeholder="请输入完整的诗句...")
+
+            # 提交答案
+            col_submit, col_show = st.columns(2)
+
+            with col_submit:
+                if st.button("📤 提交答案", use_container_width=True):
+                    if user_answer.strip():
+                        # 规范化后按字比对，错字给部分分
+                        with metrics.span('poetry_grading_seconds'):
+                            grade = grade_answer(user_answer, target_sentence)
+                        correct = grade.correct
+                        load_scheduler().record(current_user(), question.poem_idx, correct,
+                                                user_answer.strip(), qid=question.qid)
+                        st.session_state.answer_log.record(question.poem_idx, question.qid, correct, user_answer.strip())
+                        if correct:
+                            st.success("✅ 回答正确！")
+                        elif grade.score >= 0.5:
+                            st.warning(f"🟡 部分正确：相差 {grade.distance} 个字，得分 {grade.score:.0%}")
+                        else:
+                            st.error("❌ 回答错误")
+
+                        # 不再整页重跑：答案与成绩在本次片段运行的后半段按新状态渲染，判分提示也得以保留
+                        st.session_state.show_answer = True
+                    else:
+                        st.warning("请先输入答案")
+
+            with col_show:
+                if st.button("👁️ 显示答案", use_container_width=True):
+                    st.session_state.show_answer = True
+
+            # 显示答案
+            if st.session_state.show_answer:
+                st.divider()
+                col_answer, col_explanation = st.columns(2)
+
+                with col_answer:
+                    st.markdown("### 正确答案")
+                    st.success(f"**{target_sentence}**")
+
+                    st.markdown("### 完整诗歌")
+                    st.info(poem['content'])
+
+                with col_explanation:
+                    st.markdown("### 诗歌赏析")
+                    st.markdown(poem['explanation'][:100] + "...")
+
+                    if st.button("📖 查看完整赏析"):
+                        st.session_state.app_mode = "📖 智能赏析"
+                        selected_idx = load_search_index(poems).lookup(poem['title'], poem['author'])
+                        st.session_state.selected_poem_idx = selected_idx
+                        st.rerun()  # 切换页面需要整页重跑
+
+        # 成绩显示
+        st.divider()
+        col_score, col_progress = st.columns(2)
+
+        answer_log = st.session_state.answer_log
+        with col_score:
+            st.metric("当前得分", f"{answer_log.score}分")
+            st.metric("挑战次数", answer_log.total)
+
+        with col_progress:
+            if answer_log.total > 0:
+                accuracy = answer_log.accuracy * 100
+                st.metric("正确率", f"{accuracy:.1f}%")
+                st.progress(accuracy / 100)
+
+        # 错题回顾：按复习调度的到期先后排列
+        reviews = load_scheduler().upcoming(current_user())
+        if reviews:
+            with st.expander("🔁 错题回顾"):
+                now = time.time()
+                for poem_idx, due, lapses in reviews:
+                    when = "已到期" if due <= now else f"{(due - now) / 60:.0f} 分钟后复习"
+                    st.markdown(f"❌ **{poems[poem_idx]['title']}** - {poems[poem_idx]['author']}"
+                                f"（答错 {lapses} 次，{when}）")
+
+        # 答题记录
+        if len(answer_log):
+            with st.expander("📝 查看答题记录"):
+                for record in answer_log.recent(5):  # 显示最近5条
+                    status = "✅" if record.correct else "❌"
+                    st.markdown(f"{status} **{poems[record.poem_idx]['title']}**")
+                    st.markdown(f"你的答案：{record.user_answer}")
+                    if not record.correct:
+                        st.markdown(f"正确答案：{question_bank.question(record.qid).answer}")
+                    st.markdown("---")
+
+    challenge_panel()
+
+
+def render_feihua(poems):
+    """飞花令：与对手轮流说出含令字的诗句，说过的句子不能再用"""
+    line_index = load_lines()
+
+    def cite(line_id, char):
+        poem = poems[line_index.poem_of(line_id)]
+        text = line_index.line(line_id).replace(char, f"**{char}**")
+        return f"{text}　——{poem['author']}《{poem['title']}》"
+
+    # 出句与提示只重跑这个片段
+    @st.fragment
+    def feihua_panel():
+        col_start, col_hint = st.columns(2)
+
+        with col_start:
+            if st.button("🌸 开始飞花令", use_container_width=True):
+                char = line_index.pick_char()
+                if char is None:
+                    st.warning("语料中没有可用的令字")
+                else:
+                    st.session_state.feihua = FeihuaRound(char)
+
+        game = st.session_state.get('feihua')
+        hint_clicked = False
+        with col_hint:
+            if st.button("💡 提示一句", use_container_width=True, disabled=game is None or game.over):
+                hint_clicked = True
+
+        if game is None:
+            st.info("点击“开始飞花令”抽取令字，说出含有令字的诗句，与对手轮流接句")
+            return
+
+        st.divider()
+        st.subheader(f"令字：「{game.char}」")
+
+        if hint_clicked:
+            line_id = game.hint(line_index)
+            if line_id is None:
+                st.info("💡 含这个字的诗句都已用过了")
+            else:
+                st.info(f"💡 可以试试：{cite(line_id, game.char)}")
+
+        with st.form("feihua_form", clear_on_submit=True):
+            answer = st.text_input(f"说出一句含「{game.char}」字的诗句：", placeholder="一次输入一句，如：举头望明月")
+            submitted = st.form_submit_button("📤 出句", use_container_width=True, disabled=game.over)
+
+        if submitted:
+            with metrics.span('poetry_feihua_seconds'):
+                play = game.play(line_index, answer)
+            if play.ok:
+                st.success(f"✅ {play.message}")
+            else:
+                st.error(f"❌ {play.message}")
+
+        col_score, col_misses, col_hints = st.columns(3)
+        col_score.metric("接句", game.score)
+        col_misses.metric("失误", f"{game.misses}/{MAX_MISSES}")
+        col_hints.metric("提示", game.hints)
+
+        if game.over:
+            if game.misses >= MAX_MISSES:
+                st.warning(f"本局结束：你接了 {game.score} 句。点击“开始飞花令”再来一局")
+            else:
+                st.balloons()
+
+        # 对局记录：最新的在前
+        if game.history:
+            st.markdown("#### 对局记录")
+            for line_id, by_user in reversed(game.history[-20:]):
+                st.markdown(f"{'🧑 你' if by_user else '🤖 对手'}：{cite(line_id, game.char)}")
+
+    feihua_panel()
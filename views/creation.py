@@ -0,0 +1,168 @@
+"""AI创作"""
+import random
+
+import streamlit as st
+
+from utils import metrics
+from utils.generation import GenerationBusy, GenerationRequest, parse_keywords
+from views.resources import current_user, load_generation_service, load_progress, load_tags
+
+THEMES = ["山水田园", "思乡怀人", "边塞征战", "咏物言志", "送别友情", "爱情闺怨", "咏史怀古", "节日时令"]
+STYLES = ["豪放飘逸", "沉郁顿挫", "清新自然", "婉约细腻", "雄浑壮阔"]
+
+
+def render(poems):
+    st.header("✍️ AI诗歌创作")
+    st.markdown("输入主题，让AI为你创作一首唐诗！")
+
+    # 创作页的交互只重跑这个片段，生成与评价都不再重新执行整个页面脚本
+    @st.fragment
+    def creation_panel():
+        # 创作设置
+        col_settings, col_preview = st.columns([1, 1])
+
+        with col_settings:
+            # 主题选择
+            selected_themes = st.multiselect("选择创作主题（可多选）", THEMES, default=["山水田园"])
+
+            # 风格选择
+            style = st.selectbox("选择诗歌风格", STYLES)
+
+            # 关键词输入
+            keywords = st.text_input("输入关键词（用逗号分隔）", 
+                                    "明月,青山,流水,秋风")
+
+            # 创作按钮
+            if st.button("✨ 开始创作", use_container_width=True):
+                if not selected_themes:
+                    st.warning("请至少选择一个主题！")
+                else:
+                    # 从语料中挑出同时符合所选主题与关键词意象的诗作参考，并把其中常见的其他意象一并用于生成
+                    seed = random.getrandbits(32)
+                    creation_seed = load_tags().creation_seed(selected_themes, parse_keywords(keywords),
+                                                              random.Random(seed))
+                    st.session_state.creation_seed = creation_seed
+                    st.session_state.creation_request = GenerationRequest(
+                        tuple(selected_themes), style, parse_keywords(keywords), seed, tuple(creation_seed.imagery)
+                    )
+                    st.session_state.ai_poem = None
+                    st.session_state.creating = True
+
+        # 创作过程：生成在后台工作池中进行，这里只逐段取出并流式显示
+        if st.session_state.get('creating', False):
+            st.divider()
+
+            generation_service = load_generation_service()
+            try:
+                job = generation_service.submit(st.session_state.creation_request)
+            except GenerationBusy as e:
+                st.session_state.creating = False
+                st.warning(f"⏳ {e}")
+                return
+            st.session_state.generation_job = job
+
+            stream_area = st.empty()
+            try:
+                with st.spinner("AI诗人正在创作中..."):
+                    with stream_area.container():
+                        st.write_stream(chunk.replace('\n', '  \n') for chunk in job.tokens())
+            except Exception as e:
+                st.error(f"❌ 创作失败：{e}")
+                return
+            finally:
+                # 无论成功与否都结束本次创作，避免之后每次重跑都重新提交同一个失败的请求
+                stream_area.empty()
+                st.session_state.generation_job = None
+                st.session_state.creating = False
+
+            if job.result is not None:
+                st.session_state.ai_poem = job.result
+                st.session_state.ai_poem_timing = (job.time_to_first_line, job.finished_at - job.submitted_at)
+                metrics.observe('poetry_creation_first_line_seconds', job.time_to_first_line)
+                metrics.observe('poetry_creation_seconds', job.finished_at - job.submitted_at)
+                st.session_state.creation_count = st.session_state.get('creation_count', 0) + 1
+                load_progress().record_creation(current_user())
+
+        # 显示创作结果
+        if st.session_state.get('ai_poem'):
+            st.divider()
+            st.success("🎉 创作完成！")
+
+            ai_poem = st.session_state.ai_poem
+            selected_themes = list(st.session_state.creation_request.themes)
+            style = st.session_state.creation_request.style
+            keywords = ','.join(st.session_state.creation_request.keywords)
+            first_line, total = st.session_state.ai_poem_timing
+            st.caption(f"首行用时 {first_line:.2f}s · 总用时 {total:.2f}s")
+
+            col_result, col_analysis = st.columns([1, 1])
+
+            with col_result:
+                st.subheader("AI原创诗歌")
+                st.markdown(f"### {ai_poem['title']}")
+                st.markdown(f"*作者：AI诗人*")
+
+                st.markdown("```")
+                for line in ai_poem['content'].split('\n'):
+                    st.markdown(line)
+                st.markdown("```")
+
+                # 下载功能
+                poem_text = f"{ai_poem['title']}\n\n{ai_poem['content']}\n\n——AI诗人创作"
+                st.download_button(
+                    label="📥 下载诗歌",
+                    data=poem_text,
+                    file_name=f"{ai_poem['title']}.txt",
+                    mime="text/plain"
+                )
+
+            with col_analysis:
+                st.subheader("创作分析")
+
+                st.markdown("### 创作参数")
+                st.info(f"**主题**：{', '.join(selected_themes)}")
+                st.info(f"**风格**：{style}")
+                if keywords:
+                    st.info(f"**关键词**：{keywords}")
+                creation_seed = st.session_state.get('creation_seed')
+                if creation_seed and creation_seed.tags:
+                    st.info(f"**语料参考**：{' + '.join(creation_seed.tags)}，共 {creation_seed.matched} 首")
+                    for i in creation_seed.references:
+                        st.markdown(f"- **{poems[i]['title']}**（{poems[i]['author']}）：{poems[i]['content'][:12]}...")
+                    if creation_seed.imagery:
+                        st.caption(f"同时借鉴了其中常见的意象：{'、'.join(creation_seed.imagery)}")
+
+                st.markdown("### AI创作说明")
+                st.success(ai_poem['explanation'])
+
+                st.markdown("### 创作亮点")
+                # 亮点来自实际的格律校验与用字统计
+                for highlight in ai_poem.get('highlights', []):
+                    icon = "⚠️" if highlight.startswith("待改进") else "✅"
+                    st.markdown(f"{icon} {highlight}")
+
+            # 评价功能
+            st.divider()
+            st.subheader("评价AI创作")
+
+            # 嵌套片段：拖动评分、提交建议只重跑评价区，不会重新渲染上面的诗作
+            @st.fragment
+            def creation_feedback():
+                col_rating, col_feedback = st.columns([1, 2])
+
+                with col_rating:
+                    rating = st.slider("请为这首诗打分", 1, 5, 4)
+                    if st.button("提交评分"):
+                        st.balloons()
+                        st.success(f"感谢评价！你给出了{rating}星评价。")
+
+                with col_feedback:
+                    feedback = st.text_area("你的建议（可选）", 
+                                           placeholder="这首诗有什么可以改进的地方？")
+                    if st.button("提交建议"):
+                        if feedback:
+                            st.success("感谢你的宝贵建议！")
+
+            creation_feedback()
+
+    creation_panel()
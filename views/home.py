@@ -0,0 +1,70 @@
+"""首页"""
+import streamlit as st
+
+from views.resources import load_corpus_stats
+
+
+def render(poems):
+    st.title("🎭 AI唐诗工坊")
+    st.markdown("### 融合AI技术的唐诗学习与创作平台")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("### 📖 智能赏析")
+        st.markdown("""
+        - 深度解析唐诗内涵
+        - AI生成扩展解读
+        - 多维度诗歌分析
+        """)
+        if st.button("开始赏析", key="home_appreciation"):
+            st.session_state.app_mode = "📖 智能赏析"
+            st.rerun()
+
+    with col2:
+        st.markdown("### 🏆 对诗挑战")
+        st.markdown("""
+        - 诗句填空挑战
+        - 实时评分系统
+        - 错题回顾功能
+        """)
+        if st.button("开始挑战", key="home_challenge"):
+            st.session_state.app_mode = "🏆 对诗挑战"
+            st.rerun()
+
+    with col3:
+        st.markdown("### ✍️ AI创作")
+        st.markdown("""
+        - AI辅助诗歌创作
+        - 自定义创作主题
+        - 多风格选择
+        """)
+        if st.button("开始创作", key="home_creation"):
+            st.session_state.app_mode = "✍️ AI创作"
+            st.rerun()
+
+    st.markdown("---")
+
+    # 语料概况
+    if poems:
+        corpus_stats = load_corpus_stats()
+        col_total, col_authors, col_chars, col_length = st.columns(4)
+        col_total.metric("收录诗歌", f"{corpus_stats.total}首")
+        col_authors.metric("诗人", f"{len(corpus_stats.authors)}位")
+        col_chars.metric("用字", f"{len(corpus_stats.chars)}个")
+        col_length.metric("平均字数", f"{corpus_stats.avg_chars:.1f}")
+
+    # 展示部分唐诗
+    st.subheader("📚 唐诗精选")
+    if poems:
+        cols = st.columns(3)
+        for idx, poem in enumerate(poems[:3]):
+            with cols[idx]:
+                with st.container():
+                    st.markdown(f"**{poem['title']}**")
+                    st.markdown(f"*{poem['author']}（{poem['dynasty']}）*")
+                    st.markdown(f"> {''.join(poem.sentences[:2])}...")
+                    if st.button(f"赏析此诗", key=f"quick_{idx}"):
+                        st.session_state.app_mode = "📖 智能赏析"
+                        st.session_state.selected_poem_idx = idx
+                        st.rerun()
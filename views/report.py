@@ -0,0 +1,127 @@
+"""学习报告"""
+import streamlit as st
+
+from utils.mastery import MASTERY_BANDS, REVIEW_WINDOWS, SORT_KEYS, UNSEEN_BAND, MasteryView
+from utils.report import render_text, student_report
+from views.resources import (
+    current_user, load_author_codes, load_corpus_stats, load_progress, load_question_bank,
+)
+
+
+def render(poems):
+    st.header("📊 学习报告")
+    st.markdown("查看你的学习进度和成就")
+
+    if not poems:
+        st.warning("暂无学习数据")
+        return
+
+    # 学习统计：读取进度库中的用户汇总
+    progress = load_progress()
+    user_id = current_user()
+    masteries = progress.mastery(user_id)  # 先等待未落盘的记录写入，汇总中的已学首数随之更新
+    summary = progress.summary(user_id)
+    col_stats1, col_stats2, col_stats3 = st.columns(3)
+
+    with col_stats1:
+        st.metric("已学习诗歌", f"{summary.poems_seen}首")
+
+    with col_stats2:
+        st.metric("挑战正确率", f"{summary.accuracy * 100:.1f}%")
+
+    with col_stats3:
+        st.metric("创作次数", summary.creations)
+
+    # 学习进度
+    st.divider()
+    st.subheader("学习进度")
+
+    corpus_stats = load_corpus_stats()
+    st.progress(min(summary.poems_seen / max(corpus_stats.total, 1), 1.0),
+                text=f"已学习 {summary.poems_seen} / {corpus_stats.total} 首")
+    # 图表只在展开时绘制，收起时的重跑不再生成图表
+    overview = st.expander("📚 语料概况", key="corpus_overview", on_change="rerun")
+    if overview.open:
+        with overview:
+            _render_overview(corpus_stats)
+
+    # 诗歌掌握情况：整列筛选排序，只渲染一页
+    st.markdown("### 诗歌掌握情况")
+    view = MasteryView(load_author_codes(poems), masteries)
+    for column, (name, count) in zip(st.columns(len(MASTERY_BANDS) + 1), view.band_counts().items()):
+        column.metric(name, f"{count}首")
+
+    col_author, col_band, col_review, col_sort = st.columns(4)
+    with col_author:
+        author_filter = st.text_input("按作者筛选", placeholder="如：李白")
+    with col_band:
+        band = st.selectbox("掌握程度", ["全部", UNSEEN_BAND] + [name for name, _, _ in MASTERY_BANDS])
+    with col_review:
+        reviewed = st.selectbox("最近复习", ["全部"] + [name for name, _, _ in REVIEW_WINDOWS])
+    with col_sort:
+        sort = st.selectbox("排序", SORT_KEYS)
+
+    filters = dict(author=author_filter.strip(), band=None if band == "全部" else band,
+                   reviewed=None if reviewed == "全部" else reviewed, sort=sort)
+    page_size = 50
+    selection = view.select(**filters)
+    pages = selection.pages(page_size)
+    page = st.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, value=1) - 1
+    result = selection.page(page, page_size)
+    st.caption(f"共 {result.total} 首，当前第 {page + 1}/{result.pages} 页")
+    st.dataframe(
+        view.rows(poems, result.indices),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "掌握度": st.column_config.ProgressColumn("掌握度", min_value=0, max_value=100, format="%d%%"),
+        },
+    )
+
+    # 答题历史
+    st.divider()
+    recent = progress.recent_attempts(user_id, 3)
+    if recent:
+        st.subheader("最近答题记录")
+
+        for poem_idx, qid, correct, answer, _ in recent:
+            col_icon, col_content = st.columns([1, 10])
+
+            with col_icon:
+                if correct:
+                    st.success("✅")
+                else:
+                    st.error("❌")
+
+            with col_content:
+                st.markdown(f"**{poems[poem_idx]['title']}**")
+                st.markdown(f"你的答案：{answer}")
+                if not correct and qid is not None:
+                    st.markdown(f"正确答案：{load_question_bank().question(qid).answer}")
+                st.markdown("---")
+
+    # 导出报告
+    st.divider()
+    if st.button("📄 生成学习报告", use_container_width=True):
+        report_content = render_text(student_report(user_id, summary, masteries), poems)
+
+        st.download_button(
+            label="📥 下载学习报告",
+            data=report_content,
+            file_name="唐诗学习报告.txt",
+            mime="text/plain"
+        )
+
+
+def _render_overview(corpus_stats):
+    """语料概况：诗体、字数分布与常见作者、用字"""
+    col_forms, col_lengths = st.columns(2)
+    with col_forms:
+        st.markdown("**诗体分布**")
+        st.bar_chart(dict(corpus_stats.forms.most_common()))
+    with col_lengths:
+        st.markdown("**字数分布**")
+        st.bar_chart(corpus_stats.length_histogram())
+    st.markdown("**作品最多的诗人**：" + "、".join(
+        f"{name}（{count}）" for name, count in corpus_stats.authors.most_common(10)))
+    st.markdown("**最常用的字**：" + "".join(ch for ch, _ in corpus_stats.chars.most_common(30)))
@@ -0,0 +1,141 @@
+"""各页面共享的资源加载
+
+都用 st.cache_resource：整个进程只构建一次，所有会话共享。较重的依赖（NumPy 相似度引擎、
+n-gram 模型、格律表等）在加载函数内部导入，只有用到它的页面首次打开时才会加载。
+每次取用都计入缓存请求数，实际执行加载时计入未命中数，运行监控页据此给出命中率。
+"""
+import json
+import os
+import uuid
+from functools import wraps
+
+import streamlit as st
+
+from utils import metrics
+from utils.corpus import load_corpus
+
+
+def cached_resource(cache):
+    """st.cache_resource 加上命中统计"""
+    def decorate(func):
+        @wraps(func)
+        def load(*args, **kwargs):
+            metrics.inc('poetry_cache_misses_total', cache=cache)
+            return func(*args, **kwargs)
+        cached = st.cache_resource(load)
+
+        @wraps(func)
+        def lookup(*args, **kwargs):
+            metrics.inc('poetry_cache_requests_total', cache=cache)
+            return cached(*args, **kwargs)
+        return lookup
+    return decorate
+
+
+# 加载诗歌数据
+# 使用 cache_resource：所有会话共享同一个只读语料库对象，重跑时不再复制整个列表
+@cached_resource('corpus')
+def load_poems():
+    """加载唐诗数据"""
+    try:
+        poems = load_corpus('data/poems.json')
+        if not poems:
+            st.warning("数据文件为空，请检查data/poems.json")
+            return []
+        return poems
+    except FileNotFoundError:
+        st.error("❌ 未找到数据文件！请确保 data/poems.json 存在")
+        return []
+    except json.JSONDecodeError:
+        st.error("❌ 数据文件格式错误！请检查JSON格式")
+        return []
+    except Exception as e:
+        st.error(f"❌ 加载数据时发生未知错误: {e}")
+        return []
+
+@cached_resource('search_index')
+def load_search_index(_poems):
+    """构建诗歌检索索引，每个进程只构建一次"""
+    from utils.search import build_search_index
+    return build_search_index(_poems)
+
+@cached_resource('question_bank')
+def load_question_bank():
+    """加载预生成的填空题库，所有会话共享"""
+    from utils.cloze import load_bank
+    return load_bank('data/poems.json')
+
+@cached_resource('generation_service')
+def load_generation_service():
+    """进程内共享的诗歌生成服务（有界工作池），使用语料库训练的 n-gram 模型"""
+    from utils.generation import GenerationService, NgramBackend
+    from utils.ngram_model import load_model
+    return GenerationService(NgramBackend(load_model('data/poems.json')), max_workers=4, max_queue=32)
+
+@cached_resource('line_index')
+def load_lines():
+    """加载诗句与单字倒排索引，飞花令的判定与提示使用"""
+    from utils.lines import load_line_index
+    return load_line_index('data/poems.json')
+
+@cached_resource('tag_index')
+def load_tags():
+    """加载主题与意象标签的位图索引，AI创作选参考诗、智能赏析推荐同类诗时使用"""
+    from utils.tags import load_tag_index
+    return load_tag_index('data/poems.json')
+
+@cached_resource('interpret_service')
+def load_interpret_service():
+    """AI扩展解读服务：设置 POETRY_INTERPRET_URL 时调用该 HTTP 服务，否则使用本地后端；结果缓存在 data/interpret.db"""
+    from utils.interpret import HttpBackend, InterpretCache, InterpretService, LocalBackend
+    url = os.environ.get('POETRY_INTERPRET_URL')
+    backend = HttpBackend(url) if url else LocalBackend()
+    return InterpretService(backend, InterpretCache('data/interpret.db'))
+
+@cached_resource('similarity_index')
+def load_similarity_index():
+    """加载预计算的相似诗近邻表与作者索引"""
+    from utils.similarity import load_similarity
+    return load_similarity('data/poems.json')
+
+@cached_resource('prosody_table')
+def load_prosody_table():
+    """加载批量分析好的诗体与韵部"""
+    from utils.prosody import load_prosody
+    return load_prosody('data/poems.json')
+
+@cached_resource('corpus_stats')
+def load_corpus_stats():
+    """加载与语料库一同缓存的统计结果，页面不再逐首扫描"""
+    from utils.stats import load_stats
+    return load_stats('data/poems.json')
+
+@cached_resource('progress_store')
+def load_progress():
+    """进程内共享的学习进度库，答题与创作记录按批落盘"""
+    from utils.progress import load_progress_store
+    return load_progress_store('data/progress.db')
+
+@cached_resource('scheduler')
+def load_scheduler():
+    """间隔复习调度器，所有会话共享；用户卡片按进度库中的答题历史重建"""
+    from utils.scheduler import Scheduler
+    return Scheduler(len(load_poems()), load_progress())
+
+@cached_resource('author_codes')
+def load_author_codes(_poems):
+    """作者列的整数编码，掌握度视图按作者筛选时使用"""
+    from utils.mastery import build_author_codes
+    return build_author_codes(_poems)
+
+@st.cache_resource
+def load_metrics_exporter():
+    """启动指标导出：定期写 data/metrics.prom；设置 POETRY_METRICS_PORT 时另开 HTTP 端点"""
+    port = int(os.environ.get('POETRY_METRICS_PORT', 0)) or None
+    return metrics.start_exporter('data/metrics.prom', port=port)
+
+def current_user():
+    """学习者标识保存在地址栏参数中，刷新页面后进度不丢失"""
+    if 'uid' not in st.query_params:
+        st.query_params['uid'] = uuid.uuid4().hex[:12]
+    return st.query_params['uid']